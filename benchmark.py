@@ -0,0 +1,1298 @@
+"""
+Benchmark Script for Queue Management System
+Micro-benchmarks for the hot paths of the detection and queue pipeline
+"""
+
+import argparse
+import json
+import sys
+import os
+import time
+import cv2
+import numpy as np
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+def load_config(config_path='config.json'):
+    """Load configuration used by the benchmarks"""
+    with open(config_path, 'r') as f:
+        return json.load(f)
+
+def time_call(func, repeats):
+    """Return mean seconds per call of func over repeats runs"""
+    func()  # warm-up
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start_time) / repeats
+
+class FakeTensor:
+    """Minimal stand-in for a torch tensor as used by ultralytics results"""
+
+    def __init__(self, values):
+        self.values = np.asarray(values)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        # Mimic the copy a real device-to-host transfer makes
+        return self.values.copy()
+
+    def __int__(self):
+        return int(self.values.reshape(-1)[0])
+
+    def __float__(self):
+        return float(self.values.reshape(-1)[0])
+
+    def __getitem__(self, index):
+        return FakeTensor(self.values[index])
+
+    def __len__(self):
+        return len(self.values)
+
+class FakeBoxes:
+    """Minimal stand-in for ultralytics Boxes"""
+
+    def __init__(self, cls, conf, xyxy):
+        self.cls = FakeTensor(cls)
+        self.conf = FakeTensor(conf)
+        self.xyxy = FakeTensor(xyxy)
+
+    def __len__(self):
+        return len(self.cls)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield FakeBoxes(self.cls.values[i:i + 1], self.conf.values[i:i + 1],
+                            self.xyxy.values[i:i + 1])
+
+class FakeResult:
+    """Minimal stand-in for an ultralytics Results object"""
+
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+def make_fake_result(num_boxes, seed=0):
+    """Build a YOLO-like result with num_boxes random boxes"""
+    rng = np.random.default_rng(seed)
+    x1 = rng.uniform(0, 1100, num_boxes)
+    y1 = rng.uniform(0, 500, num_boxes)
+    xyxy = np.stack([x1, y1, x1 + rng.uniform(30, 150, num_boxes),
+                     y1 + rng.uniform(80, 220, num_boxes)], axis=1).astype(np.float32)
+    cls = rng.choice([0, 0, 0, 2, 56], num_boxes).astype(np.float32)
+    conf = rng.uniform(0.2, 1.0, num_boxes).astype(np.float32)
+    return FakeResult(FakeBoxes(cls, conf, xyxy))
+
+def legacy_yolo_extraction(result, person_class_id, confidence_threshold):
+    """Per-box extraction loop as it was before the batched path"""
+    detections = []
+    boxes = result.boxes
+    if boxes is not None:
+        for box in boxes:
+            if (int(box.cls) == person_class_id and
+                float(box.conf) >= confidence_threshold):
+                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+                confidence = float(box.conf)
+                detections.append({
+                    'bbox': [int(x1), int(y1), int(x2-x1), int(y2-y1)],
+                    'confidence': confidence,
+                    'center': [int((x1+x2)/2), int((y1+y2)/2)]
+                })
+    return detections
+
+def benchmark_yolo_extraction(args):
+    """Per-frame latency of YOLO result extraction at 5, 50 and 200 boxes"""
+    from detector.person_detector import PersonDetector
+
+    detector = PersonDetector(load_config(args.config))
+    detector.person_class_id = 0
+    detector.confidence_threshold = 0.5
+
+    print("YOLO result extraction (per frame)")
+    print(f"{'boxes':>6} {'per-box loop':>14} {'batched':>10} {'speedup':>8}")
+    for num_boxes in (5, 50, 200):
+        result = make_fake_result(num_boxes)
+        assert legacy_yolo_extraction(result, 0, 0.5) == detector.extract_yolo_detections(result)
+
+        legacy = time_call(lambda: legacy_yolo_extraction(result, 0, 0.5), args.repeats)
+        batched = time_call(lambda: detector.extract_yolo_detections(result), args.repeats)
+        print(f"{num_boxes:>6} {legacy * 1e6:>11.1f} us {batched * 1e6:>7.1f} us {legacy / batched:>7.1f}x")
+
+def benchmark_roi_inference(args):
+    """Per-frame detector latency on the full frame versus counter ROIs"""
+    from detector.person_detector import PersonDetector
+
+    config = load_config(args.config)
+    # Wide-angle layout: four counters covering about a quarter of the frame
+    config["counters"]["counter_positions"] = {
+        "1": {"x": 100, "y": 100, "width": 200, "height": 300},
+        "2": {"x": 350, "y": 100, "width": 200, "height": 300},
+        "3": {"x": 600, "y": 100, "width": 200, "height": 300},
+        "4": {"x": 850, "y": 100, "width": 200, "height": 300}
+    }
+    detector = PersonDetector(config)
+    detector.wait_until_ready()
+    frame = np.random.default_rng(0).integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+    repeats = max(1, args.repeats // 20)
+
+    print("Detector latency on a 1280x720 frame")
+    print(f"{'mode':>12} {'pixels':>8} {'latency':>12}")
+    baseline = None
+    for mode in ("full", "merged", "per_counter"):
+        detector.roi_mode = mode
+        crops = detector.get_roi_crops(frame.shape) if mode != "full" else [(0, 0, 1280, 720)]
+        pixels = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in crops) / (1280 * 720)
+        latency = time_call(lambda: detector.detect_persons(frame), repeats)
+        baseline = baseline or latency
+        print(f"{mode:>12} {pixels:>7.0%} {latency * 1e3:>9.1f} ms ({baseline / latency:.1f}x)")
+
+class LegacyTracker:
+    """Greedy nested-loop tracker as it was before assignment solving"""
+
+    def __init__(self, max_distance=100, max_disappeared=30):
+        self.tracked_persons = {}
+        self.next_id = 1
+        self.max_distance = max_distance
+        self.max_disappeared = max_disappeared
+
+    def track_persons(self, detections):
+        current_centers = [det['center'] for det in detections]
+        updated_tracks = set()
+        for track_id, track_data in list(self.tracked_persons.items()):
+            best_match_idx = None
+            min_distance = float('inf')
+            for i, center in enumerate(current_centers):
+                distance = np.sqrt((center[0] - track_data['center'][0])**2 +
+                                 (center[1] - track_data['center'][1])**2)
+                if distance < min_distance and distance < self.max_distance:
+                    min_distance = distance
+                    best_match_idx = i
+            if best_match_idx is not None:
+                self.tracked_persons[track_id].update({
+                    'center': current_centers[best_match_idx],
+                    'bbox': detections[best_match_idx]['bbox'],
+                    'confidence': detections[best_match_idx]['confidence'],
+                    'disappeared': 0,
+                    'last_seen': time.time()
+                })
+                updated_tracks.add(best_match_idx)
+            else:
+                self.tracked_persons[track_id]['disappeared'] += 1
+        for track_id in [t for t, d in self.tracked_persons.items() if d['disappeared'] > self.max_disappeared]:
+            del self.tracked_persons[track_id]
+        for i, detection in enumerate(detections):
+            if i not in updated_tracks:
+                self.tracked_persons[self.next_id] = {
+                    'center': detection['center'],
+                    'bbox': detection['bbox'],
+                    'confidence': detection['confidence'],
+                    'disappeared': 0,
+                    'first_seen': time.time(),
+                    'last_seen': time.time()
+                }
+                self.next_id += 1
+        return self.tracked_persons
+
+def make_moving_crowd(num_people, num_frames, seed=0):
+    """Detections for num_people walking around a large floor"""
+    rng = np.random.default_rng(seed)
+    side = int(np.sqrt(num_people)) + 1
+    positions = np.stack(np.meshgrid(np.arange(side), np.arange(side)), -1).reshape(-1, 2)[:num_people] * 120.0
+    frames = []
+    for _ in range(num_frames):
+        positions = positions + rng.normal(0, 8, positions.shape)
+        frames.append([
+            {'bbox': [int(x) - 20, int(y) - 40, 40, 80], 'confidence': 0.9, 'center': [int(x), int(y)]}
+            for x, y in positions
+        ])
+    return frames
+
+def benchmark_tracking(args):
+    """Per-frame tracking latency from 10 to 500 concurrent tracks"""
+    from detector.person_detector import PersonDetector
+
+    detector = PersonDetector(load_config(args.config))
+    detector.wait_until_ready()
+    num_frames = max(3, args.repeats // 20)
+
+    print("Tracking latency per frame")
+    print(f"{'tracks':>6} {'greedy loop':>13} {'assignment':>12} {'speedup':>8} {'tracks created':>16}")
+    for num_people in (10, 50, 100, 250, 500):
+        frames = make_moving_crowd(num_people, num_frames)
+
+        legacy = LegacyTracker(detector.max_distance, detector.max_disappeared)
+        start_time = time.perf_counter()
+        for detections in frames:
+            legacy.track_persons(detections)
+        legacy_time = (time.perf_counter() - start_time) / num_frames
+
+        detector.reset_tracking()
+        start_time = time.perf_counter()
+        for detections in frames:
+            detector.track_persons(detections)
+        new_time = (time.perf_counter() - start_time) / num_frames
+
+        print(f"{num_people:>6} {legacy_time * 1e3:>10.2f} ms {new_time * 1e3:>9.2f} ms "
+              f"{legacy_time / new_time:>7.1f}x {legacy.next_id - 1:>7} vs {detector.next_id - 1}")
+
+class LegacyCustomer:
+    """Customer record with a per-instance __dict__, as before slots"""
+
+    def __init__(self, person_id, queue_id, entry_time=None):
+        self.person_id = person_id
+        self.queue_id = queue_id
+        self.entry_time = entry_time or time.time()
+        self.service_start_time = None
+        self.service_end_time = None
+        self.position = 0
+        self.status = "waiting"
+        self.estimated_wait_time = 0
+        self.actual_wait_time = 0
+        self.service_time = 0
+        self.customer_type = "regular"
+
+def measure_memory(build):
+    """Run build() and return (result, bytes allocated, seconds)"""
+    import tracemalloc
+
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start_time
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, allocated, elapsed
+
+def benchmark_customer_records(args):
+    """Memory and throughput of customer objects versus the columnar table"""
+    from queue_management.queue_manager import Customer
+    from queue_management.customer_table import CustomerTable
+
+    print("Customer records: build + mean wait time")
+    print(f"{'customers':>10} {'layout':>10} {'memory':>10} {'bytes/row':>10} {'build':>10} {'mean wait':>10}")
+    for count in (10_000, 1_000_000):
+        rng = np.random.default_rng(0)
+        entry_times = rng.uniform(0, 86400, count)
+        start_times = entry_times + rng.uniform(0, 600, count)
+        queue_ids = rng.integers(1, 41, count)
+        now = 90000.0
+
+        def build_objects(customer_class):
+            customers = []
+            for i in range(count):
+                customer = customer_class(i, int(queue_ids[i]), float(entry_times[i]))
+                customer.service_start_time = float(start_times[i])
+                customers.append(customer)
+            return customers
+
+        def build_table():
+            table = CustomerTable()
+            table.extend(queue_ids, entry_times, service_start_times=start_times)
+            return table
+
+        layouts = [
+            ("dict", lambda: build_objects(LegacyCustomer),
+             lambda cs: sum(c.service_start_time - c.entry_time for c in cs) / len(cs)),
+            ("slots", lambda: build_objects(Customer),
+             lambda cs: sum(c.service_start_time - c.entry_time for c in cs) / len(cs)),
+            ("table", build_table,
+             lambda table: table.wait_times(now).mean()),
+        ]
+        for name, build, mean_wait in layouts:
+            records, allocated, build_time = measure_memory(build)
+            wait_time = time_call(lambda: mean_wait(records), 3)
+            print(f"{count:>10} {name:>10} {allocated / 2**20:>7.1f} MB {allocated / count:>10.0f} "
+                  f"{build_time * 1e3:>7.0f} ms {wait_time * 1e3:>7.2f} ms")
+            del records
+
+def benchmark_queue_snapshots(args):
+    """Per-frame cost of publishing queue data for a static queue"""
+    from queue_management.queue_manager import QueueManager
+
+    config = load_config(args.config)
+    config["counters"]["total_counters"] = 1
+    config["counters"]["counter_positions"] = {"1": {"x": 0, "y": 0, "width": 1280, "height": 720}}
+
+    print("Queue data per frame (static queue)")
+    print(f"{'customers':>10} {'to_dict':>10} {'snapshot':>10} {'speedup':>8}")
+    for num_people in (0, 5, 20):
+        queue_manager = QueueManager(config)
+        detections = [
+            {'bbox': [100, 30 * i, 40, 80], 'confidence': 0.9, 'center': [120, 30 * i + 40], 'track_id': i}
+            for i in range(num_people)
+        ]
+        queue_manager.update_queues(detections, (720, 1280))
+        queue = queue_manager.queues[1]
+
+        full = time_call(queue.to_dict, args.repeats)
+        cached = time_call(queue.snapshot, args.repeats)
+        print(f"{num_people:>10} {full * 1e6:>7.1f} us {cached * 1e6:>7.1f} us {full / cached:>7.1f}x")
+
+def legacy_counter_assignment(detections, counter_positions):
+    """Per-counter loop over every detection, as before the counter index"""
+    members = {}
+    for queue_id in counter_positions:
+        position = counter_positions[queue_id]
+        x, y, w, h = position["x"], position["y"], position["width"], position["height"]
+        members[int(queue_id)] = [
+            d for d in detections
+            if x <= d['center'][0] <= x + w and y <= d['center'][1] <= y + h
+        ]
+    return members
+
+def benchmark_counter_assignment(args):
+    """Per-frame cost of assigning detections to 40 counters"""
+    from detector.counter_index import CounterIndex
+
+    # 40 counters in a 10 x 4 grid over a 1080p frame
+    counter_positions = {
+        str(i + 1): {"x": 10 + (i % 10) * 190, "y": 20 + (i // 10) * 260, "width": 180, "height": 250}
+        for i in range(40)
+    }
+    index = CounterIndex(counter_positions)
+    rng = np.random.default_rng(0)
+
+    print("Detection-to-counter assignment, 40 counters")
+    print(f"{'detections':>10} {'loop':>10} {'index':>10} {'speedup':>8}")
+    for num_detections in (10, 50, 200):
+        centers = rng.uniform([0, 0], [1920, 1080], size=(num_detections, 2)).astype(int).tolist()
+        detections = [{'center': center} for center in centers]
+
+        def indexed():
+            members = index.assign([d['center'] for d in detections])
+            return {queue_id: [detections[i] for i in rows] for queue_id, rows in members.items()}
+
+        assert indexed() == legacy_counter_assignment(detections, counter_positions)
+        legacy = time_call(lambda: legacy_counter_assignment(detections, counter_positions), args.repeats)
+        vectorized = time_call(indexed, args.repeats)
+        print(f"{num_detections:>10} {legacy * 1e6:>7.1f} us {vectorized * 1e6:>7.1f} us "
+              f"{legacy / vectorized:>7.1f}x")
+
+def legacy_service_time_metrics(cashiers):
+    """Concatenate every cashier's recent service times, as before streaming stats"""
+    all_service_times = []
+    for cashier in cashiers.values():
+        all_service_times.extend(cashier.service_times)
+    return {
+        'min_service_time': min(all_service_times),
+        'max_service_time': max(all_service_times),
+        'median_service_time': np.median(all_service_times),
+        'std_service_time': np.std(all_service_times)
+    }
+
+def benchmark_service_stats(args):
+    """Per-frame cost of service time statistics in get_current_metrics"""
+    from analytics.performance_monitor import PerformanceMonitor
+
+    config = load_config(args.config)
+    rng = np.random.default_rng(0)
+
+    print("Service time statistics per frame")
+    print(f"{'cashiers':>10} {'legacy':>10} {'streaming':>10} {'speedup':>8}")
+    for num_cashiers in (4, 16, 40):
+        monitor = PerformanceMonitor(config)
+        for service_time in rng.lognormal(4.5, 0.5, size=num_cashiers * 200):
+            monitor.add_service_time(f"cashier_{rng.integers(num_cashiers)}", float(service_time))
+
+        legacy = time_call(lambda: legacy_service_time_metrics(monitor.cashiers), args.repeats)
+        streaming = time_call(monitor.get_current_metrics, args.repeats)
+        print(f"{num_cashiers:>10} {legacy * 1e6:>7.1f} us {streaming * 1e6:>7.1f} us {legacy / streaming:>7.1f}x")
+
+def legacy_hourly_trends(hourly_performance):
+    """Rescan every stored sample, as before the time series store"""
+    trends = {}
+    for hour, data_points in hourly_performance.items():
+        trends[hour] = {
+            'average_customers_served': sum(d['customers_served'] for d in data_points) / len(data_points),
+            'average_service_time': sum(d['average_service_time'] for d in data_points) / len(data_points),
+            'data_points': len(data_points)
+        }
+    return trends
+
+def benchmark_performance_history(args):
+    """Memory of per-second performance history and cost of reading hourly trends"""
+    from collections import defaultdict
+    from analytics.performance_monitor import TREND_FIELDS
+    from analytics.timeseries import TimeSeriesStore
+
+    print("Per-second performance history")
+    print(f"{'hours':>6} {'layout':>8} {'memory':>10} {'trends':>10}")
+    for hours in (1, 6, 24):
+        seconds = hours * 3600
+        sample = {'customers_served': 10, 'average_service_time': 95.0, 'active_cashiers': 4}
+
+        def build_legacy():
+            history = defaultdict(list)
+            for second in range(seconds):
+                history[second // 3600].append(dict(sample, timestamp=second))
+            return history
+
+        def build_store():
+            store = TimeSeriesStore(TREND_FIELDS)
+            for second in range(seconds):
+                store.record(sample, second)
+            return store
+
+        history, legacy_bytes, _ = measure_memory(build_legacy)
+        store, store_bytes, _ = measure_memory(build_store)
+        legacy = time_call(lambda: legacy_hourly_trends(history), 5)
+        rollup = time_call(store.hour_of_day_means, args.repeats)
+        print(f"{hours:>6} {'dicts':>8} {legacy_bytes / 2**20:>7.1f} MB {legacy * 1e3:>7.2f} ms")
+        print(f"{hours:>6} {'rings':>8} {store_bytes / 2**20:>7.1f} MB {rollup * 1e3:>7.2f} ms")
+
+def benchmark_history_queries(args):
+    """Cost of last-hour report queries over 30 days of per-minute snapshots"""
+    import tempfile
+    from datetime import datetime
+    from analytics.report_generator import ReportGenerator
+    from storage.snapshot_store import SnapshotStore
+
+    print("Last-hour query over per-minute snapshots")
+    print(f"{'days':>6} {'snapshots':>10} {'scan':>10} {'indexed':>10} {'rows':>6}")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for days in (1, 7, 30):
+            store = SnapshotStore(os.path.join(temp_dir, f"history_{days}.db"))
+            now = time.time()
+            timestamps = [now - 60 * minute for minute in range(days * 1440)]
+            payload = {'queues': {'1': {'queue_length': 3}}, 'performance_metrics': {}}
+            with store.lock:
+                store.connection.executemany(
+                    "INSERT INTO snapshots (ts, kind, payload) VALUES (?, 'queue', ?)",
+                    [(ts, json.dumps(payload)) for ts in timestamps]
+                )
+                store.connection.commit()
+            legacy_data = [dict(payload, timestamp=datetime.fromtimestamp(ts).isoformat())
+                           for ts in timestamps]
+
+            cutoff = now - 3630  # between two snapshots
+
+            def scan():
+                return [d for d in legacy_data
+                        if ReportGenerator.parse_timestamp(None, d['timestamp']) >= cutoff]
+
+            rows = len(store.query('queue', cutoff))
+            assert len(scan()) == rows
+            legacy = time_call(scan, 3)
+            indexed = time_call(lambda: store.query('queue', cutoff), args.repeats)
+            print(f"{days:>6} {len(timestamps):>10} {legacy * 1e3:>7.1f} ms {indexed * 1e3:>7.2f} ms {rows:>6}")
+            store.close()
+
+def directory_usage(directory):
+    """(file count, total bytes) of a directory tree"""
+    files = [os.path.join(root, name) for root, _, names in os.walk(directory) for name in names]
+    return len(files), sum(os.path.getsize(path) for path in files)
+
+def benchmark_snapshot_journal(args):
+    """Disk usage and write cost of a day of per-minute queue snapshots"""
+    import tempfile
+    from queue_management.queue_manager import QueueManager
+    from storage.segment_journal import SegmentJournal
+
+    config = load_config(args.config)
+    config["counters"]["total_counters"] = 4
+    config["counters"]["counter_positions"] = {
+        str(i + 1): {"x": 320 * i, "y": 0, "width": 320, "height": 720} for i in range(4)
+    }
+    queue_manager = QueueManager(config)
+    rng = np.random.default_rng(0)
+    snapshots = []
+    for minute in range(1440):
+        # A changing crowd so snapshots differ like real ones
+        people = int(rng.integers(4, 24))
+        detections = [
+            {'bbox': [320 * (i % 4) + 100, 60 * (i // 4), 40, 80], 'confidence': 0.9,
+             'center': [320 * (i % 4) + 120, 60 * (i // 4) + 40], 'track_id': minute // 2 + i}
+            for i in range(people)
+        ]
+        queue_manager.update_queues(detections, (720, 1280))
+        snapshots.append({
+            'timestamp': f'20250712_{minute // 60:02d}{minute % 60:02d}00',
+            'queues': {qid: q.to_dict() for qid, q in queue_manager.queues.items()},
+            'performance_metrics': queue_manager.get_performance_metrics(),
+            'recommendations': queue_manager.get_queue_recommendations()
+        })
+
+    print(f"One day of per-minute snapshots ({len(snapshots)})")
+    print(f"{'layout':>14} {'files':>6} {'disk':>10} {'write':>10}")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        legacy_dir = os.path.join(temp_dir, "legacy")
+        os.makedirs(legacy_dir)
+        start_time = time.perf_counter()
+        for minute, snapshot in enumerate(snapshots):
+            with open(os.path.join(legacy_dir, f"queue_data_{minute:06d}.json"), 'w') as f:
+                json.dump(snapshot, f, indent=2)
+        legacy = (time.perf_counter() - start_time) / len(snapshots)
+        files, size = directory_usage(legacy_dir)
+        print(f"{'json files':>14} {files:>6} {size / 2**10:>7.0f} KB {legacy * 1e6:>7.0f} us")
+
+        from storage.segment_journal import HAS_ZSTD
+        for compression in ("none", "gzip", "zstd") if HAS_ZSTD else ("none", "gzip"):
+            journal_dir = os.path.join(temp_dir, f"journal_{compression}")
+            journal = SegmentJournal(journal_dir, compression=compression, max_segment_bytes=2**20)
+            start_time = time.perf_counter()
+            for minute, snapshot in enumerate(snapshots):
+                journal.append('queue', snapshot, 60.0 * minute)
+            journal.close()
+            elapsed = (time.perf_counter() - start_time) / len(snapshots)
+            files, size = directory_usage(journal_dir)
+            print(f"{'journal ' + journal.compression:>14} {files:>6} {size / 2**10:>7.0f} KB {elapsed * 1e6:>7.0f} us")
+
+def benchmark_retention(args):
+    """Longest single batch and space reclaimed compacting 30 days of snapshots"""
+    import tempfile
+    from storage.snapshot_store import SnapshotStore
+    from storage.retention import RetentionManager
+
+    class TimedRetention(RetentionManager):
+        """Records the time spent between pacing points"""
+
+        def pace(self, report, should_stop):
+            now = time.perf_counter()
+            self.batch_times.append(now - self.batch_started)
+            result = super().pace(report, should_stop)
+            self.batch_started = time.perf_counter()
+            return result
+
+    config = load_config(args.config)
+    config["analytics"]["retention"] = {"pause_seconds": 0, "max_batches": 100000, "expire_files": {}}
+    payload = {'queues': {str(q): {'queue_length': q, 'average_wait_time': 30.0, 'customers': []}
+                          for q in range(1, 5)}, 'performance_metrics': {'total_customers_served': 10}}
+    now = time.time()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "history.db")
+        store = SnapshotStore(path)
+        with store.lock:
+            store.connection.executemany(
+                "INSERT INTO snapshots (ts, kind, payload) VALUES (?, 'queue', ?)",
+                [(now - 60 * minute, json.dumps(payload)) for minute in range(30 * 1440)]
+            )
+            store.connection.commit()
+        rows_before, bytes_before = store.count(), os.path.getsize(path)
+
+        retention = TimedRetention(config, store)
+        retention.batch_times = []
+        retention.batch_started = time.perf_counter()
+        start_time = time.perf_counter()
+        report = retention.run(now=now)
+        elapsed = time.perf_counter() - start_time
+        store.connection.execute("VACUUM")
+
+        times = np.array(retention.batch_times) * 1e3
+        print(f"Compacted {report['snapshots_compacted']} snapshots into {report['rollups_written']} "
+              f"hourly rollups in {elapsed:.2f} s")
+        print(f"Batches: {len(times)}, median {np.median(times):.1f} ms, max {times.max():.1f} ms")
+        print(f"Store: {rows_before} rows, {bytes_before / 2**20:.1f} MB before; "
+              f"{store.count()} rows, {os.path.getsize(path) / 2**20:.1f} MB after VACUUM")
+        store.close()
+
+def benchmark_chart_rendering(args):
+    """Frame-loop latency while report charts render in-thread versus in a process pool"""
+    import tempfile
+    import threading
+    from analytics.chart_renderer import ChartRenderer
+
+    rng = np.random.default_rng(0)
+    spec = {
+        'title': 'Daily Performance Overview', 'grid': (2, 3), 'figsize': (18, 12),
+        'panels': [{'type': 'line', 'y': rng.random(1440).tolist(), 'title': f'Series {i}'} for i in range(3)] +
+                  [{'type': 'hist', 'values': rng.random(1440).tolist(), 'title': f'Histogram {i}'} for i in range(3)]
+    }
+    crowd = make_moving_crowd(40, 300)
+
+    def frame_loop(duration):
+        """GIL-bound stand-in for per-frame tracking; returns frame times"""
+        tracker = LegacyTracker()
+        frame_times = []
+        end_time = time.perf_counter() + duration
+        while time.perf_counter() < end_time:
+            start_time = time.perf_counter()
+            tracker.track_persons(crowd[len(frame_times) % len(crowd)])
+            frame_times.append(time.perf_counter() - start_time)
+        return np.array(frame_times) * 1e3
+
+    print("Frame time while rendering 3 overview charts at dpi=300")
+    print(f"{'mode':>10} {'frames':>7} {'p50':>9} {'p99':>9} {'max':>9}")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        modes = [('idle', None), ('thread', False), ('process', True)]
+        for name, use_processes in modes:
+            renderer = None
+            if use_processes is not None:
+                renderer = ChartRenderer({"use_processes": use_processes, "dpi": 300})
+                if use_processes:
+                    renderer.submit({'grid': (1, 1), 'panels': []}, os.path.join(temp_dir, "warmup"))
+                    renderer.wait()
+
+                def produce():
+                    for i in range(3):
+                        renderer.submit(spec, os.path.join(temp_dir, f"{name}_{i}"))
+                threading.Thread(target=produce, daemon=True).start()
+
+            frame_times = frame_loop(5.0)
+            if renderer:
+                renderer.close()
+            print(f"{name:>10} {len(frame_times):>7} {np.percentile(frame_times, 50):>6.2f} ms "
+                  f"{np.percentile(frame_times, 99):>6.2f} ms {frame_times.max():>6.1f} ms")
+
+def legacy_draw_separation_lines(interface, frame, queue_data):
+    """Counter geometry redrawn every frame, as before the static layer"""
+    for queue_id, queue_info in queue_data.items():
+        if str(queue_id) not in interface.counter_config["counter_positions"]:
+            continue
+        position = interface.counter_config["counter_positions"][str(queue_id)]
+        x, y, w, h = position["x"], position["y"], position["width"], position["height"]
+
+        cv2.rectangle(frame, (x, y), (x + w, y + h), tuple(interface.colors["queue_boundary"]), 2)
+        service_line_x = x + w // 3
+        service_line_color = tuple(interface.colors["current_customer"])
+        cv2.line(frame, (service_line_x, y), (service_line_x, y + h),
+                 service_line_color, interface.line_thickness + 2)
+        cv2.putText(frame, "SERVICE", (service_line_x + 5, y + 25), interface.font, 0.5, service_line_color, 2)
+        cv2.putText(frame, "LINE", (service_line_x + 5, y + 45), interface.font, 0.5, service_line_color, 2)
+
+        if queue_info["queue_length"] > 1:
+            waiting_area_start = service_line_x + 50
+            customer_spacing = max(30, (x + w - waiting_area_start) // max(1, queue_info["queue_length"] - 1))
+            for i in range(queue_info["queue_length"] - 1):
+                line_x = waiting_area_start + (i * customer_spacing)
+                if line_x < x + w - 20:
+                    cv2.line(frame, (line_x, y + 10), (line_x, y + h - 10),
+                             tuple(interface.colors["waiting_line"]), 2)
+
+        status_color = interface.get_status_color(queue_info.get("queue_status", "good"))
+        cv2.circle(frame, (x + w - 20, y + 20), 10, status_color, -1)
+    return frame
+
+def legacy_draw_controls(interface, frame):
+    """Controls bar measured and drawn every frame, as before the static layer"""
+    controls_text = "Controls: Q-Quit | S-Save Report | R-Reset | H-Help"
+    controls_size = cv2.getTextSize(controls_text, interface.font, 0.4, 1)[0]
+    cv2.rectangle(frame, (frame.shape[1] - controls_size[0] - 20, frame.shape[0] - 30),
+                  (frame.shape[1] - 10, frame.shape[0] - 5), (0, 0, 0, 180), -1)
+    cv2.putText(frame, controls_text, (frame.shape[1] - controls_size[0] - 15, frame.shape[0] - 15),
+                interface.font, 0.4, (255, 255, 255), 1)
+    return frame
+
+def make_counter_scene(num_counters, width=1920, height=1080, seed=0):
+    """Counter grid config, queue data and detections for interface rendering"""
+    rng = np.random.default_rng(seed)
+    columns = min(num_counters, 10)
+    rows = -(-num_counters // columns)
+    cell_w, cell_h = width // columns, (height - 120) // rows
+
+    positions = {}
+    queue_data = {}
+    detections = []
+    for i in range(num_counters):
+        x = (i % columns) * cell_w + 10
+        y = (i // columns) * cell_h + 60
+        positions[str(i + 1)] = {"x": x, "y": y, "width": cell_w - 20, "height": cell_h - 40}
+        queue_length = int(rng.integers(0, 6))
+        queue_data[i + 1] = {
+            'queue_length': queue_length, 'estimated_wait_time': 30.0 * queue_length,
+            'average_service_time': 45.0, 'total_customers_served': int(rng.integers(0, 200)),
+            'current_customer': None, 'queue_status': 'good'
+        }
+        for _ in range(queue_length):
+            cx = int(x + rng.integers(20, cell_w - 40))
+            cy = int(y + rng.integers(40, cell_h - 60))
+            detections.append({'bbox': [cx - 20, cy - 40, 40, 80],
+                               'confidence': float(rng.uniform(0.5, 1.0)), 'center': [cx, cy]})
+    return positions, queue_data, detections
+
+def benchmark_interface_rendering(args):
+    """draw_interface latency at 1080p with 4 and 40 counters, per-frame versus cached static layer"""
+    from visual.interface_manager import InterfaceManager
+
+    config = load_config(args.config)
+    frame = np.random.default_rng(0).integers(0, 255, (1080, 1920, 3), dtype=np.uint8)
+    metrics = {'total_customers_served': 120, 'average_service_time': 45.0, 'average_wait_time': 30.0,
+               'total_customers_waiting': 12, 'queue_efficiency': 0.85, 'fps': 25.0}
+
+    print("draw_interface on a 1920x1080 frame")
+    print(f"{'counters':>8} {'per-frame':>11} {'cached':>10} {'speedup':>8} "
+          f"{'static only':>12} {'cached':>10}")
+    for num_counters in (4, 40):
+        positions, queue_data, detections = make_counter_scene(num_counters)
+        config["counters"]["counter_positions"] = positions
+
+        interface = InterfaceManager(config)
+        legacy = InterfaceManager(config)
+        legacy.draw_separation_lines = lambda f, q: legacy_draw_separation_lines(legacy, f, q)
+        draw_system_info = legacy.draw_system_info
+        legacy.draw_system_info = lambda f: legacy_draw_controls(legacy, draw_system_info(f))
+
+        cached = time_call(lambda: interface.draw_interface(frame, detections, queue_data, metrics), args.repeats)
+        baseline = time_call(lambda: legacy.draw_interface(frame, detections, queue_data, metrics), args.repeats)
+
+        # The layer-only part: counter geometry and controls bar on a frame copy
+        static_cached = time_call(lambda: interface.draw_system_info(
+            interface.draw_separation_lines(frame.copy(), queue_data)), args.repeats)
+        static_legacy = time_call(lambda: legacy.draw_system_info(
+            legacy.draw_separation_lines(frame.copy(), queue_data)), args.repeats)
+        assert interface.static_renders == 1
+
+        print(f"{num_counters:>8} {baseline * 1e3:>8.2f} ms {cached * 1e3:>7.2f} ms {baseline / cached:>7.2f}x "
+              f"{static_legacy * 1e3:>9.2f} ms {static_cached * 1e3:>7.2f} ms")
+
+class SyntheticCapture:
+    """cv2.VideoCapture stand-in that decodes into the caller's buffer when it fits"""
+
+    def __init__(self, frames, reuse_buffers=True):
+        self.frames = frames
+        self.reuse_buffers = reuse_buffers
+        self.index = 0
+        self.allocations = 0
+
+    def read(self, image=None):
+        source = self.frames[self.index % len(self.frames)]
+        self.index += 1
+        if self.reuse_buffers and image is not None and image.shape == source.shape:
+            np.copyto(image, source)
+            return True, image
+        self.allocations += 1
+        return True, source.copy()
+
+    def release(self):
+        pass
+
+def benchmark_frame_annotation(args):
+    """Serial frame loop at 720p: per-frame allocation versus pooled in-place annotation"""
+    import tempfile
+    from visual.frame_pool import FramePool
+
+    config = load_config(args.config)
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8) for _ in range(4)]
+    detections = [{'bbox': [x, 200, 60, 160], 'confidence': 0.9, 'center': [x + 30, 280]}
+                  for x in (150, 400, 650, 900)]
+    warmup, repeats = 20, max(50, args.repeats)
+
+    print("Serial loop on a 1280x720 frame (capture, queues, interface, alerts; fake detector)")
+    print(f"{'mode':>22} {'per frame':>11} {'new frames/frame':>17}")
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.chdir(temp_dir)  # history stores and reports land in the temp dir
+        try:
+            import main as app
+            modes = [('copy, no pool', 'copy', False), ('copy, pooled', 'copy', True),
+                     ('in place, pooled', 'in_place', True)]
+            for name, annotation_mode, pooled in modes:
+                config["visual"]["annotation_mode"] = annotation_mode
+                config_path = os.path.join(temp_dir, "config.json")
+                with open(config_path, 'w') as f:
+                    json.dump(config, f)
+
+                system = app.QueueManagementSystem(config_path)
+                system.detector.detect_persons = lambda frame: list(detections)
+                system.cap = SyntheticCapture(frames, reuse_buffers=pooled)
+                if not pooled:
+                    # As before pooling: every read and every annotation copy is a new array
+                    system.frame_pool = FramePool(max_free=0)
+                    system.read_frame = lambda: system.cap.read()[1]
+
+                def step():
+                    frame = system.read_frame()
+                    output = system.process_frame(frame)
+                    system.release_frame(frame)
+                    if output is not frame:
+                        system.release_frame(output)
+
+                for _ in range(warmup):
+                    step()
+                allocations = system.cap.allocations + system.frame_pool.get_stats()['allocations']
+                start_time = time.perf_counter()
+                for _ in range(repeats):
+                    step()
+                per_frame = (time.perf_counter() - start_time) / repeats
+                allocations = system.cap.allocations + system.frame_pool.get_stats()['allocations'] - allocations
+                system.report_generator.close()
+                print(f"{name:>22} {per_frame * 1e3:>8.2f} ms {allocations / repeats:>17.2f}")
+        finally:
+            os.chdir(cwd)
+
+def write_synthetic_video(path, num_frames, fps=15, size=(1280, 720)):
+    """MJPG video of dark figures walking across a grey scene"""
+    width, height = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (width, height))
+    for i in range(num_frames):
+        frame = np.full((height, width, 3), 110, dtype=np.uint8)
+        for lane in range(4):
+            x = (i * (4 + lane) + lane * 300) % (width - 60)
+            cv2.rectangle(frame, (x, 150 + lane * 120), (x + 40, 250 + lane * 120), (30, 30, 30), -1)
+        writer.write(frame)
+    writer.release()
+
+def make_shopping_day(counter_positions, seconds, fps=2, start_time=1714550400.0,
+                      arrival_seconds=90, service_seconds=(30, 120), seed=0):
+    """Timestamped tracked detections of customers lining up at each counter"""
+    rng = np.random.default_rng(seed)
+    lines = {counter_id: [] for counter_id in counter_positions}  # [track_id, service left]
+    next_track = 1
+    for step in range(int(seconds * fps)):
+        detections = []
+        for counter_id, area in counter_positions.items():
+            line = lines[counter_id]
+            if rng.random() < 1.0 / (arrival_seconds * fps):
+                line.append([next_track, rng.uniform(*service_seconds)])
+                next_track += 1
+            if line:
+                line[0][1] -= 1.0 / fps
+                if line[0][1] <= 0:
+                    line.pop(0)
+            for position, (track_id, _) in enumerate(line):
+                x = area["x"] + area["width"] // 2
+                y = area["y"] + min(40 + 60 * position, area["height"] - 10)
+                detections.append({'bbox': [x - 20, y - 40, 40, 80], 'confidence': 0.9,
+                                   'center': [x, y], 'track_id': track_id})
+        yield start_time + step / fps, detections
+
+def benchmark_offline_processing(args):
+    """Headless offline throughput on a synthetic 720p video, with and without annotated output"""
+    import tempfile
+    from utils.clock import ManualClock
+
+    config = load_config(args.config)
+    num_frames = max(60, args.repeats)
+    fps = 15
+    detections = [{'bbox': [x, 200, 60, 160], 'confidence': 0.9, 'center': [x + 30, 280]}
+                  for x in (150, 400, 650, 900)]
+
+    print(f"Offline processing of {num_frames} frames at 1280x720, {fps} FPS (fake detector)")
+    print(f"{'mode':>16} {'frames':>7} {'FPS':>8} {'x real time':>12}")
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.chdir(temp_dir)  # history stores and reports land in the temp dir
+        try:
+            import main as app
+            video_path = os.path.join(temp_dir, "input.avi")
+            write_synthetic_video(video_path, num_frames, fps)
+            config_path = os.path.join(temp_dir, "config.json")
+            with open(config_path, 'w') as f:
+                json.dump(config, f)
+
+            for name, output_path in (('analytics only', None), ('annotated video', "output.avi")):
+                system = app.QueueManagementSystem(config_path, clock=ManualClock())
+                system.headless = True
+                system.detector.detect_persons = lambda frame: list(detections)
+                summary = system.run_offline(video_path, output_path=output_path, start_time=1714550400.0)
+                print(f"{name:>16} {summary['frames']:>7} {summary['processed_fps']:>8.1f} "
+                      f"{summary['realtime_factor']:>11.1f}x")
+        finally:
+            os.chdir(cwd)
+
+def benchmark_replay(args):
+    """Re-analyse a synthetic 4-hour, 8-counter shift of recorded detections"""
+    import tempfile
+    from replay.replay_engine import ReplayEngine
+
+    config = load_config(args.config)
+    positions, _, _ = make_counter_scene(8, width=1280, height=720)
+    config["counters"]["total_counters"] = len(positions)
+    config["counters"]["counter_positions"] = positions
+    hours = 4
+
+    print(f"Replay of {hours} h of detections at 2 FPS, 8 counters")
+    print(f"{'snapshots':>10} {'records':>8} {'wall s':>8} {'x real time':>12} {'served':>7} {'alerts':>7}")
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.chdir(temp_dir)  # history stores and the customer journal land in the temp dir
+        try:
+            for save_interval in (None, config["analytics"].get("save_interval", 60)):
+                engine = ReplayEngine(config, save_interval=save_interval)
+                summary = engine.run(make_shopping_day(positions, hours * 3600))
+                engine.close()
+                label = "off" if save_interval is None else f"every {save_interval}s"
+                print(f"{label:>10} {summary['records']:>8} {summary['wall_seconds']:>8.2f} "
+                      f"{summary['speedup']:>11.0f}x "
+                      f"{summary['queue_metrics']['total_customers_served']:>7} {summary['alerts']:>7}")
+        finally:
+            os.chdir(cwd)
+
+def benchmark_detection_recording(args):
+    """Size and speed of detection recordings against JSON lines, and replay from a recording"""
+    import tempfile
+    from replay.detection_recording import DetectionRecorder, DetectionRecording
+    from replay.replay_engine import ReplayEngine
+
+    config = load_config(args.config)
+    positions, _, _ = make_counter_scene(8, width=1280, height=720)
+    config["counters"]["total_counters"] = len(positions)
+    config["counters"]["counter_positions"] = positions
+    hours = 4
+    frames = list(make_shopping_day(positions, hours * 3600))
+    num_detections = sum(len(detections) for _, detections in frames)
+
+    print(f"{hours} h at 2 FPS, 8 counters: {len(frames)} frames, {num_detections} detections")
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.chdir(temp_dir)
+        try:
+            json_path = os.path.join(temp_dir, "detections.jsonl")
+            start = time.perf_counter()
+            with open(json_path, 'w') as f:
+                for timestamp, detections in frames:
+                    f.write(json.dumps({'ts': timestamp, 'detections': detections}, separators=(',', ':')) + '\n')
+            json_write = time.perf_counter() - start
+            start = time.perf_counter()
+            with open(json_path, 'r') as f:
+                for line in f:
+                    json.loads(line)
+            json_read = time.perf_counter() - start
+
+            path = os.path.join(temp_dir, "detections.qdr")
+            start = time.perf_counter()
+            recorder = DetectionRecorder(path, frame_shape=(720, 1280, 3))
+            for timestamp, detections in frames:
+                recorder.record(timestamp, detections)
+            recorder.close()
+            record_write = time.perf_counter() - start
+            start = time.perf_counter()
+            recording = DetectionRecording(path)
+            record_open = time.perf_counter() - start
+            start = time.perf_counter()
+            for _ in recording:
+                pass
+            record_read = time.perf_counter() - start
+            seek_time = time_call(lambda: recording.frame(recording.frame_at(frames[len(frames) // 2][0])),
+                                  args.repeats)
+
+            print(f"{'format':>12} {'size MB':>8} {'write s':>8} {'read s':>8}")
+            print(f"{'JSON lines':>12} {os.path.getsize(json_path) / 2**20:>8.2f} {json_write:>8.2f} {json_read:>8.2f}")
+            print(f"{'recording':>12} {os.path.getsize(path) / 2**20:>8.2f} {record_write:>8.2f} {record_read:>8.2f}")
+            print(f"Open (memory map): {record_open * 1000:.2f} ms, seek to a timestamp: {seek_time * 1e6:.1f} us")
+
+            engine = ReplayEngine(config, frame_shape=recording.frame_shape)
+            summary = engine.run(recording)
+            engine.close()
+            print(f"Replay from recording: {summary['wall_seconds']:.2f}s, {summary['speedup']:.0f}x real time")
+            recording.close()
+        finally:
+            os.chdir(cwd)
+
+class SyntheticBatchDetector:
+    """CPU stand-in for YOLO: a fixed cost per model call plus a matrix product per image"""
+
+    def __init__(self, config):
+        rng = np.random.default_rng(0)
+        self.call_weights = (rng.standard_normal((384, 384)) * 0.05).astype(np.float32)
+        self.image_weights = rng.standard_normal((128 * 128, 512)).astype(np.float32)
+
+    def wait_until_ready(self, timeout=None):
+        return True
+
+    def detect_batch(self, images):
+        hidden = self.call_weights
+        for _ in range(2):
+            hidden = np.tanh(hidden @ self.call_weights)
+        features = np.stack([cv2.resize(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), (128, 128),
+                                        interpolation=cv2.INTER_AREA).reshape(-1) for image in images])
+        scores = (features.astype(np.float32) / 255) @ self.image_weights
+        return [[{'bbox': [0, 0, 40, 80], 'confidence': float(abs(row[0])) % 1, 'center': [20, 40]}]
+                for row in scores]
+
+def run_streams(num_streams, frames_per_stream, detect_fns, frame):
+    """Run one thread per stream calling its detect function; returns (seconds, latencies)"""
+    import threading
+    latencies = [[] for _ in range(num_streams)]
+
+    def stream(index):
+        for _ in range(frames_per_stream):
+            start = time.perf_counter()
+            detect_fns[index](frame)
+            latencies[index].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=stream, args=(i,)) for i in range(num_streams)]
+    start_time = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start_time, [value for values in latencies for value in values]
+
+def benchmark_inference_server(args):
+    """Aggregate FPS and latency for 1 to 16 streams: a model per stream versus one batching server"""
+    from detector.inference_server import InferenceServer
+    from detector.person_detector import PersonDetector
+    from utils.lazy_import import module_available
+
+    config = load_config(args.config)
+    config["detection"]["inference_server"] = dict(config["detection"].get("inference_server", {}),
+                                                   max_frame_shape=[720, 1280, 3])
+    if module_available("ultralytics"):
+        factory, model_name = PersonDetector, "YOLO"
+    else:
+        factory, model_name = SyntheticBatchDetector, "synthetic model (ultralytics not installed)"
+    frame = np.random.default_rng(0).integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+    frames_per_stream = max(5, args.repeats // 10)
+    stream_counts = (1, 2, 4, 8, 16)
+
+    server = InferenceServer(config, detector_factory=factory, max_clients=max(stream_counts))
+    server.start()
+    clients = [server.client() for _ in range(max(stream_counts))]
+
+    print(f"{frames_per_stream} frames per 720p stream, {model_name}, "
+          f"server batches up to {server.max_batch_size} with {server.max_wait * 1000:.0f} ms wait")
+    print(f"{'streams':>7} {'mode':>12} {'total FPS':>10} {'p50 ms':>8} {'p95 ms':>8} {'batch':>6}")
+    try:
+        for num_streams in stream_counts:
+            detectors = [factory(config) for _ in range(num_streams)]
+            for detector in detectors:
+                detector.wait_until_ready()
+            per_stream = [lambda image, d=detector: d.detect_batch([image]) for detector in detectors]
+            shared = [client.detect for client in clients[:num_streams]]
+
+            for mode, detect_fns in (("per-stream", per_stream), ("server", shared)):
+                for client in clients:
+                    client.batch_sizes.clear()
+                seconds, latencies = run_streams(num_streams, frames_per_stream, detect_fns, frame)
+                batch_sizes = [size for client in clients[:num_streams] for size in client.batch_sizes]
+                batch = f"{np.mean(batch_sizes):.1f}" if mode == "server" else "1"
+                print(f"{num_streams:>7} {mode:>12} {len(latencies) / seconds:>10.1f} "
+                      f"{np.percentile(latencies, 50) * 1000:>8.1f} {np.percentile(latencies, 95) * 1000:>8.1f} "
+                      f"{batch:>6}")
+    finally:
+        server.stop()
+
+def make_yolo_output(people, anchors=8400, classes=80, size=640, seed=0):
+    """Raw YOLOv8 output (4 + classes, anchors) with a cluster of overlapping anchors per person
+
+    people is a list of (x1, y1, x2, y2) boxes in letterboxed pixels.
+    """
+    rng = np.random.default_rng(seed)
+    output = np.zeros((4 + classes, anchors), dtype=np.float32)
+    output[0:2] = rng.uniform(0, size, (2, anchors))
+    output[2:4] = rng.uniform(10, 100, (2, anchors))
+    output[4:] = rng.uniform(0, 0.2, (classes, anchors))
+
+    slots = rng.permutation(anchors)
+    for i, (x1, y1, x2, y2) in enumerate(people):
+        cluster = slots[i * 8:(i + 1) * 8]
+        jitter = rng.uniform(-3, 3, (4, len(cluster)))
+        output[0, cluster] = (x1 + x2) / 2 + jitter[0]
+        output[1, cluster] = (y1 + y2) / 2 + jitter[1]
+        output[2, cluster] = x2 - x1 + jitter[2]
+        output[3, cluster] = y2 - y1 + jitter[3]
+        output[4, cluster] = rng.uniform(0.55, 0.8, len(cluster))
+        output[4, cluster[0]] = 0.9  # the exact box wins NMS
+        output[:4, cluster[0]] = [(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1]
+    return output
+
+def bbox_iou(first, second):
+    """IoU of two [x, y, width, height] boxes"""
+    x1, y1 = max(first[0], second[0]), max(first[1], second[1])
+    x2 = min(first[0] + first[2], second[0] + second[2])
+    y2 = min(first[1] + first[3], second[1] + second[3])
+    intersection = max(0, x2 - x1) * max(0, y2 - y1)
+    union = first[2] * first[3] + second[2] * second[3] - intersection
+    return intersection / union if union > 0 else 0.0
+
+def match_detections(reference, detections, iou_threshold=0.5):
+    """IoUs of greedy one-to-one matches between two detection lists"""
+    unmatched = list(detections)
+    ious = []
+    for expected in sorted(reference, key=lambda d: -d['confidence']):
+        scored = [(bbox_iou(expected['bbox'], d['bbox']), i) for i, d in enumerate(unmatched)]
+        if scored:
+            iou, index = max(scored)
+            if iou >= iou_threshold:
+                ious.append(iou)
+                unmatched.pop(index)
+    return ious
+
+def read_clip(path, max_frames):
+    """Up to max_frames frames of a video file"""
+    capture = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < max_frames:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        frames.append(frame)
+    capture.release()
+    return frames
+
+def benchmark_detector_backends(args):
+    """Pre/post-processing cost, then FPS and agreement with the PyTorch path for each backend on one clip"""
+    import tempfile
+    from detector.backends import BACKENDS, available_backends, decode_yolov8, images_to_blob, letterbox
+
+    config = load_config(args.config)["detection"]
+    input_size = config.get("input_size", 640)
+    frame = np.random.default_rng(0).integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+    padded, scale, pad = letterbox(frame, input_size)
+    people = [(40 + 70 * i, 200, 90 + 70 * i, 330) for i in range(8)]
+    output = make_yolo_output(people, size=input_size)
+    assert len(decode_yolov8(output, scale, pad, frame.shape, nms_threshold=config.get("nms_threshold", 0.4))) == 8
+
+    preprocess = time_call(lambda: images_to_blob([letterbox(frame, input_size)[0]]), args.repeats)
+    decode = time_call(lambda: decode_yolov8(output, scale, pad, frame.shape), args.repeats)
+    print(f"720p letterbox + blob: {preprocess * 1e3:.2f} ms, "
+          f"decode + NMS of {output.shape[1]} anchors: {decode * 1e3:.2f} ms")
+
+    installed = available_backends()
+    if "ultralytics" not in installed:
+        print("Backend comparison skipped: ultralytics is needed for the PyTorch reference and the model export")
+        return
+
+    max_frames = max(10, args.repeats // 4)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if args.video:
+            frames, clip = read_clip(args.video, max_frames), args.video
+        else:
+            # Without people YOLO finds little; pass --video for a meaningful accuracy comparison
+            clip = os.path.join(temp_dir, "clip.avi")
+            write_synthetic_video(clip, max_frames)
+            frames, clip = read_clip(clip, max_frames), "synthetic clip"
+
+    print(f"\n{len(frames)} frames of {clip}, agreement with ultralytics at IoU >= 0.5")
+    print(f"{'backend':>12} {'load s':>7} {'FPS':>7} {'boxes':>6} {'recall':>7} {'precision':>10} {'mean IoU':>9}")
+    reference = None
+    for name in ("ultralytics", "onnxruntime", "openvino"):
+        if name not in installed:
+            print(f"{name:>12} not installed")
+            continue
+        backend = BACKENDS[name](config)
+        start_time = time.perf_counter()
+        try:
+            backend.load()
+            backend.detect(frames[0])  # warm-up
+        except Exception as e:
+            print(f"{name:>12} failed to load: {e}")
+            continue
+        load_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        detections = [backend.detect(frame) for frame in frames]
+        fps = len(frames) / (time.perf_counter() - start_time)
+        if reference is None:
+            reference = detections
+
+        ious = [iou for expected, found in zip(reference, detections) for iou in match_detections(expected, found)]
+        expected_count = sum(len(d) for d in reference)
+        found_count = sum(len(d) for d in detections)
+        recall = len(ious) / expected_count if expected_count else 1.0
+        precision = len(ious) / found_count if found_count else 1.0
+        mean_iou = np.mean(ious) if ious else 0.0
+        print(f"{name:>12} {load_time:>7.2f} {fps:>7.1f} {found_count:>6} {recall:>7.3f} {precision:>10.3f} {mean_iou:>9.3f}")
+
+STARTUP_SCRIPT = """
+import json, sys, time
+start_time = time.perf_counter()
+sys.path.insert(0, {repo!r})
+import numpy as np
+import main as app
+imported = time.perf_counter()
+system = app.QueueManagementSystem({config!r})
+initialized = time.perf_counter()
+system.process_frame(np.zeros((720, 1280, 3), dtype=np.uint8))
+first_frame = time.perf_counter()
+system.detector.wait_until_ready()
+ready = time.perf_counter()
+system.report_generator.close()
+print("STARTUP " + json.dumps([imported - start_time, initialized - start_time,
+                               first_frame - start_time, ready - start_time]))
+"""
+
+def parse_importtime(stderr):
+    """(cumulative microseconds, module) of top-level imports from -X importtime output"""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):  # nested imports are indented
+            imports.append((int(cumulative), name.strip()))
+    return imports
+
+def benchmark_startup(args):
+    """Import time of main and time to first frame with lazy versus eager heavy imports"""
+    import subprocess
+    import tempfile
+    from utils.lazy_import import module_available
+
+    repo = os.path.dirname(os.path.abspath(__file__))
+    heavy = [name for name in ("scipy.optimize", "pandas", "seaborn", "matplotlib.pyplot")
+             if module_available(name.split(".")[0])]
+    repeats = max(1, args.repeats // 40)
+
+    print(f"python -X importtime, {repeats} run(s) each")
+    print(f"{'imports':>8} {'main':>10}  slowest")
+    for name, preload in (('lazy', []), ('eager', heavy)):
+        code = "".join(f"import {module}; " for module in preload) + "import main"
+        totals = []
+        for _ in range(repeats):
+            result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=repo,
+                                    capture_output=True, text=True, check=True)
+            imports = parse_importtime(result.stderr)
+            totals.append(sum(cumulative for cumulative, _ in imports))
+        slowest = ", ".join(f"{module} {cumulative / 1e3:.0f} ms" for cumulative, module in sorted(imports)[-3:][::-1])
+        print(f"{name:>8} {np.median(totals) / 1e3:>7.0f} ms  {slowest}")
+
+    print("\nTime from interpreter start (1280x720 frame, median)")
+    print(f"{'model load':>11} {'imported':>10} {'init':>10} {'first frame':>12} {'detector ready':>15}")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for name, async_load in (('blocking', False), ('background', True)):
+            config = load_config(args.config)
+            config["detection"]["async_model_load"] = async_load
+            config_path = os.path.join(temp_dir, f"config_{name}.json")
+            with open(config_path, 'w') as f:
+                json.dump(config, f)
+
+            # Run in the temp dir so history stores and reports land there
+            script = STARTUP_SCRIPT.format(repo=repo, config=config_path)
+            timings = []
+            for _ in range(repeats):
+                result = subprocess.run([sys.executable, "-c", script], cwd=temp_dir,
+                                        capture_output=True, text=True, check=True)
+                line = [l for l in result.stdout.splitlines() if l.startswith("STARTUP ")][-1]
+                timings.append(json.loads(line[len("STARTUP "):]))
+            imported, initialized, first_frame, ready = np.median(np.array(timings), axis=0) * 1e3
+            print(f"{name:>11} {imported:>7.0f} ms {initialized:>7.0f} ms {first_frame:>9.0f} ms {ready:>12.0f} ms")
+
+BENCHMARKS = {
+    'yolo_extraction': benchmark_yolo_extraction,
+    'roi_inference': benchmark_roi_inference,
+    'tracking': benchmark_tracking,
+    'customer_records': benchmark_customer_records,
+    'queue_snapshots': benchmark_queue_snapshots,
+    'counter_assignment': benchmark_counter_assignment,
+    'service_stats': benchmark_service_stats,
+    'performance_history': benchmark_performance_history,
+    'history_queries': benchmark_history_queries,
+    'snapshot_journal': benchmark_snapshot_journal,
+    'retention': benchmark_retention,
+    'chart_rendering': benchmark_chart_rendering,
+    'startup': benchmark_startup,
+    'interface_rendering': benchmark_interface_rendering,
+    'frame_annotation': benchmark_frame_annotation,
+    'offline_processing': benchmark_offline_processing,
+    'replay': benchmark_replay,
+    'detection_recording': benchmark_detection_recording,
+    'inference_server': benchmark_inference_server,
+    'detector_backends': benchmark_detector_backends,
+}
+
+def main():
+    """Main benchmark function"""
+    parser = argparse.ArgumentParser(description='Queue Management System benchmarks')
+    parser.add_argument('benchmarks', nargs='*',
+                        help=f"Benchmarks to run: {', '.join(sorted(BENCHMARKS))} (default: all)")
+    parser.add_argument('--repeats', type=int, default=200, help='Timed repetitions per case')
+    parser.add_argument('--config', type=str, default='config.json', help='Configuration file path')
+    parser.add_argument('--video', type=str, help='Clip for detector_backends (default: synthetic)')
+
+    args = parser.parse_args()
+    
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    for name in args.benchmarks or sorted(BENCHMARKS):
+        print(f"\n=== {name} ===")
+        BENCHMARKS[name](args)
+
+if __name__ == "__main__":
+    main()
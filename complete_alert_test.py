@@ -31,6 +31,7 @@ def test_complete_system():
     # Initialize all components
     print("Initializing components...")
     detector = PersonDetector(config)
+    detector.wait_until_ready()
     queue_manager = QueueManager(config)
     interface_manager = InterfaceManager(config)
     alert_system = SimpleAlertSystem(config)
@@ -47,6 +47,7 @@ def run_full_demo():
     # Create components
     print("🔧 Initializing components...")
     detector = PersonDetector(config)
+    detector.wait_until_ready()
     queue_manager = QueueManager(config)
     interface_manager = InterfaceManager(config)
     alert_system = AlertSystem(config)
@@ -97,6 +97,7 @@ def run_demo_with_builtin_alerts():
     # Initialize components
     print("Initializing components...")
     detector = PersonDetector(config)
+    detector.wait_until_ready()
     queue_manager = QueueManager(config)
     interface_manager = InterfaceManager(config)
     alert_system = BuiltInAlertSystem()
@@ -241,6 +241,7 @@ def test_basic_functionality():
         
         # Test detector creation
         detector = PersonDetector(config)
+        detector.wait_until_ready()
         print("✓ PersonDetector created")
         
         # Test queue manager creation
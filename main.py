@@ -11,21 +11,33 @@ import time
 from datetime import datetime
 import sys
 import os
+import tempfile
 
 # Add src directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 from detector.person_detector import PersonDetector
+from detector.motion_gate import MotionGate
 from queue_management.queue_manager import QueueManager
 from visual.interface_manager import InterfaceManager
 from analytics.performance_monitor import PerformanceMonitor
 from analytics.report_generator import ReportGenerator
+from pipeline.frame_pipeline import FramePipeline
+from visual.frame_pool import FramePool
+from utils.clock import SystemClock, ManualClock
+from storage.history import open_history_store
+from storage.retention import RetentionManager
+from replay.detection_recording import DetectionRecorder, DetectionRecording, DetectionReplaySource
+from replay.replay_engine import ReplayEngine, replay_config
+from supervisor.camera_supervisor import CameraSupervisor
 
 # Built-in Alert System for Main Application
 class MainAlertSystem:
     """Built-in alert system for main.py - guaranteed to work"""
     
-    def __init__(self, config=None):
+    def __init__(self, config=None, clock=None):
+        self.clock = clock or SystemClock()
+        
         # Get alert settings from config
         if config and "performance" in config:
             alert_config = config["performance"].get("service_time_alert", {})
@@ -45,9 +57,9 @@ class MainAlertSystem:
         print(f"   - Sound: {'ON' if self.sound_enabled else 'OFF'}")
     
     def draw_alerts(self, frame, queue_data):
-        """Draw alerts on frame and handle audio"""
+        """Draw alerts on frame in place and handle audio"""
         self.counter += 1
-        current_time = time.time()
+        current_time = self.clock.time()
         
         alert_y = 80  # Start position for alerts
         
@@ -112,25 +124,56 @@ class MainAlertSystem:
 class QueueManagementSystem:
     """Main application class for the queue management system"""
     
-    def __init__(self, config_path="config.json"):
-        """Initialize the queue management system"""
+    def __init__(self, config_path="config.json", clock=None, detector=None, inference_client=None):
+        """Initialize the queue management system
+        
+        config_path may also be a config dict, as camera workers receive it.
+        clock drives queue and analytics timing: wall-clock time by default,
+        a ManualClock set from video timestamps for offline processing.
+        detector replaces the PersonDetector, e.g. with a DetectionReplaySource.
+        inference_client sends frames to a shared InferenceServer instead of
+        loading a model in this process.
+        """
+        self.startup_time = time.time()
+        self.first_frame_time = None
         self.config = self.load_config(config_path)
+        self.clock = clock or SystemClock()
         self.running = False
-        
-        # Initialize components
-        self.detector = PersonDetector(self.config)
-        self.queue_manager = QueueManager(self.config)
-        self.interface_manager = InterfaceManager(self.config)
-        self.performance_monitor = PerformanceMonitor(self.config)
-        self.report_generator = ReportGenerator(self.config)
-        self.alert_system = MainAlertSystem(self.config)
+        self.headless = False
+        self.offline = False
+        
+        # Initialize components; the detector loads its model in the
+        # background while the rest of the system and the camera start
+        self.detector = detector or PersonDetector(self.config, self.clock, inference_client)
+        self.motion_gate = MotionGate(self.config)
+        if isinstance(self.detector, DetectionReplaySource):
+            # Recorded detections already reflect the gate; every frame takes one
+            self.motion_gate.enabled = False
+        self.queue_manager = QueueManager(self.config, self.clock)
+        self.interface_manager = InterfaceManager(self.config, self.clock)
+        self.performance_monitor = PerformanceMonitor(self.config, self.clock)
+        # Each counter's finished services feed its cashier's service time statistics
+        self.queue_manager.on_service_complete = self.performance_monitor.add_service_time
+        self.report_generator = ReportGenerator(self.config, self.clock)
+        self.retention_manager = RetentionManager(self.config, self.report_generator.snapshot_store, self.clock)
+        self.alert_system = MainAlertSystem(self.config, self.clock)
         
         # Load counter positions from config
         self.counter_positions = self.load_counter_positions()
         
-        # Video capture
+        # Video capture into reused frame buffers
         self.cap = None
+        self.video_path = None
+        self.capture_shape = None
+        self.frame_pool = FramePool(self.config.get("pipeline", {}).get("frame_pool_size", 8))
         self.frame_count = 0
+        self.last_detections = []
+        self.recorder = None
+        self.on_queue_update = None  # called with each frame's queue data
+        
+        # Threaded pipeline (optional)
+        self.pipeline = None
+        self.detection_lock = threading.Lock()
         
         # Threading
         self.analytics_thread = None
@@ -140,6 +183,8 @@ class QueueManagementSystem:
     
     def load_config(self, config_path):
         """Load configuration from JSON file"""
+        if isinstance(config_path, dict):
+            return config_path
         try:
             with open(config_path, 'r') as f:
                 return json.load(f)
@@ -216,59 +261,130 @@ class QueueManagementSystem:
         
         self.analytics_thread.start()
         self.report_thread.start()
+        
+        if self.config["analytics"].get("retention", {}).get("enabled", True):
+            self.retention_thread = threading.Thread(target=self.retention_worker, daemon=True)
+            self.retention_thread.start()
     
     def analytics_worker(self):
         """Background worker for analytics processing"""
         while self.running:
             try:
-                # Update performance metrics
-                self.performance_monitor.update_metrics()
-                
-                # Check for alerts
-                alerts = self.performance_monitor.check_alerts()
-                if alerts:
-                    self.interface_manager.add_alerts(alerts)
-                
+                self.run_analytics_step()
                 time.sleep(1)  # Update every second
                 
             except Exception as e:
                 print(f"Analytics worker error: {e}")
     
+    def run_analytics_step(self):
+        """Update performance metrics and raise alerts"""
+        self.performance_monitor.update_metrics()
+        
+        alerts = self.performance_monitor.check_alerts()
+        if alerts:
+            self.interface_manager.add_alerts(alerts)
+    
     def report_worker(self):
         """Background worker for report generation"""
         while self.running:
             try:
-                # Generate periodic reports
-                self.report_generator.generate_hourly_report()
-                
-                # Save data
-                self.queue_manager.save_queue_data()
-                self.performance_monitor.save_performance_data()
-                
+                self.run_report_step()
                 time.sleep(self.config["analytics"]["save_interval"])
                 
             except Exception as e:
                 print(f"Report worker error: {e}")
     
+    def run_report_step(self):
+        """Generate the periodic report and save queue and performance data"""
+        self.report_generator.generate_hourly_report()
+        self.queue_manager.save_queue_data()
+        self.performance_monitor.save_performance_data()
+    
+    def retention_worker(self):
+        """Background worker compacting and expiring old data in paced batches"""
+        while self.running:
+            try:
+                report = self.retention_manager.run(should_stop=lambda: not self.running)
+                if report['batches']:
+                    print(f"Retention: {RetentionManager.format_report(report)}")
+            except Exception as e:
+                print(f"Retention worker error: {e}")
+            
+            # Sleep in short steps so shutdown is not delayed
+            next_run = time.time() + self.retention_manager.interval_seconds
+            while self.running and time.time() < next_run:
+                time.sleep(1)
+    
     def process_frame(self, frame):
         """Process a single frame for queue management"""
-        self.frame_count += 1
+        detections = self.detect_frame(frame)
+        return self.render_frame(frame, detections)
+    
+    def detect_frame(self, frame):
+        """Detect persons in frame, reusing the last result while nothing moves"""
+        if not self.detector.model_ready.is_set():
+            # Model still warming up: show the frame without detections,
+            # and keep the motion gate's reference for the first real one
+            return self.detector.detect_persons(frame)
+        
+        with self.detection_lock:
+            needs_detection = self.motion_gate.should_detect(frame)
+            if not needs_detection:
+                return self.last_detections
         
-        # Detect persons in frame
         detections = self.detector.detect_persons(frame)
         
+        with self.detection_lock:
+            self.last_detections = detections
+        
+        return detections
+    
+    def analyze_frame(self, frame, detections):
+        """Update tracks, queues and analytics from detections; returns queue data"""
+        self.frame_count += 1
+        if self.first_frame_time is None:
+            self.first_frame_time = time.time() - self.startup_time
+            ready = "ready" if self.detector.model_ready.is_set() else "still loading"
+            print(f"✓ First frame {self.first_frame_time:.2f}s after startup (detector {ready})")
+        
+        # Assign stable track IDs so customers keep one identity per visit
+        self.detector.track_persons(detections)
+        
+        if self.recorder:
+            self.recorder.record(self.clock.time(), detections, frame.shape)
+        
         # Update queue information
         queue_data = self.queue_manager.update_queues(detections, frame.shape)
         
         # Update performance metrics
         self.performance_monitor.update_frame_data(queue_data, detections)
+        self.performance_monitor.update_motion_gate_stats(self.motion_gate.get_stats())
+        
+        if self.on_queue_update:
+            self.on_queue_update(queue_data)
         
-        # Draw visual interface
+        return queue_data
+    
+    def start_recording(self, path):
+        """Record every frame's tracked detections to path, for later replay"""
+        self.recorder = DetectionRecorder(path, metadata={'counters': self.config.get("counters", {})})
+        print(f"✓ Recording detections to {path}")
+    
+    def render_frame(self, frame, detections):
+        """Update queues and analytics from detections and draw the interface"""
+        queue_data = self.analyze_frame(frame, detections)
+        
+        # Draw visual interface: on the frame itself, or on a pooled copy
+        # when the clean frame is still needed
+        if self.interface_manager.annotation_mode == "in_place":
+            out = frame
+        else:
+            out = self.frame_pool.acquire(frame.shape, frame.dtype)
         annotated_frame = self.interface_manager.draw_interface(
-            frame, detections, queue_data, self.performance_monitor.get_current_metrics()
+            frame, detections, queue_data, self.performance_monitor.get_current_metrics(), out=out
         )
         
-        # Draw alerts on top (built-in system handles timing automatically)
+        # Draw alerts on top, in place (built-in system handles timing automatically)
         annotated_frame = self.alert_system.draw_alerts(annotated_frame, queue_data)
         
         return annotated_frame
@@ -284,52 +400,239 @@ class QueueManagementSystem:
             if not self.initialize_camera(camera_id):
                 return
         
+        self.video_path = video_path
         self.running = True
         self.start_background_threads()
         
         print("System running. Press 'q' to quit, 's' to save report, 'r' to reset counters")
         
+        try:
+            if self.config.get("pipeline", {}).get("enabled", False):
+                self.run_pipeline()
+            else:
+                self.run_serial()
+                
+        except KeyboardInterrupt:
+            print("\nShutdown requested by user")
+        
+        finally:
+            self.cleanup()
+    
+    def read_frame(self):
+        """Read the next frame into a pooled buffer, looping video files"""
+        buffer = self.frame_pool.acquire(self.capture_shape) if self.capture_shape else None
+        ret, frame = self.cap.read(buffer)
+        if not ret and self.video_path and not self.offline:
+            # Restart video for continuous loop
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read(buffer)
+        
+        if not ret:
+            self.frame_pool.release(buffer)
+            if not self.offline:
+                print(f"Error: Could not read frame from {'video' if self.video_path else 'camera'}")
+            return None
+        
+        if frame is not buffer:
+            # First frame, or the source changed size
+            self.frame_pool.release(buffer)
+            self.capture_shape = frame.shape
+        return frame
+    
+    def release_frame(self, frame):
+        """Return a frame buffer to the pool once nothing reads it"""
+        self.frame_pool.release(frame)
+    
+    def run_serial(self):
+        """Capture, detect and render on the main thread"""
+        while self.running:
+            frame = self.read_frame()
+            if frame is None:
+                break
+            
+            # Process frame
+            processed_frame = self.process_frame(frame)
+            
+            # Display frame
+            if not self.headless:
+                cv2.imshow('Queue Management System', processed_frame)
+            
+            self.release_frame(frame)
+            if processed_frame is not frame:
+                self.release_frame(processed_frame)
+            
+            if not self.headless and not self.handle_key(cv2.waitKey(1) & 0xFF):
+                break
+    
+    def run_pipeline(self):
+        """Run capture and detection on worker threads, render on the main thread"""
+        self.pipeline = FramePipeline(self.read_frame, self.detect_frame, self.render_frame, self.config,
+                                      release_frame=self.release_frame)
+        self.pipeline.start()
+        
+        stats_interval = self.config.get("pipeline", {}).get("stats_interval", 10)
+        last_stats_time = time.time()
+        
+        print(f"Threaded pipeline started with {self.pipeline.num_workers} detection worker(s)")
+        
+        while self.running:
+            processed_frame = self.pipeline.render_next()
+            if processed_frame is None:
+                if self.pipeline.finished:
+                    break
+                continue
+            
+            # Display frame
+            if not self.headless:
+                cv2.imshow('Queue Management System', processed_frame)
+            self.release_frame(processed_frame)
+            
+            if not self.headless and not self.handle_key(cv2.waitKey(1) & 0xFF):
+                break
+            
+            if stats_interval and time.time() - last_stats_time >= stats_interval:
+                print(f"Pipeline: {self.pipeline.format_stats()}")
+                last_stats_time = time.time()
+    
+    def run_offline(self, video_path, output_path=None, start_time=None):
+        """Process a video file once, as fast as possible, on the video's own timestamps
+        
+        Queue and analytics timing follows the frame timestamps, starting at
+        start_time (default: the file's modification time minus its length).
+        The interface is only drawn when writing output_path or showing a
+        window. Returns the throughput summary.
+        """
+        if not isinstance(self.clock, ManualClock):
+            raise ValueError("Offline processing needs the system created with a ManualClock")
+        if isinstance(self.detector, DetectionReplaySource) and self.detector.clock is not None:
+            raise ValueError("Offline processing drives the clock from the video; "
+                             "create the DetectionReplaySource without a clock")
+        
+        self.cap = cv2.VideoCapture(video_path)
+        if not self.cap.isOpened():
+            print(f"Error: Could not open video {video_path}")
+            return None
+        
+        fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if start_time is None:
+            start_time = os.path.getmtime(video_path) - total_frames / fps
+        
+        self.video_path = video_path
+        self.offline = True
+        self.running = True
+        self.clock.set(start_time)
+        
+        # Every frame counts offline: do not start before the model is ready
+        self.detector.wait_until_ready()
+        
+        analytics_interval = 1.0
+        save_interval = self.config["analytics"].get("save_interval", 60)
+        next_analytics = start_time + analytics_interval
+        next_save = start_time + save_interval
+        
+        writer = None
+        frames = 0
+        media_time = 0.0
+        wall_start = time.perf_counter()
+        last_progress = wall_start
+        print(f"Processing {video_path} offline ({total_frames} frames at {fps:.1f} FPS)")
+        
         try:
             while self.running:
-                ret, frame = self.cap.read()
-                if not ret:
-                    if video_path:
-                        # Restart video for continuous loop
-                        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                        continue
-                    else:
-                        print("Error: Could not read frame from camera")
-                        break
+                frame = self.read_frame()
+                if frame is None:
+                    break
                 
-                # Process frame
-                processed_frame = self.process_frame(frame)
+                # Timestamp of the frame just read, falling back to its index
+                position_ms = self.cap.get(cv2.CAP_PROP_POS_MSEC)
+                media_time = position_ms / 1000.0 if position_ms > 0 or frames == 0 else frames / fps
+                now = start_time + media_time
+                self.clock.set(now)
                 
-                # Display frame
-                cv2.imshow('Queue Management System', processed_frame)
+                detections = self.detect_frame(frame)
+                if output_path or not self.headless:
+                    output = self.render_frame(frame, detections)
+                    if output_path:
+                        if writer is None:
+                            writer = self.open_video_writer(output_path, fps, output.shape)
+                        writer.write(output)
+                    if not self.headless:
+                        cv2.imshow('Queue Management System', output)
+                        if not self.handle_key(cv2.waitKey(1) & 0xFF):
+                            self.running = False
+                    if output is not frame:
+                        self.release_frame(output)
+                else:
+                    self.analyze_frame(frame, detections)
+                self.release_frame(frame)
+                frames += 1
                 
-                # Handle key presses
-                key = cv2.waitKey(1) & 0xFF
-                if key == ord('q'):
-                    print("Shutting down...")
-                    break
-                elif key == ord('s'):
-                    print("Generating manual report...")
-                    self.report_generator.generate_manual_report()
-                elif key == ord('r'):
-                    print("Resetting counters...")
-                    self.queue_manager.reset_counters()
-                    self.performance_monitor.reset_metrics()
-                elif key == ord('a'):
-                    # Toggle alert sound
-                    self.alert_system.toggle_sound()
-                elif key == ord('h'):
-                    self.show_help()
+                # Periodic analytics run on video time, as the workers do live
+                if now >= next_analytics:
+                    self.run_analytics_step()
+                    next_analytics = now + analytics_interval
+                if now >= next_save:
+                    self.run_report_step()
+                    next_save = now + save_interval
                 
+                if time.perf_counter() - last_progress >= 10:
+                    last_progress = time.perf_counter()
+                    elapsed = last_progress - wall_start
+                    print(f"Offline: {frames}/{total_frames} frames, {frames / elapsed:.1f} FPS")
+            
+            # Save the tail of the video
+            self.run_analytics_step()
+            self.run_report_step()
+        
         except KeyboardInterrupt:
             print("\nShutdown requested by user")
         
         finally:
+            if writer is not None:
+                writer.release()
+            wall_seconds = time.perf_counter() - wall_start
+            summary = {
+                'frames': frames,
+                'video_seconds': media_time + 1.0 / fps if frames else 0.0,
+                'wall_seconds': wall_seconds
+            }
+            summary['processed_fps'] = frames / wall_seconds if wall_seconds > 0 else 0.0
+            summary['realtime_factor'] = summary['video_seconds'] / wall_seconds if wall_seconds > 0 else 0.0
+            print(f"Processed {frames} frames ({summary['video_seconds']:.1f}s of video) in {wall_seconds:.1f}s: "
+                  f"{summary['processed_fps']:.1f} FPS, {summary['realtime_factor']:.2f}x real time")
             self.cleanup()
+        
+        return summary
+    
+    @staticmethod
+    def open_video_writer(output_path, fps, frame_shape):
+        """Video writer for annotated output, codec chosen by file extension"""
+        codec = 'mp4v' if output_path.lower().endswith('.mp4') else 'MJPG'
+        height, width = frame_shape[:2]
+        writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*codec), fps, (width, height))
+        if not writer.isOpened():
+            raise IOError(f"Could not open output video {output_path}")
+        return writer
+    
+    def handle_key(self, key):
+        """Handle key presses, returns False when the user quits"""
+        if key == ord('q'):
+            print("Shutting down...")
+            return False
+        elif key == ord('s'):
+            print("Generating manual report...")
+            self.report_generator.generate_manual_report()
+        elif key == ord('r'):
+            print("Resetting counters...")
+            self.queue_manager.reset_counters()
+            self.performance_monitor.reset_metrics()
+        elif key == ord('a'):
+            # Toggle alert sound
+            self.alert_system.toggle_sound()
+        elif key == ord('h'):
+            self.show_help()
+        return True
     
     def show_help(self):
         """Display help information"""
@@ -362,17 +665,76 @@ class QueueManagementSystem:
         """Clean up resources"""
         self.running = False
         
+        if self.pipeline:
+            self.pipeline.stop()
+            print(f"Pipeline: {self.pipeline.format_stats()}")
+        
+        pool_stats = self.frame_pool.get_stats()
+        print(f"Frame pool: {pool_stats['allocations']} buffers allocated, {pool_stats['reuses']} reuses")
+        
         if self.cap:
             self.cap.release()
         
-        cv2.destroyAllWindows()
+        if self.recorder:
+            self.recorder.close()
+            print(f"Recorded {len(self.recorder.frames)} frames "
+                  f"({self.recorder.detection_count} detections) to {self.recorder.path}")
+        
+        if not self.headless:
+            cv2.destroyAllWindows()
+        
+        if self.motion_gate.enabled:
+            stats = self.motion_gate.get_stats()
+            print(f"Motion gate skipped {stats['frames_skipped']}/{stats['frames_processed']} "
+                  f"detections ({stats['skip_ratio']:.1%})")
         
         # Generate final report
         print("Generating final report...")
         self.report_generator.generate_final_report()
+        self.report_generator.close()
+        
+        # Close the shared history store (seals the active journal segment)
+        self.report_generator.snapshot_store.close()
         
         print("Queue Management System shutdown complete.")
 
+def run_retention_dry_run(config_path):
+    """Report what data retention would compact and delete, without changing anything"""
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+    
+    retention_manager = RetentionManager(config, open_history_store(config["analytics"]))
+    retention_manager.max_batches = float('inf')  # survey everything
+    retention_manager.pause_seconds = 0
+    report = retention_manager.run(dry_run=True)
+    print(RetentionManager.format_report(report))
+    return report
+
+def run_detection_replay(config_path, recording_path, store_dir=None):
+    """Re-run queue and performance analytics over a detection recording, without video or inference
+    
+    Snapshots and the customer journal go to store_dir, never the live
+    history; without store_dir nothing is kept.
+    """
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        save_interval = config["analytics"].get("save_interval", 60) if store_dir else None
+        config = replay_config(config, store_dir or temp_dir)
+        recording = DetectionRecording(recording_path)
+        engine = ReplayEngine(config, frame_shape=recording.frame_shape or (720, 1280, 3),
+                              save_interval=save_interval)
+        summary = engine.run(recording)
+        engine.close()
+        recording.close()
+    
+    queue_metrics = summary['queue_metrics']
+    print(f"Replayed {summary['records']} frames ({summary['recorded_seconds']:.0f}s recorded) "
+          f"in {summary['wall_seconds']:.2f}s, {summary['speedup']:.0f}x real time")
+    print(f"Customers served: {queue_metrics['total_customers_served']}, alerts: {summary['alerts']}")
+    return summary
+
 def main():
     """Main function"""
     import argparse
@@ -381,11 +743,64 @@ def main():
     parser.add_argument('--camera', type=int, default=0, help='Camera ID (default: 0)')
     parser.add_argument('--video', type=str, help='Path to video file (optional)')
     parser.add_argument('--config', type=str, default='config.json', help='Configuration file path')
+    parser.add_argument('--threaded', action='store_true', help='Use the threaded capture/detect/render pipeline')
+    parser.add_argument('--retention-dry-run', action='store_true',
+                        help='Report what data retention would reclaim, then exit')
+    parser.add_argument('--headless', action='store_true', help='Run without a display window')
+    parser.add_argument('--offline', action='store_true',
+                        help='Process --video once as fast as possible, timed by the video timestamps')
+    parser.add_argument('--output', type=str, help='Write the annotated video here (offline mode)')
+    parser.add_argument('--video-start', type=str,
+                        help='Wall-clock time of the first video frame, e.g. 2024-05-01T09:00:00 '
+                             '(offline mode, default: file modification time minus video length)')
+    parser.add_argument('--record', type=str, help='Record tracked detections to this file for replay')
+    parser.add_argument('--replay', type=str,
+                        help='Replay a detection recording instead of running the detector; '
+                             'analytics only, or with --offline --video to draw it on the video')
+    parser.add_argument('--replay-store', type=str,
+                        help='Directory for the snapshots and customer journal of a --replay '
+                             '(default: not saved)')
+    parser.add_argument('--multi-camera', action='store_true',
+                        help='Run one worker process per entry of the config "cameras" list')
     
     args = parser.parse_args()
     
+    if args.retention_dry_run:
+        run_retention_dry_run(args.config)
+        return
+    
+    if args.multi_camera:
+        with open(args.config, 'r') as f:
+            config = json.load(f)
+        CameraSupervisor(config, QueueManagementSystem).run()
+        return
+    
+    if args.replay and not args.offline:
+        run_detection_replay(args.config, args.replay, args.replay_store)
+        return
+    
+    if args.offline:
+        if not args.video:
+            parser.error("--offline needs --video")
+        start_time = datetime.fromisoformat(args.video_start).timestamp() if args.video_start else None
+        
+        clock = ManualClock()
+        # The video's timestamps drive the clock; the recording only supplies detections
+        detector = DetectionReplaySource(args.replay) if args.replay else None
+        system = QueueManagementSystem(args.config, clock=clock, detector=detector)
+        system.headless = args.headless
+        if args.record:
+            system.start_recording(args.record)
+        system.run_offline(args.video, output_path=args.output, start_time=start_time)
+        return
+    
     # Create system instance
     system = QueueManagementSystem(args.config)
+    system.headless = args.headless
+    if args.record:
+        system.start_recording(args.record)
+    if args.threaded:
+        system.config.setdefault("pipeline", {})["enabled"] = True
     
     # Run the system
     system.run(camera_id=args.camera, video_path=args.video)
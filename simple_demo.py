@@ -125,6 +125,7 @@ def run_simple_demo():
     # Create components
     print("Initializing components...")
     detector = PersonDetector(config)
+    detector.wait_until_ready()
     queue_manager = QueueManager(config)
     interface_manager = InterfaceManager(config)
     alert_system = SimpleAlert()
@@ -0,0 +1,200 @@
+"""
+Chart Renderer Module
+Renders report charts from plain-data specs in a separate process pool
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+
+CHART_FORMATS = ("png", "svg")
+
+def init_render_worker():
+    """Set up a render process: headless backend, low CPU priority"""
+    import matplotlib
+    matplotlib.use('Agg')
+    try:
+        os.nice(10)
+    except (AttributeError, OSError):
+        pass
+
+def render_chart(spec, output_path, dpi, chart_format):
+    """Draw a chart spec and save it; runs in a worker process
+
+    A spec is a dict with 'title', 'grid' (rows, cols), 'figsize', 'style'
+    and a list of 'panels', each with 'type' ('line', 'hist' or 'empty'),
+    'title', optional 'xlabel'/'ylabel' and its data ('x'/'y' or 'values').
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    plt.style.use(spec.get('style', 'default'))
+    rows, cols = spec['grid']
+    fig, axes = plt.subplots(rows, cols, figsize=spec.get('figsize', (6 * cols, 5 * rows)), squeeze=False)
+    fig.suptitle(spec.get('title', ''), fontsize=16)
+
+    for ax, panel in zip(axes.flat, spec['panels']):
+        if panel['type'] == 'line' and panel.get('y'):
+            x = panel.get('x') or list(range(len(panel['y'])))
+            ax.plot(x, panel['y'])
+        elif panel['type'] == 'hist' and panel.get('values'):
+            ax.hist(panel['values'], bins=panel.get('bins', 20), alpha=0.7)
+        elif panel['type'] != 'empty':
+            continue  # no data, leave the axes blank
+        ax.set_title(panel.get('title', ''))
+        if panel.get('xlabel'):
+            ax.set_xlabel(panel['xlabel'])
+        if panel.get('ylabel'):
+            ax.set_ylabel(panel['ylabel'])
+
+    plt.tight_layout()
+    fig.savefig(output_path, dpi=dpi, bbox_inches='tight', format=chart_format)
+    plt.close(fig)
+    return output_path
+
+class ChartRenderer:
+    """Job queue feeding a spawn-based process pool, coalescing repeated outputs"""
+
+    def __init__(self, config):
+        self.use_processes = config.get("use_processes", True)
+        self.workers = config.get("workers", 1)
+        self.dpi = config.get("dpi", 300)
+        self.chart_format = config.get("format", "png")
+        self.timeout_seconds = config.get("timeout_seconds", 120)
+        if self.chart_format not in CHART_FORMATS:
+            raise ValueError(f"Unknown chart format: {self.chart_format}")
+
+        self.pending = OrderedDict()  # output path -> spec, newest spec wins
+        self.in_flight = {}  # output path -> (async result, deadline, spec)
+        self.condition = threading.Condition()
+        self.pool = None
+        self.dispatcher = None
+        self.running = False
+
+        self.stats = {'submitted': 0, 'coalesced': 0, 'rendered': 0, 'failed': 0, 'timeouts': 0}
+
+    def output_path(self, output_base):
+        """Output file path for a base name without extension"""
+        return f"{output_base}.{self.chart_format}"
+
+    def submit(self, spec, output_base):
+        """Queue a chart; a queued chart for the same file is replaced. Returns the path"""
+        output_path = self.output_path(output_base)
+
+        if not self.use_processes:
+            self.render_inline(spec, output_path)
+            return output_path
+
+        with self.condition:
+            self.stats['submitted'] += 1
+            if output_path in self.pending:
+                self.stats['coalesced'] += 1
+            self.pending[output_path] = spec
+            self.start()
+            self.condition.notify_all()
+        return output_path
+
+    def render_inline(self, spec, output_path):
+        """Render in the calling thread"""
+        self.stats['submitted'] += 1
+        try:
+            render_chart(spec, output_path, self.dpi, self.chart_format)
+            self.stats['rendered'] += 1
+        except Exception as e:
+            self.stats['failed'] += 1
+            print(f"Error rendering chart {output_path}: {e}")
+
+    def start(self):
+        """Start the pool and dispatcher thread on first use (condition held)"""
+        if self.running:
+            return
+        self.pool = self.create_pool()
+        self.running = True
+        self.dispatcher = threading.Thread(target=self.dispatch_loop, daemon=True)
+        self.dispatcher.start()
+
+    def create_pool(self):
+        """New spawn-context pool; spawn avoids forking a process with live capture threads"""
+        context = multiprocessing.get_context("spawn")
+        return context.Pool(self.workers, initializer=init_render_worker)
+
+    def dispatch_loop(self):
+        """Feed pending jobs to the pool and collect results"""
+        while True:
+            with self.condition:
+                while self.running and not self.pending and not self.in_flight:
+                    self.condition.wait()
+                if not self.running:
+                    return
+
+                # Start jobs while there are free workers; a file being
+                # rendered is not started twice at once
+                ready = [path for path in self.pending if path not in self.in_flight]
+                for output_path in ready[:max(0, self.workers - len(self.in_flight))]:
+                    spec = self.pending.pop(output_path)
+                    result = self.pool.apply_async(render_chart, (spec, output_path, self.dpi, self.chart_format))
+                    self.in_flight[output_path] = (result, time.time() + self.timeout_seconds, spec)
+
+                self.collect()
+                self.condition.notify_all()
+                self.condition.wait(0.05)
+
+    def collect(self):
+        """Record finished jobs; restart the pool if one overran its timeout (condition held)"""
+        now = time.time()
+        for output_path, (result, deadline, _) in list(self.in_flight.items()):
+            if result.ready():
+                del self.in_flight[output_path]
+                try:
+                    result.get()
+                    self.stats['rendered'] += 1
+                except Exception as e:
+                    self.stats['failed'] += 1
+                    print(f"Error rendering chart {output_path}: {e}")
+            elif now > deadline:
+                print(f"Chart rendering timed out after {self.timeout_seconds}s: {output_path}")
+                self.stats['timeouts'] += 1
+                del self.in_flight[output_path]
+
+                # Killing the pool also kills the other running jobs: queue them again
+                for other_path, (_, _, spec) in self.in_flight.items():
+                    self.pending.setdefault(other_path, spec)
+                self.in_flight.clear()
+                self.pool.terminate()
+                self.pool = self.create_pool()
+                break
+
+    def wait(self, timeout=None):
+        """Block until every queued chart is finished; False on timeout"""
+        deadline = None if timeout is None else time.time() + timeout
+        with self.condition:
+            while self.pending or self.in_flight:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+    def get_stats(self):
+        """Job counters plus current queue depth"""
+        with self.condition:
+            stats = dict(self.stats)
+            stats['queued'] = len(self.pending)
+            stats['in_flight'] = len(self.in_flight)
+        return stats
+
+    def close(self, timeout=None):
+        """Finish queued charts (up to timeout) and shut the pool down"""
+        if not self.running:
+            return
+        self.wait(timeout)
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.dispatcher.join()
+        self.pool.terminate()
+        self.pool.join()
+        self.pool = None
@@ -3,22 +3,28 @@ Performance Monitor Module
 Tracks cashier performance, service times, and system metrics
 """
 
-import time
-import json
-import numpy as np
 from datetime import datetime, timedelta
 from collections import defaultdict, deque
 import os
 
+from .streaming_stats import ServiceTimeStats
+from .timeseries import TimeSeriesStore
+from storage.history import open_history_store
+from utils.clock import SystemClock
+
+TREND_FIELDS = ('customers_served', 'average_service_time', 'active_cashiers')
+
 class CashierPerformance:
     """Individual cashier performance tracking"""
     
-    def __init__(self, cashier_id):
+    def __init__(self, cashier_id, clock=None):
         self.cashier_id = cashier_id
-        self.shift_start = time.time()
+        self.clock = clock or SystemClock()
+        self.shift_start = self.clock.time()
         self.total_customers_served = 0
         self.total_service_time = 0
         self.service_times = deque(maxlen=100)
+        self.service_stats = ServiceTimeStats()
         self.break_times = []
         self.current_break_start = None
         self.performance_score = 1.0
@@ -27,18 +33,19 @@ class CashierPerformance:
     def add_service_time(self, service_time):
         """Add a service time record"""
         self.service_times.append(service_time)
+        self.service_stats.add(service_time)
         self.total_service_time += service_time
         self.total_customers_served += 1
         self.calculate_performance_score()
     
     def start_break(self):
         """Mark start of break"""
-        self.current_break_start = time.time()
+        self.current_break_start = self.clock.time()
     
     def end_break(self):
         """Mark end of break"""
         if self.current_break_start:
-            break_duration = time.time() - self.current_break_start
+            break_duration = self.clock.time() - self.current_break_start
             self.break_times.append({
                 'start': self.current_break_start,
                 'duration': break_duration
@@ -84,6 +91,7 @@ class CashierPerformance:
             'shift_start': self.shift_start,
             'total_customers_served': self.total_customers_served,
             'average_service_time': sum(self.service_times) / len(self.service_times) if self.service_times else 0,
+            'service_time_stats': self.service_stats.to_dict(),
             'performance_score': self.performance_score,
             'efficiency_trend': self.get_efficiency_trend(),
             'break_count': len(self.break_times),
@@ -94,9 +102,10 @@ class CashierPerformance:
 class PerformanceMonitor:
     """Main performance monitoring class"""
     
-    def __init__(self, config):
+    def __init__(self, config, clock=None):
         self.config = config
         self.performance_config = config["performance"]
+        self.clock = clock or SystemClock()
         
         # Cashier tracking
         self.cashiers = {}
@@ -107,14 +116,22 @@ class PerformanceMonitor:
             'total_customers_processed': 0,
             'total_service_time': 0,
             'peak_queue_length': 0,
-            'system_uptime': time.time(),
+            'system_uptime': self.clock.time(),
             'fps': 0,
             'detection_accuracy': 0
         }
         
-        # Performance history
-        self.hourly_performance = defaultdict(list)
-        self.daily_performance = defaultdict(list)
+        # Shift-wide service time statistics across all cashiers
+        self.service_stats = ServiceTimeStats()
+        
+        # Performance history at second, minute and hour resolution
+        timeseries_config = config.get("analytics", {}).get("timeseries", {})
+        self.performance_history = TimeSeriesStore(
+            TREND_FIELDS,
+            second_buckets=timeseries_config.get("second_buckets", 3600),
+            minute_buckets=timeseries_config.get("minute_buckets", 1440),
+            hour_buckets=timeseries_config.get("hour_buckets", 720)
+        )
         
         # Alert thresholds
         self.target_service_time = self.performance_config.get("target_service_time", 120)
@@ -128,42 +145,34 @@ class PerformanceMonitor:
         # Data storage
         self.data_dir = "data/performance"
         os.makedirs(self.data_dir, exist_ok=True)
+        self.snapshot_store = open_history_store(config.get("analytics", {}), self.clock)
         
         print("Performance Monitor initialized")
     
     def update_metrics(self):
         """Update performance metrics"""
-        current_time = time.time()
-        hour = datetime.now().hour
+        current_time = self.clock.time()
         
         # Update system uptime
         uptime = current_time - self.system_metrics['system_uptime']
         
         # Calculate system-wide averages
-        total_service_time = 0
-        total_customers = 0
-        active_cashiers = 0
-        
-        for cashier in self.cashiers.values():
-            if cashier.service_times:
-                total_service_time += sum(cashier.service_times)
-                total_customers += len(cashier.service_times)
-                active_cashiers += 1
+        total_customers = self.service_stats.count
+        active_cashiers = sum(1 for cashier in self.cashiers.values() if cashier.service_stats.count)
         
         # Update system metrics
         if total_customers > 0:
-            self.system_metrics['average_service_time'] = total_service_time / total_customers
+            self.system_metrics['average_service_time'] = self.service_stats.running.mean
         
         self.system_metrics['active_cashiers'] = active_cashiers
         self.system_metrics['uptime_hours'] = uptime / 3600
         
-        # Store hourly performance
-        self.hourly_performance[hour].append({
-            'timestamp': current_time,
+        # Store performance history
+        self.performance_history.record({
             'customers_served': total_customers,
             'average_service_time': self.system_metrics.get('average_service_time', 0),
             'active_cashiers': active_cashiers
-        })
+        }, current_time)
     
     def update_frame_data(self, queue_data, detections):
         """Update metrics based on frame data"""
@@ -181,7 +190,7 @@ class PerformanceMonitor:
         for queue_id, queue_info in queue_data.items():
             cashier_id = queue_info.get('cashier_id')
             if cashier_id and cashier_id not in self.cashiers:
-                self.cashiers[cashier_id] = CashierPerformance(cashier_id)
+                self.cashiers[cashier_id] = CashierPerformance(cashier_id, self.clock)
             
             # Update service times if customer completed service
             if queue_info.get('current_customer'):
@@ -190,14 +199,26 @@ class PerformanceMonitor:
                     current_customer.get('service_time', 0) > 0):
                     
                     if cashier_id and cashier_id in self.cashiers:
-                        self.cashiers[cashier_id].add_service_time(
-                            current_customer['service_time']
-                        )
+                        self.add_service_time(cashier_id, current_customer['service_time'])
+    
+    def add_service_time(self, cashier_id, service_time):
+        """Record a completed service for a cashier and the system-wide statistics"""
+        if cashier_id not in self.cashiers:
+            self.cashiers[cashier_id] = CashierPerformance(cashier_id, self.clock)
+        
+        self.cashiers[cashier_id].add_service_time(service_time)
+        self.service_stats.add(service_time)
+    
+    def update_motion_gate_stats(self, stats):
+        """Update detection skip counters from the motion gate"""
+        self.system_metrics['frames_processed'] = stats['frames_processed']
+        self.system_metrics['frames_skipped'] = stats['frames_skipped']
+        self.system_metrics['detection_skip_ratio'] = stats['skip_ratio']
     
     def check_alerts(self):
         """Check for performance alerts"""
         alerts = []
-        current_time = time.time()
+        current_time = self.clock.time()
         
         # Check cashier performance
         for cashier_id, cashier in self.cashiers.items():
@@ -256,23 +277,22 @@ class PerformanceMonitor:
             metrics['average_cashier_performance'] = sum(cashier_scores) / len(cashier_scores)
             metrics['total_cashiers'] = len(self.cashiers)
             
-            # Calculate service time statistics
-            all_service_times = []
-            for cashier in self.cashiers.values():
-                all_service_times.extend(cashier.service_times)
-            
-            if all_service_times:
-                metrics['min_service_time'] = min(all_service_times)
-                metrics['max_service_time'] = max(all_service_times)
-                metrics['median_service_time'] = np.median(all_service_times)
-                metrics['std_service_time'] = np.std(all_service_times)
+            # Service time statistics over the whole shift, kept incrementally
+            stats = self.service_stats
+            if stats.count:
+                metrics['min_service_time'] = stats.running.min
+                metrics['max_service_time'] = stats.running.max
+                metrics['median_service_time'] = stats.percentile(0.5)
+                metrics['p90_service_time'] = stats.percentile(0.9)
+                metrics['p99_service_time'] = stats.percentile(0.99)
+                metrics['std_service_time'] = stats.running.std
         else:
             metrics['average_cashier_performance'] = 0
             metrics['total_cashiers'] = 0
         
         # Calculate efficiency metrics
         total_customers = sum(c.total_customers_served for c in self.cashiers.values())
-        uptime_hours = (time.time() - metrics['system_uptime']) / 3600
+        uptime_hours = (self.clock.time() - metrics['system_uptime']) / 3600
         
         if uptime_hours > 0:
             metrics['customers_per_hour'] = total_customers / uptime_hours
@@ -308,16 +328,12 @@ class PerformanceMonitor:
         """Get hourly performance trends"""
         trends = {}
         
-        for hour, data_points in self.hourly_performance.items():
-            if data_points:
-                avg_customers = sum(d['customers_served'] for d in data_points) / len(data_points)
-                avg_service_time = sum(d['average_service_time'] for d in data_points) / len(data_points)
-                
-                trends[hour] = {
-                    'average_customers_served': avg_customers,
-                    'average_service_time': avg_service_time,
-                    'data_points': len(data_points)
-                }
+        for hour, (means, data_points) in self.performance_history.hour_of_day_means().items():
+            trends[hour] = {
+                'average_customers_served': means['customers_served'],
+                'average_service_time': means['average_service_time'],
+                'data_points': data_points
+            }
         
         return trends
     
@@ -328,7 +344,7 @@ class PerformanceMonitor:
         hourly_trends = self.get_hourly_trends()
         
         report = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': datetime.fromtimestamp(self.clock.time()).isoformat(),
             'system_metrics': current_metrics,
             'cashier_performance': {
                 'rankings': cashier_rankings,
@@ -390,14 +406,9 @@ class PerformanceMonitor:
         return recommendations
     
     def save_performance_data(self):
-        """Save performance data to file"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = os.path.join(self.data_dir, f"performance_{timestamp}.json")
-        
+        """Save performance data to the snapshot store"""
         data = self.generate_performance_report()
-        
-        with open(filename, 'w') as f:
-            json.dump(data, f, indent=2)
+        self.snapshot_store.append('performance', data, self.clock.time())
     
     def reset_metrics(self):
         """Reset all performance metrics"""
@@ -407,12 +418,12 @@ class PerformanceMonitor:
             'total_customers_processed': 0,
             'total_service_time': 0,
             'peak_queue_length': 0,
-            'system_uptime': time.time(),
+            'system_uptime': self.clock.time(),
             'fps': 0,
             'detection_accuracy': 0
         }
-        self.hourly_performance.clear()
-        self.daily_performance.clear()
+        self.service_stats = ServiceTimeStats()
+        self.performance_history.clear()
         self.alert_history.clear()
         self.last_alert_time.clear()
         
@@ -421,7 +432,7 @@ class PerformanceMonitor:
     def assign_cashier_to_queue(self, cashier_id, queue_id):
         """Assign cashier to specific queue"""
         if cashier_id not in self.cashiers:
-            self.cashiers[cashier_id] = CashierPerformance(cashier_id)
+            self.cashiers[cashier_id] = CashierPerformance(cashier_id, self.clock)
         
         self.queue_cashier_mapping[queue_id] = cashier_id
     
@@ -10,31 +10,29 @@ from datetime import datetime, timedelta
 import numpy as np
 from collections import defaultdict
 
-# Import matplotlib with backend configuration for headless operation
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
+from storage.history import open_history_store
+from .chart_renderer import ChartRenderer
 
-# Try to import additional packages, but continue without them if not available
-try:
-    import pandas as pd
-    HAS_PANDAS = True
-except ImportError:
-    HAS_PANDAS = False
+from utils.clock import SystemClock
+from utils.lazy_import import module_available
+
+# Check for optional packages without importing them: pandas and seaborn
+# take longer to import than the rest of startup, and charts are drawn in
+# worker processes anyway
+HAS_PANDAS = module_available("pandas")
+if not HAS_PANDAS:
     print("Warning: pandas not available, some report features disabled")
 
-try:
-    import seaborn as sns
-    HAS_SEABORN = True
-except ImportError:
-    HAS_SEABORN = False
+HAS_SEABORN = module_available("seaborn")
+if not HAS_SEABORN:
     print("Warning: seaborn not available, advanced plotting disabled")
 
 class ReportGenerator:
     """Report generation and analytics class"""
     
-    def __init__(self, config):
+    def __init__(self, config, clock=None):
         self.config = config
+        self.clock = clock or SystemClock()
         self.analytics_config = config["analytics"]
         
         # Report settings
@@ -51,37 +49,59 @@ class ReportGenerator:
             os.makedirs(directory, exist_ok=True)
         
         # Data collection
-        self.historical_data = []
+        self.session_start = self.clock.time()
+        self.snapshot_store = open_history_store(self.analytics_config, self.clock)
         self.load_historical_data()
         
+        # Charts are drawn in worker processes, away from the frame loop
+        self.chart_renderer = ChartRenderer(self.analytics_config.get("charts", {}))
+        
         print("Report Generator initialized")
     
+    def now(self):
+        """Current local time from the clock, as a datetime"""
+        return datetime.fromtimestamp(self.clock.time())
+    
     def load_historical_data(self):
-        """Load historical data from saved files"""
+        """Migrate legacy per-snapshot JSON files into the snapshot store"""
         try:
-            # Load queue data files
-            queue_files = [f for f in os.listdir(self.data_dir) if f.startswith('queue_data_')]
-            performance_files = [f for f in os.listdir("data/performance") if f.startswith('performance_')]
-            
-            for filename in queue_files[-50:]:  # Load last 50 files
-                filepath = os.path.join(self.data_dir, filename)
-                with open(filepath, 'r') as f:
-                    data = json.load(f)
-                    data['data_type'] = 'queue'
-                    self.historical_data.append(data)
+            imported = self.snapshot_store.import_json_files(self.data_dir, 'queue_data_', 'queue')
+            imported += self.snapshot_store.import_json_files(
+                os.path.join(self.data_dir, "performance"), 'performance_', 'performance'
+            )
+            if imported:
+                print(f"Imported {imported} legacy data files")
             
-            print(f"Loaded {len(self.historical_data)} historical data points")
+            print(f"Loaded {self.snapshot_store.count()} historical data points")
             
         except Exception as e:
             print(f"Error loading historical data: {e}")
     
+    def close(self, timeout=30):
+        """Finish queued charts and stop the render processes"""
+        self.chart_renderer.close(timeout)
+    
+    def query_data(self, start_time=None, end_time=None, kind='queue'):
+        """Stored snapshots in a time range, oldest first
+        
+        Periods compacted by retention are returned as their daily and
+        hourly rollups, which keep the snapshot layout.
+        """
+        data = []
+        for stored_kind in (f"{kind}_daily", f"{kind}_hourly", kind):
+            data.extend(self.snapshot_store.query(stored_kind, start_time, end_time))
+        data.sort(key=lambda data_point: data_point['ts'])
+        for data_point in data:
+            data_point['data_type'] = kind
+        return data
+    
     def generate_hourly_report(self):
         """Generate hourly performance report"""
         if not self.report_generation:
             return
         
-        current_hour = datetime.now().hour
-        timestamp = datetime.now().strftime("%Y%m%d_%H")
+        current_hour = self.now().hour
+        timestamp = self.now().strftime("%Y%m%d_%H")
         
         try:
             # Collect hourly data
@@ -90,7 +110,7 @@ class ReportGenerator:
             # Generate report
             report = {
                 'report_type': 'hourly',
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': self.now().isoformat(),
                 'hour': current_hour,
                 'summary': self.generate_hourly_summary(hourly_data),
                 'queue_performance': self.analyze_queue_performance(hourly_data),
@@ -114,7 +134,7 @@ class ReportGenerator:
     
     def generate_daily_report(self):
         """Generate daily performance report"""
-        timestamp = datetime.now().strftime("%Y%m%d")
+        timestamp = self.now().strftime("%Y%m%d")
         
         try:
             # Collect daily data
@@ -123,8 +143,8 @@ class ReportGenerator:
             # Generate comprehensive report
             report = {
                 'report_type': 'daily',
-                'timestamp': datetime.now().isoformat(),
-                'date': datetime.now().strftime("%Y-%m-%d"),
+                'timestamp': self.now().isoformat(),
+                'date': self.now().strftime("%Y-%m-%d"),
                 'executive_summary': self.generate_executive_summary(daily_data),
                 'detailed_analysis': {
                     'queue_metrics': self.analyze_daily_queue_metrics(daily_data),
@@ -156,7 +176,7 @@ class ReportGenerator:
     
     def generate_manual_report(self):
         """Generate manual report on demand"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        timestamp = self.now().strftime("%Y%m%d_%H%M%S")
         
         try:
             # Collect recent data
@@ -165,7 +185,7 @@ class ReportGenerator:
             # Generate manual report
             report = {
                 'report_type': 'manual',
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': self.now().isoformat(),
                 'data_period': '4 hours',
                 'current_status': self.get_current_system_status(),
                 'performance_snapshot': self.get_performance_snapshot(recent_data),
@@ -187,7 +207,7 @@ class ReportGenerator:
     
     def generate_final_report(self):
         """Generate final system report on shutdown"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        timestamp = self.now().strftime("%Y%m%d_%H%M%S")
         
         try:
             # Collect all session data
@@ -196,7 +216,7 @@ class ReportGenerator:
             # Generate final report
             report = {
                 'report_type': 'final',
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': self.now().isoformat(),
                 'session_summary': self.generate_session_summary(session_data),
                 'total_metrics': self.calculate_total_metrics(session_data),
                 'performance_analysis': self.analyze_session_performance(session_data),
@@ -216,42 +236,15 @@ class ReportGenerator:
     
     def collect_hourly_data(self):
         """Collect data for hourly reporting"""
-        current_time = time.time()
-        hour_ago = current_time - 3600
-        
-        hourly_data = []
-        for data_point in self.historical_data:
-            data_timestamp = data_point.get('timestamp')
-            if data_timestamp and self.parse_timestamp(data_timestamp) >= hour_ago:
-                hourly_data.append(data_point)
-        
-        return hourly_data
+        return self.query_data(start_time=self.clock.time() - 3600)
     
     def collect_daily_data(self):
         """Collect data for daily reporting"""
-        current_time = time.time()
-        day_ago = current_time - 86400  # 24 hours
-        
-        daily_data = []
-        for data_point in self.historical_data:
-            data_timestamp = data_point.get('timestamp')
-            if data_timestamp and self.parse_timestamp(data_timestamp) >= day_ago:
-                daily_data.append(data_point)
-        
-        return daily_data
+        return self.query_data(start_time=self.clock.time() - 86400)  # 24 hours
     
     def collect_recent_data(self, hours=4):
         """Collect recent data for specified hours"""
-        current_time = time.time()
-        cutoff_time = current_time - (hours * 3600)
-        
-        recent_data = []
-        for data_point in self.historical_data:
-            data_timestamp = data_point.get('timestamp')
-            if data_timestamp and self.parse_timestamp(data_timestamp) >= cutoff_time:
-                recent_data.append(data_point)
-        
-        return recent_data
+        return self.query_data(start_time=self.clock.time() - (hours * 3600))
     
     def generate_hourly_summary(self, hourly_data):
         """Generate hourly summary statistics"""
@@ -314,36 +307,25 @@ class ReportGenerator:
         return analysis
     
     def generate_hourly_charts(self, hourly_data, timestamp):
-        """Generate charts for hourly data"""
+        """Queue charts for hourly data"""
         try:
-            # Set up plotting style
-            if HAS_SEABORN:
-                plt.style.use('seaborn-v0_8')
-            else:
-                plt.style.use('default')
-            
-            # Create figure with subplots
-            fig, axes = plt.subplots(2, 2, figsize=(15, 10))
-            fig.suptitle(f'Hourly Performance Report - {timestamp}', fontsize=16)
-            
-            # Chart 1: Queue lengths over time
-            self.plot_queue_lengths_over_time(hourly_data, axes[0, 0])
-            
-            # Chart 2: Service time distribution
-            self.plot_service_time_distribution(hourly_data, axes[0, 1])
-            
-            # Chart 3: Customer flow
-            self.plot_customer_flow(hourly_data, axes[1, 0])
-            
-            # Chart 4: Performance metrics
-            self.plot_performance_metrics(hourly_data, axes[1, 1])
-            
-            plt.tight_layout()
-            chart_filename = os.path.join(self.charts_dir, f"hourly_chart_{timestamp}.png")
-            plt.savefig(chart_filename, dpi=300, bbox_inches='tight')
-            plt.close()
+            spec = {
+                'title': f'Hourly Performance Report - {timestamp}',
+                'grid': (2, 2),
+                'figsize': (15, 10),
+                'style': 'seaborn-v0_8' if HAS_SEABORN else 'default',
+                'panels': [
+                    self.plot_queue_lengths_over_time(hourly_data),
+                    self.plot_service_time_distribution(hourly_data),
+                    self.plot_customer_flow(hourly_data),
+                    self.plot_performance_metrics(hourly_data)
+                ]
+            }
             
-            print(f"Hourly chart generated: {chart_filename}")
+            chart_filename = self.chart_renderer.submit(
+                spec, os.path.join(self.charts_dir, f"hourly_chart_{timestamp}")
+            )
+            print(f"Hourly chart queued: {chart_filename}")
             
         except Exception as e:
             print(f"Error generating hourly charts: {e}")
@@ -369,10 +351,7 @@ class ReportGenerator:
             print(f"Error generating daily charts: {e}")
     
     def create_performance_overview_chart(self, data, timestamp):
-        """Create performance overview chart"""
-        fig, axes = plt.subplots(2, 3, figsize=(18, 12))
-        fig.suptitle(f'Daily Performance Overview - {timestamp}', fontsize=16)
-        
+        """Queue the performance overview chart"""
         # Extract time series data
         timestamps = []
         customers_served = []
@@ -380,7 +359,9 @@ class ReportGenerator:
         queue_lengths = []
         
         for data_point in data:
-            if 'timestamp' in data_point:
+            if 'ts' in data_point:
+                timestamps.append(data_point['ts'])
+            elif 'timestamp' in data_point:
                 timestamps.append(self.parse_timestamp(data_point['timestamp']))
             
             if 'performance_metrics' in data_point:
@@ -405,42 +386,28 @@ class ReportGenerator:
                 
                 queue_lengths.append(total_queue_length)
         
-        # Plot charts
-        if timestamps and customers_served:
-            axes[0, 0].plot(timestamps, customers_served)
-            axes[0, 0].set_title('Customers Served Over Time')
-            axes[0, 0].set_ylabel('Customers')
-        
-        if timestamps and service_times:
-            axes[0, 1].plot(timestamps, service_times)
-            axes[0, 1].set_title('Average Service Time')
-            axes[0, 1].set_ylabel('Seconds')
-        
-        if timestamps and queue_lengths:
-            axes[0, 2].plot(timestamps, queue_lengths)
-            axes[0, 2].set_title('Total Queue Length')
-            axes[0, 2].set_ylabel('Customers')
-        
-        # Add distribution plots
-        if service_times:
-            axes[1, 0].hist(service_times, bins=20, alpha=0.7)
-            axes[1, 0].set_title('Service Time Distribution')
-        
-        if queue_lengths:
-            axes[1, 1].hist(queue_lengths, bins=15, alpha=0.7)
-            axes[1, 1].set_title('Queue Length Distribution')
+        def series(values):
+            # Line panels need matching timestamps
+            return {'x': timestamps, 'y': values} if timestamps and len(timestamps) == len(values) else {'y': []}
         
         # Performance score over time
         performance_scores = self.calculate_hourly_performance_scores(data)
-        if performance_scores:
-            axes[1, 2].plot(range(len(performance_scores)), performance_scores)
-            axes[1, 2].set_title('Performance Score Over Time')
-            axes[1, 2].set_ylabel('Score')
         
-        plt.tight_layout()
-        chart_filename = os.path.join(self.charts_dir, f"daily_performance_{timestamp}.png")
-        plt.savefig(chart_filename, dpi=300, bbox_inches='tight')
-        plt.close()
+        spec = {
+            'title': f'Daily Performance Overview - {timestamp}',
+            'grid': (2, 3),
+            'figsize': (18, 12),
+            'panels': [
+                dict(series(customers_served), type='line', title='Customers Served Over Time', ylabel='Customers'),
+                dict(series(service_times), type='line', title='Average Service Time', ylabel='Seconds'),
+                dict(series(queue_lengths), type='line', title='Total Queue Length', ylabel='Customers'),
+                {'type': 'hist', 'values': service_times, 'bins': 20, 'title': 'Service Time Distribution'},
+                {'type': 'hist', 'values': queue_lengths, 'bins': 15, 'title': 'Queue Length Distribution'},
+                {'type': 'line', 'y': performance_scores, 'title': 'Performance Score Over Time', 'ylabel': 'Score'}
+            ]
+        }
+        
+        return self.chart_renderer.submit(spec, os.path.join(self.charts_dir, f"daily_performance_{timestamp}"))
     
     def parse_timestamp(self, timestamp_str):
         """Parse timestamp string to float"""
@@ -452,7 +419,7 @@ class ReportGenerator:
             else:
                 return float(timestamp_str)
         except:
-            return time.time()
+            return self.clock.time()
     
     def calculate_queue_efficiency(self, metrics):
         """Calculate queue efficiency score"""
@@ -505,40 +472,33 @@ class ReportGenerator:
         
         return score
     
-    def plot_queue_lengths_over_time(self, data, ax):
-        """Plot queue lengths over time"""
+    def plot_queue_lengths_over_time(self, data):
+        """Panel spec for queue lengths over time"""
         # Implementation for queue length plotting
-        ax.set_title('Queue Lengths Over Time')
-        ax.set_xlabel('Time')
-        ax.set_ylabel('Queue Length')
+        return {'type': 'empty', 'title': 'Queue Lengths Over Time', 'xlabel': 'Time', 'ylabel': 'Queue Length'}
     
-    def plot_service_time_distribution(self, data, ax):
-        """Plot service time distribution"""
+    def plot_service_time_distribution(self, data):
+        """Panel spec for service time distribution"""
         # Implementation for service time distribution
-        ax.set_title('Service Time Distribution')
-        ax.set_xlabel('Service Time (seconds)')
-        ax.set_ylabel('Frequency')
+        return {'type': 'empty', 'title': 'Service Time Distribution',
+                'xlabel': 'Service Time (seconds)', 'ylabel': 'Frequency'}
     
-    def plot_customer_flow(self, data, ax):
-        """Plot customer flow"""
+    def plot_customer_flow(self, data):
+        """Panel spec for customer flow"""
         # Implementation for customer flow plotting
-        ax.set_title('Customer Flow')
-        ax.set_xlabel('Time')
-        ax.set_ylabel('Customers/Hour')
+        return {'type': 'empty', 'title': 'Customer Flow', 'xlabel': 'Time', 'ylabel': 'Customers/Hour'}
     
-    def plot_performance_metrics(self, data, ax):
-        """Plot performance metrics"""
+    def plot_performance_metrics(self, data):
+        """Panel spec for performance metrics"""
         # Implementation for performance metrics plotting
-        ax.set_title('Performance Metrics')
-        ax.set_xlabel('Metric')
-        ax.set_ylabel('Value')
+        return {'type': 'empty', 'title': 'Performance Metrics', 'xlabel': 'Metric', 'ylabel': 'Value'}
     
     def get_current_system_status(self):
         """Get current system status snapshot"""
         return {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': self.now().isoformat(),
             'status': 'operational',
-            'uptime': time.time(),
+            'uptime': self.clock.time(),
             'message': 'System running normally'
         }
     
@@ -585,7 +545,7 @@ class ReportGenerator:
     
     def collect_session_data(self):
         """Collect all session data"""
-        return self.historical_data
+        return self.query_data(start_time=self.session_start)
     
     def generate_session_summary(self, data):
         """Generate session summary"""
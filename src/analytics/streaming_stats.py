@@ -0,0 +1,153 @@
+"""
+Streaming Statistics Module
+Constant-memory running mean, variance, extremes and quantiles
+"""
+
+import math
+
+class RunningStats:
+    """Welford running count, mean, variance, min and max"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        """Add one observation"""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def variance(self):
+        """Population variance, as np.var"""
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        """Population standard deviation, as np.std"""
+        return math.sqrt(self.variance)
+
+class P2Quantile:
+    """Jain-Chlamtac P² estimate of a single quantile using five markers"""
+
+    def __init__(self, quantile):
+        self.quantile = quantile
+        self.count = 0
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * quantile, 1 + 4 * quantile, 3 + 2 * quantile, 5]
+        self.increments = [0, quantile / 2, quantile, (1 + quantile) / 2, 1]
+
+    def add(self, value):
+        """Add one observation"""
+        self.count += 1
+        heights = self.heights
+
+        # The first five observations seed the markers
+        if self.count <= 5:
+            heights.append(value)
+            heights.sort()
+            return
+
+        # Find the cell holding the value, extending the extremes if needed
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = 0
+            while value >= heights[cell + 1]:
+                cell += 1
+
+        for i in range(cell + 1, 5):
+            self.positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Move the middle markers towards their desired positions
+        for i in range(1, 4):
+            offset = self.desired[i] - self.positions[i]
+            if ((offset >= 1 and self.positions[i + 1] - self.positions[i] > 1) or
+                    (offset <= -1 and self.positions[i - 1] - self.positions[i] < -1)):
+                step = 1 if offset > 0 else -1
+                height = self.parabolic(i, step)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = self.linear(i, step)
+                heights[i] = height
+                self.positions[i] += step
+
+    def parabolic(self, i, step):
+        """Piecewise-parabolic marker height prediction"""
+        n, q = self.positions, self.heights
+        return q[i] + step / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + step) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+            (n[i + 1] - n[i] - step) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def linear(self, i, step):
+        """Linear marker height prediction"""
+        n, q = self.positions, self.heights
+        return q[i] + step * (q[i + step] - q[i]) / (n[i + step] - n[i])
+
+    @property
+    def value(self):
+        """Current quantile estimate"""
+        if self.count == 0:
+            return 0.0
+        if self.count <= 5:
+            # Exact linear interpolation over the seed samples, as np.percentile
+            rank = self.quantile * (self.count - 1)
+            lower = int(rank)
+            upper = min(lower + 1, self.count - 1)
+            return self.heights[lower] + (rank - lower) * (self.heights[upper] - self.heights[lower])
+        return self.heights[2]
+
+class ServiceTimeStats:
+    """Running mean/std/min/max plus p50, p90 and p99 of service times"""
+
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    def __init__(self):
+        self.running = RunningStats()
+        self.quantiles = {q: P2Quantile(q) for q in self.QUANTILES}
+
+    def add(self, value):
+        """Add one service time"""
+        self.running.add(value)
+        for estimator in self.quantiles.values():
+            estimator.add(value)
+
+    @property
+    def count(self):
+        return self.running.count
+
+    def percentile(self, quantile):
+        """Estimate of a tracked quantile"""
+        return self.quantiles[quantile].value
+
+    def to_dict(self):
+        """Summary of every tracked statistic"""
+        if not self.running.count:
+            return {'count': 0}
+
+        return {
+            'count': self.running.count,
+            'mean': self.running.mean,
+            'std': self.running.std,
+            'min': self.running.min,
+            'max': self.running.max,
+            'p50': self.percentile(0.5),
+            'p90': self.percentile(0.9),
+            'p99': self.percentile(0.99)
+        }
@@ -0,0 +1,102 @@
+"""
+Time Series Module
+Fixed-size array-backed ring buffers with second, minute and hour rollups
+"""
+
+import time
+import numpy as np
+
+class RingSeries:
+    """Per-bucket sums and counts of several metrics at one resolution"""
+
+    def __init__(self, fields, resolution, capacity):
+        self.fields = tuple(fields)
+        self.resolution = resolution
+        self.capacity = capacity
+        self.bucket_index = np.full(capacity, -1, dtype=np.int64)
+        self.counts = np.zeros(capacity, dtype=np.int64)
+        self.sums = np.zeros((capacity, len(self.fields)), dtype=np.float64)
+
+    def record(self, timestamp, values):
+        """Add one sample (a sequence ordered like fields) at timestamp"""
+        index = int(timestamp // self.resolution)
+        slot = index % self.capacity
+
+        if self.bucket_index[slot] != index:
+            if self.bucket_index[slot] > index:
+                return  # older than the retained window
+            # Reuse the slot of the oldest bucket
+            self.bucket_index[slot] = index
+            self.counts[slot] = 0
+            self.sums[slot] = 0.0
+
+        self.counts[slot] += 1
+        self.sums[slot] += values
+
+    def clear(self):
+        """Drop all buckets"""
+        self.bucket_index[:] = -1
+        self.counts[:] = 0
+        self.sums[:] = 0.0
+
+    def window(self, start_time=None, end_time=None):
+        """Bucket start times, sample counts and per-field means in time order"""
+        valid = self.bucket_index >= 0
+        if start_time is not None:
+            valid &= self.bucket_index >= int(start_time // self.resolution)
+        if end_time is not None:
+            valid &= self.bucket_index <= int(end_time // self.resolution)
+
+        slots = np.flatnonzero(valid)
+        slots = slots[np.argsort(self.bucket_index[slots])]
+        counts = self.counts[slots]
+        means = self.sums[slots] / counts[:, None]
+        return self.bucket_index[slots] * self.resolution, counts, means
+
+class TimeSeriesStore:
+    """Metrics kept at second, minute and hour resolution in bounded memory"""
+
+    def __init__(self, fields, second_buckets=3600, minute_buckets=1440, hour_buckets=720):
+        self.fields = tuple(fields)
+        self.levels = {
+            'second': RingSeries(self.fields, 1, second_buckets),
+            'minute': RingSeries(self.fields, 60, minute_buckets),
+            'hour': RingSeries(self.fields, 3600, hour_buckets)
+        }
+
+        # Running hour-of-day profile (local time), merged across days
+        self.hour_of_day_counts = np.zeros(24, dtype=np.int64)
+        self.hour_of_day_sums = np.zeros((24, len(self.fields)), dtype=np.float64)
+
+    def record(self, values, timestamp=None):
+        """Add one sample given as a dict of field values"""
+        if timestamp is None:
+            timestamp = time.time()
+        row = np.array([values.get(field, 0) for field in self.fields], dtype=np.float64)
+
+        for series in self.levels.values():
+            series.record(timestamp, row)
+
+        hour = time.localtime(timestamp).tm_hour
+        self.hour_of_day_counts[hour] += 1
+        self.hour_of_day_sums[hour] += row
+
+    def window(self, level, start_time=None, end_time=None):
+        """Time-ordered (timestamps, counts, means) for one resolution"""
+        return self.levels[level].window(start_time, end_time)
+
+    def hour_of_day_means(self):
+        """Per-field mean and sample count for each hour of the day with data"""
+        profile = {}
+        for hour in np.flatnonzero(self.hour_of_day_counts).tolist():
+            count = int(self.hour_of_day_counts[hour])
+            means = self.hour_of_day_sums[hour] / count
+            profile[hour] = (dict(zip(self.fields, means.tolist())), count)
+        return profile
+
+    def clear(self):
+        """Drop all samples"""
+        for series in self.levels.values():
+            series.clear()
+        self.hour_of_day_counts[:] = 0
+        self.hour_of_day_sums[:] = 0.0
@@ -0,0 +1,379 @@
+"""
+Detector Backends Module
+Pluggable person detection backends: ultralytics YOLO, ONNX Runtime, OpenVINO and HOG
+"""
+
+import glob
+import os
+import platform
+import shutil
+
+import cv2
+import numpy as np
+
+from utils.lazy_import import module_available
+
+# "auto" is HOG on Windows and ultralytics elsewhere
+DETECTOR_BACKENDS = ("auto", "ultralytics", "onnxruntime", "openvino", "hog")
+
+# Runtime package each backend needs
+BACKEND_MODULES = {
+    "ultralytics": "ultralytics",
+    "onnxruntime": "onnxruntime",
+    "openvino": "openvino",
+    "hog": "cv2"
+}
+
+def available_backends():
+    """Backends whose runtime package is installed"""
+    return [name for name, module in BACKEND_MODULES.items() if module_available(module)]
+
+def _to_numpy(values):
+    """Move a tensor (or array-like) to a host NumPy array"""
+    if hasattr(values, 'cpu'):
+        values = values.cpu()
+    if hasattr(values, 'numpy'):
+        return values.numpy()
+    return np.asarray(values)
+
+def boxes_to_detections(xyxy, confidences):
+    """Detection dicts from (N, 4) corner boxes and their confidences"""
+    x1, y1, x2, y2 = xyxy[:, 0], xyxy[:, 1], xyxy[:, 2], xyxy[:, 3]
+
+    # Truncate to int exactly like the per-box path did
+    bboxes = np.stack([x1, y1, x2 - x1, y2 - y1], axis=1).astype(np.int64).tolist()
+    centers = np.stack([(x1 + x2) / 2, (y1 + y2) / 2], axis=1).astype(np.int64).tolist()
+    confidences = np.asarray(confidences).astype(float).tolist()
+
+    return [
+        {'bbox': bbox, 'confidence': confidence, 'center': center}
+        for bbox, confidence, center in zip(bboxes, confidences, centers)
+    ]
+
+def extract_yolo_detections(result, person_class_id, confidence_threshold):
+    """Convert one ultralytics result into person detections in a single batch"""
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return []
+
+    # One device-to-host copy per tensor instead of three per box
+    classes = _to_numpy(boxes.cls).reshape(-1)
+    confidences = _to_numpy(boxes.conf).reshape(-1)
+    xyxy = _to_numpy(boxes.xyxy).reshape(-1, 4)
+
+    # Keep confident person boxes only
+    mask = ((classes.astype(np.int64) == person_class_id) &
+            (confidences >= confidence_threshold))
+    if not mask.any():
+        return []
+    return boxes_to_detections(xyxy[mask], confidences[mask])
+
+def letterbox(image, size=640, color=(114, 114, 114)):
+    """Resize keeping the aspect ratio and pad to size x size
+
+    Returns (padded image, scale, (pad_x, pad_y)); padding is split
+    between both sides the way ultralytics does it.
+    """
+    height, width = image.shape[:2]
+    scale = min(size / height, size / width)
+    new_width, new_height = int(round(width * scale)), int(round(height * scale))
+    if (new_width, new_height) != (width, height):
+        image = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+
+    pad_x = int(round((size - new_width) / 2 - 0.1))
+    pad_y = int(round((size - new_height) / 2 - 0.1))
+    padded = np.full((size, size, 3), color, dtype=np.uint8)
+    padded[pad_y:pad_y + new_height, pad_x:pad_x + new_width] = image
+    return padded, scale, (pad_x, pad_y)
+
+def images_to_blob(images):
+    """NCHW float32 RGB input in [0, 1] from letterboxed BGR images"""
+    batch = np.stack(images)[..., ::-1].transpose(0, 3, 1, 2)
+    return np.ascontiguousarray(batch, dtype=np.float32) / 255.0
+
+def nms(boxes, scores, iou_threshold):
+    """Greedy non-maximum suppression; indices of kept boxes, highest score first"""
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    order = np.argsort(-scores, kind='stable')
+
+    keep = []
+    while order.size:
+        best = order[0]
+        keep.append(best)
+        rest = order[1:]
+        width = np.clip(np.minimum(x2[best], x2[rest]) - np.maximum(x1[best], x1[rest]), 0, None)
+        height = np.clip(np.minimum(y2[best], y2[rest]) - np.maximum(y1[best], y1[rest]), 0, None)
+        intersection = width * height
+        union = areas[best] + areas[rest] - intersection
+        iou = np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+def decode_yolov8(output, scale, pad, image_shape, person_class_id=0, confidence_threshold=0.5,
+                  nms_threshold=0.4, max_detections=300):
+    """Person detections from one image's raw YOLOv8 output
+
+    output is (4 + classes, anchors): box centre and size in letterboxed
+    pixels, then one score per class. A box counts as a person when that is
+    its best class, as in ultralytics.
+    """
+    # Only anchors past the threshold need their best class checked
+    candidates = np.flatnonzero(output[4 + person_class_id] >= confidence_threshold)
+    candidates = candidates[output[4:, candidates].argmax(axis=0) == person_class_id]
+    if not candidates.size:
+        return []
+
+    center_x, center_y, width, height = output[:4, candidates]
+    confidences = output[4 + person_class_id, candidates]
+    pad_x, pad_y = pad
+    xyxy = np.stack([center_x - width / 2 - pad_x, center_y - height / 2 - pad_y,
+                     center_x + width / 2 - pad_x, center_y + height / 2 - pad_y], axis=1) / scale
+    image_height, image_width = image_shape[:2]
+    np.clip(xyxy[:, 0::2], 0, image_width, out=xyxy[:, 0::2])
+    np.clip(xyxy[:, 1::2], 0, image_height, out=xyxy[:, 1::2])
+
+    keep = nms(xyxy, confidences, nms_threshold)[:max_detections]
+    return boxes_to_detections(xyxy[keep], confidences[keep])
+
+def export_model(model_path, export_format, export_dir="models", imgsz=640):
+    """Path of model_path exported for ONNX Runtime ("onnx") or OpenVINO ("openvino")
+
+    Exports with ultralytics once and caches the result in export_dir;
+    later calls reuse it unless the source model is newer. A model_path
+    that already is an export is returned as is.
+    """
+    if export_format == "onnx":
+        if model_path.endswith(".onnx"):
+            return model_path
+        suffix = ".onnx"
+    elif export_format == "openvino":
+        if model_path.endswith(".xml") or os.path.isdir(model_path):
+            return model_path
+        suffix = "_openvino_model"
+    else:
+        raise ValueError(f"Unknown export format: {export_format}")
+
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    cached_path = os.path.join(export_dir, f"{stem}_{imgsz}{suffix}")
+    if os.path.exists(cached_path) and (not os.path.exists(model_path) or
+                                        os.path.getmtime(cached_path) >= os.path.getmtime(model_path)):
+        return cached_path
+
+    print(f"Exporting {model_path} to {export_format} (cached in {export_dir})...")
+    from ultralytics import YOLO
+    exported_path = YOLO(model_path).export(format=export_format, imgsz=imgsz, dynamic=True, verbose=False)
+
+    # Move into place last so an interrupted export is never reused
+    os.makedirs(export_dir, exist_ok=True)
+    temp_path = cached_path + ".tmp"
+    for path in (temp_path, cached_path):
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+    shutil.move(str(exported_path), temp_path)
+    os.replace(temp_path, cached_path)
+    print(f"✓ Exported model cached at {cached_path}")
+    return cached_path
+
+class DetectorBackend:
+    """A way of running person detection: load() once, then detect_batch(images)
+
+    Backends return per-image lists of detection dicts ({'bbox': [x, y, w,
+    h], 'confidence', 'center'}) in image pixels, persons only.
+    """
+
+    name = None
+    warmup = True  # run one inference on a blank image after loading
+
+    def __init__(self, config):
+        self.config = config
+        self.model_path = config.get("model_path", "yolov8n.pt")
+        self.confidence_threshold = config.get("confidence_threshold", 0.5)
+        self.nms_threshold = config.get("nms_threshold", 0.4)
+        self.person_class_id = config.get("person_class_id", 0)
+        self.num_threads = config.get("num_threads", 0)
+
+    def load(self):
+        """Load the model; raises if this backend cannot run here"""
+        raise NotImplementedError
+
+    def detect_batch(self, images):
+        """Detections for each image"""
+        raise NotImplementedError
+
+    def detect(self, image):
+        """Detections for one image"""
+        return self.detect_batch([image])[0]
+
+class UltralyticsBackend(DetectorBackend):
+    """YOLO through ultralytics and PyTorch"""
+
+    name = "ultralytics"
+
+    def load(self):
+        from ultralytics import YOLO
+        self.model = YOLO(self.model_path)
+
+    def detect_batch(self, images):
+        results = self.model(list(images), verbose=False)
+        return [extract_yolo_detections(result, self.person_class_id, self.confidence_threshold)
+                for result in results]
+
+class HOGBackend(DetectorBackend):
+    """OpenCV's HOG people detector, needs no model file"""
+
+    name = "hog"
+    warmup = False
+
+    def load(self):
+        self.hog = cv2.HOGDescriptor()
+        self.hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+
+    def detect_batch(self, images):
+        return [self.detect_hog(image) for image in images]
+
+    def detect_hog(self, frame):
+        """Detect persons using HOG descriptor"""
+        # Convert to grayscale for HOG
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        # Detect persons
+        boxes, weights = self.hog.detectMultiScale(
+            gray,
+            winStride=(8, 8),
+            padding=(32, 32),
+            scale=1.05
+        )
+
+        detections = []
+        for i, (x, y, w, h) in enumerate(boxes):
+            if weights[i] >= self.confidence_threshold:
+                detections.append({
+                    'bbox': [x, y, w, h],
+                    'confidence': weights[i],
+                    'center': [x + w//2, y + h//2]
+                })
+        return detections
+
+class ExportedYOLOBackend(DetectorBackend):
+    """YOLOv8 exported from ultralytics, with our own letterbox, decoding and NMS
+
+    Subclasses load the exported model and implement infer(blob), which
+    maps an (N, 3, size, size) input to the raw (N, 4 + classes, anchors)
+    output.
+    """
+
+    export_format = None
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.input_size = config.get("input_size", 640)
+        self.export_dir = config.get("export_dir", "models")
+
+    def exported_model_path(self):
+        """Cached export of the configured model"""
+        return export_model(self.model_path, self.export_format, self.export_dir, self.input_size)
+
+    def infer(self, blob):
+        """Raw model output for a preprocessed batch"""
+        raise NotImplementedError
+
+    def detect_batch(self, images):
+        letterboxed = [letterbox(image, self.input_size) for image in images]
+        outputs = self.infer(images_to_blob([padded for padded, _, _ in letterboxed]))
+        return [
+            decode_yolov8(output, scale, pad, image.shape, self.person_class_id,
+                          self.confidence_threshold, self.nms_threshold)
+            for output, image, (_, scale, pad) in zip(outputs, images, letterboxed)
+        ]
+
+class OnnxRuntimeBackend(ExportedYOLOBackend):
+    """YOLOv8 on the ONNX Runtime CPU execution provider"""
+
+    name = "onnxruntime"
+    export_format = "onnx"
+
+    def load(self):
+        import onnxruntime
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.num_threads:
+            options.intra_op_num_threads = self.num_threads
+        self.session = onnxruntime.InferenceSession(self.exported_model_path(), options,
+                                                    providers=["CPUExecutionProvider"])
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # Static exports fix the batch size and input resolution
+        batch_size, _, height, _ = model_input.shape
+        self.fixed_batch = isinstance(batch_size, int)
+        if isinstance(height, int):
+            self.input_size = height
+
+    def infer(self, blob):
+        if self.fixed_batch and len(blob) > 1:
+            return np.concatenate([self.infer(blob[i:i + 1]) for i in range(len(blob))])
+        return self.session.run(None, {self.input_name: blob})[0]
+
+class OpenVINOBackend(ExportedYOLOBackend):
+    """YOLOv8 compiled by OpenVINO for the CPU"""
+
+    name = "openvino"
+    export_format = "openvino"
+
+    def load(self):
+        import openvino
+        path = self.exported_model_path()
+        if os.path.isdir(path):
+            path = glob.glob(os.path.join(path, "*.xml"))[0]
+
+        properties = {"PERFORMANCE_HINT": self.config.get("openvino_hint", "LATENCY")}
+        if self.num_threads:
+            properties["INFERENCE_NUM_THREADS"] = self.num_threads
+        core = openvino.Core()
+        self.model = core.compile_model(core.read_model(path), "CPU", properties)
+        self.output = self.model.output(0)
+
+    def infer(self, blob):
+        return self.model(blob)[self.output]
+
+BACKENDS = {
+    "ultralytics": UltralyticsBackend,
+    "onnxruntime": OnnxRuntimeBackend,
+    "openvino": OpenVINOBackend,
+    "hog": HOGBackend
+}
+
+def load_backend(config, warmup_size=0):
+    """Load the backend named by config["backend"], falling back to HOG if it cannot run"""
+    name = config.get("backend", "auto")
+    if name not in DETECTOR_BACKENDS:
+        raise ValueError(f"Unknown detection backend: {name} (expected one of {', '.join(DETECTOR_BACKENDS)})")
+
+    if name == "auto":
+        # On Windows, default to HOG to avoid YOLO download delays
+        if platform.system() == "Windows":
+            print("Windows detected - using HOG detector for reliability")
+            name = "hog"
+        else:
+            name = "ultralytics"
+
+    if name != "hog":
+        try:
+            print(f"Attempting to load {name} model...")
+            backend = BACKENDS[name](config)
+            backend.load()
+            if warmup_size and backend.warmup:
+                # First inference builds kernels and buffers; pay for it here
+                backend.detect(np.zeros((warmup_size, warmup_size, 3), dtype=np.uint8))
+            print(f"✓ {name} model loaded successfully")
+            return backend
+        except Exception as e:
+            print(f"{name} backend unavailable ({e}), using HOG detector")
+
+    backend = HOGBackend(config)
+    backend.load()
+    print("✓ HOG detector initialized")
+    return backend
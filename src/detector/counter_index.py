@@ -0,0 +1,81 @@
+"""
+Counter Index Module
+Precompiled counter rectangles for vectorized point-in-counter lookups
+"""
+
+import numpy as np
+
+class CounterIndex:
+    """Counter rectangles compiled into NumPy arrays"""
+
+    def __init__(self, counter_positions):
+        """Build from config["counters"]["counter_positions"]"""
+        items = sorted(counter_positions.items(), key=lambda item: int(item[0]))
+        self.counter_ids = [int(counter_id) for counter_id, _ in items]
+        self.columns = {counter_id: i for i, counter_id in enumerate(self.counter_ids)}
+
+        rects = np.array([[pos["x"], pos["y"], pos["width"], pos["height"]] for _, pos in items],
+                         dtype=np.float64).reshape(-1, 4)
+        self.x1 = rects[:, 0]
+        self.y1 = rects[:, 1]
+        self.x2 = rects[:, 0] + rects[:, 2]
+        self.y2 = rects[:, 1] + rects[:, 3]
+        self.cx = (self.x1 + self.x2) / 2
+        self.cy = (self.y1 + self.y2) / 2
+        self.rects = [tuple(int(v) for v in rect) for rect in rects]
+
+    def __len__(self):
+        return len(self.counter_ids)
+
+    @staticmethod
+    def as_points(centers):
+        """Convert a list of [x, y] centers to an (n, 2) array"""
+        return np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+
+    def contains(self, centers):
+        """Boolean (points x counters) matrix, bounds inclusive"""
+        points = self.as_points(centers)
+        px, py = points[:, 0:1], points[:, 1:2]
+        return (px >= self.x1) & (px <= self.x2) & (py >= self.y1) & (py <= self.y2)
+
+    def assign(self, centers):
+        """Map each counter id to the indices of the points inside it"""
+        inside = self.contains(centers)
+        counter_col, point_idx = np.nonzero(inside.T)
+        members = {counter_id: [] for counter_id in self.counter_ids}
+        for col, idx in zip(counter_col.tolist(), point_idx.tolist()):
+            members[self.counter_ids[col]].append(idx)
+        return members
+
+    def assign_nearest(self, centers):
+        """Map each counter id to its points, each point to one counter
+
+        A point inside overlapping counters goes to the one whose center is
+        nearest (the lowest id on a tie).
+        """
+        members = {counter_id: [] for counter_id in self.counter_ids}
+        if not self.counter_ids:
+            return members
+        inside = self.contains(centers)
+        points = self.as_points(centers)
+        distances = (points[:, 0:1] - self.cx) ** 2 + (points[:, 1:2] - self.cy) ** 2
+        distances[~inside] = np.inf
+        nearest = np.argmin(distances, axis=1)
+        for idx in np.flatnonzero(inside.any(axis=1)).tolist():
+            members[self.counter_ids[nearest[idx]]].append(idx)
+        return members
+
+    def members_of(self, centers, counter_id):
+        """Indices of the points inside one counter"""
+        col = self.columns.get(int(counter_id))
+        if col is None:
+            return []
+        return np.flatnonzero(self.contains(centers)[:, col]).tolist()
+
+    @staticmethod
+    def points_in_rect(centers, rect):
+        """Boolean mask of points inside an (x, y, w, h) rectangle"""
+        points = CounterIndex.as_points(centers)
+        x, y, w, h = rect
+        return ((points[:, 0] >= x) & (points[:, 0] <= x + w) &
+                (points[:, 1] >= y) & (points[:, 1] <= y + h))
@@ -0,0 +1,278 @@
+"""
+Inference Server Module
+Shares one detection model between camera pipelines by batching their frames
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Each frame buffer starts with the (pid, request id) of the frame it holds
+HEADER_SHAPE = (2,)
+HEADER_BYTES = 16
+
+def slot_header(buffer):
+    """The (pid, request id) header of a frame buffer"""
+    return np.ndarray(HEADER_SHAPE, dtype=np.int64, buffer=buffer.buf)
+
+def slot_frame(buffer, shape):
+    """The frame stored in a buffer, after its header"""
+    return np.ndarray(shape, dtype=np.uint8, buffer=buffer.buf, offset=HEADER_BYTES)
+
+def holds_request(buffer, request_key):
+    """Whether a buffer still holds the frame of request_key"""
+    return tuple(slot_header(buffer).tolist()) == tuple(request_key)
+
+def collect_batch(request_queue, max_batch_size, max_wait):
+    """Block for one request, then gather more until the batch is full or max_wait passes
+
+    Returns (requests, stop); a None request asks the server to stop.
+    """
+    request = request_queue.get()
+    if request is None:
+        return [], True
+
+    batch = [request]
+    deadline = time.perf_counter() + max_wait
+    while len(batch) < max_batch_size:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            break
+        try:
+            request = request_queue.get(timeout=remaining)
+        except queue.Empty:
+            break
+        if request is None:
+            return batch, True
+        batch.append(request)
+    return batch, False
+
+def serve_batches(detector_factory, config, request_queue, response_queues, buffer_names,
+                  max_batch_size, max_wait, ready):
+    """Server process entry point: load the model once, then detect in batches"""
+    detector = detector_factory(config)
+    detector.wait_until_ready()
+    buffers = [shared_memory.SharedMemory(name=name) for name in buffer_names]
+    ready.set()
+
+    try:
+        stop = False
+        while not stop:
+            batch, stop = collect_batch(request_queue, max_batch_size, max_wait)
+            if not batch:
+                continue
+
+            # A client that timed out may have moved on to its next frame:
+            # skip requests whose buffer no longer holds their frame
+            batch = [request for request in batch if holds_request(buffers[request[0]], request[1])]
+            if not batch:
+                continue
+
+            # Frames are read straight from each client's buffer; the client
+            # waits for its response before writing the next one
+            images = [slot_frame(buffers[slot], shape) for slot, _, shape in batch]
+            try:
+                results = detector.detect_batch(images)
+                error = None
+            except Exception as e:
+                results = [[] for _ in batch]
+                error = str(e)
+            del images
+
+            for (slot, request_key, _), detections in zip(batch, results):
+                # Overwritten while detecting: that client has given up on it
+                if holds_request(buffers[slot], request_key):
+                    response_queues[slot].put((request_key, detections, len(batch), error))
+    finally:
+        for buffer in buffers:
+            buffer.close()
+
+class InferenceClient:
+    """One pipeline's handle on the server: copy a frame in, wait for its detections
+
+    Calls from several threads are serialized, each client has one frame
+    buffer. Clients can be passed to worker processes when they start.
+    """
+
+    def __init__(self, slot, buffer_name, buffer_size, request_queue, response_queue, timeout):
+        self.slot = slot
+        self.buffer_name = buffer_name
+        self.buffer_size = buffer_size
+        self.request_queue = request_queue
+        self.response_queue = response_queue
+        self.timeout = timeout
+        self.init_local_state()
+
+    def init_local_state(self):
+        """Per-process state: buffer attachment, lock and statistics"""
+        self.buffer = None
+        self.lock = threading.Lock()
+        self.request_id = 0
+        self.latencies = deque(maxlen=1000)
+        self.batch_sizes = deque(maxlen=1000)
+        self.errors = 0
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        for key in ('buffer', 'lock', 'latencies', 'batch_sizes'):
+            state.pop(key)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.init_local_state()
+
+    def detect(self, image):
+        """Detections for one image, as PersonDetector returns them"""
+        image = np.ascontiguousarray(image, dtype=np.uint8)
+        if image.nbytes > self.buffer_size:
+            raise ValueError(f"Frame of {image.nbytes} bytes exceeds the inference buffer ({self.buffer_size})")
+
+        with self.lock:
+            if self.buffer is None:
+                self.buffer = shared_memory.SharedMemory(name=self.buffer_name)
+            start_time = time.perf_counter()
+            self.request_id += 1
+            request_key = (os.getpid(), self.request_id)
+
+            # Clear the header first so the server never takes a half-written
+            # frame for the one a timed-out request was waiting on
+            header = slot_header(self.buffer)
+            header[:] = 0
+            slot_frame(self.buffer, image.shape)[...] = image
+            header[:] = request_key
+            del header
+            self.request_queue.put((self.slot, request_key, image.shape))
+
+            # Skip late responses to requests that timed out, including those
+            # of a previous worker process using this slot
+            while True:
+                try:
+                    response_key, detections, batch_size, error = self.response_queue.get(timeout=self.timeout)
+                except queue.Empty:
+                    self.errors += 1
+                    raise TimeoutError(f"No inference result within {self.timeout}s")
+                if response_key == request_key:
+                    break
+
+            self.latencies.append(time.perf_counter() - start_time)
+            self.batch_sizes.append(batch_size)
+            if error:
+                self.errors += 1
+                raise RuntimeError(f"Inference server error: {error}")
+        return detections
+
+    def get_stats(self):
+        """Request latency and batch size statistics"""
+        with self.lock:
+            latencies = list(self.latencies)
+            batch_sizes = list(self.batch_sizes)
+        if not latencies:
+            return {'requests': self.request_id, 'errors': self.errors, 'avg_latency': 0,
+                    'p95_latency': 0, 'avg_batch_size': 0}
+        return {
+            'requests': self.request_id,
+            'errors': self.errors,
+            'avg_latency': float(np.mean(latencies)),
+            'p95_latency': float(np.percentile(latencies, 95)),
+            'avg_batch_size': float(np.mean(batch_sizes))
+        }
+
+    def close(self):
+        """Detach from the frame buffer"""
+        with self.lock:
+            if self.buffer is not None:
+                self.buffer.close()
+                self.buffer = None
+
+class InferenceServer:
+    """Process owning one detector, serving batched requests from up to max_clients pipelines
+
+    Each client gets a shared-memory frame buffer and a response queue; the
+    server takes the first waiting request, gathers more for up to
+    max_wait_ms or max_batch_size requests, runs one detect_batch call and
+    routes each result back. detector_factory(config) builds the detector
+    in the server process (default: PersonDetector).
+    """
+
+    def __init__(self, config, detector_factory=None, max_clients=None):
+        server_config = config["detection"].get("inference_server", {})
+        self.config = config
+        self.detector_factory = detector_factory
+        self.max_batch_size = server_config.get("max_batch_size", 8)
+        self.max_wait = server_config.get("max_wait_ms", 5) / 1000.0
+        self.max_clients = max_clients or server_config.get("max_clients", 16)
+        self.timeout_seconds = server_config.get("timeout_seconds", 10)
+        self.buffer_size = int(np.prod(server_config.get("max_frame_shape", [1080, 1920, 3])))
+
+        if self.detector_factory is None:
+            from .person_detector import PersonDetector
+            self.detector_factory = PersonDetector
+
+        # Spawn keeps the model out of any process that forks later
+        self.context = multiprocessing.get_context("spawn")
+        self.request_queue = self.context.Queue()
+        self.response_queues = [self.context.Queue() for _ in range(self.max_clients)]
+        self.buffers = [shared_memory.SharedMemory(create=True, size=HEADER_BYTES + self.buffer_size)
+                        for _ in range(self.max_clients)]
+        self.ready = self.context.Event()
+        self.process = None
+        self.clients = []
+
+    def start(self, timeout=None):
+        """Start the server process and wait for the model to load; False on timeout"""
+        self.process = self.context.Process(
+            target=serve_batches,
+            args=(self.detector_factory, self.config, self.request_queue, self.response_queues,
+                  [buffer.name for buffer in self.buffers], self.max_batch_size, self.max_wait, self.ready),
+            name="inference-server"
+        )
+        self.process.start()
+
+        deadline = None if timeout is None else time.time() + timeout
+        while not self.ready.wait(0.2):
+            if not self.process.is_alive():
+                print(f"Inference server exited with code {self.process.exitcode}")
+                return False
+            if deadline is not None and time.time() > deadline:
+                return False
+        print(f"✓ Inference server ready (batches of up to {self.max_batch_size}, "
+              f"{self.max_wait * 1000:.0f} ms wait, {self.max_clients} clients)")
+        return True
+
+    def is_alive(self):
+        """Whether the server process is running"""
+        return self.process is not None and self.process.is_alive()
+
+    def client(self):
+        """Hand out the next free client slot"""
+        slot = len(self.clients)
+        if slot >= self.max_clients:
+            raise ValueError(f"All {self.max_clients} inference clients are in use")
+        client = InferenceClient(slot, self.buffers[slot].name, self.buffer_size,
+                                 self.request_queue, self.response_queues[slot], self.timeout_seconds)
+        self.clients.append(client)
+        return client
+
+    def stop(self, timeout=10):
+        """Stop the server process and free the frame buffers"""
+        if self.process is not None:
+            self.request_queue.put(None)
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join()
+            self.process = None
+
+        for client in self.clients:
+            client.close()
+        for buffer in self.buffers:
+            buffer.close()
+            buffer.unlink()
+        self.buffers = []
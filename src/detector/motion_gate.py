@@ -0,0 +1,108 @@
+"""
+Motion Gate Module
+Skips person detection when the counter areas have not changed
+"""
+
+import cv2
+
+class MotionGate:
+    """Frame-difference gate in front of the person detector"""
+
+    def __init__(self, config):
+        """Initialize the motion gate"""
+        gate_config = config.get("detection", {}).get("motion_gate", {})
+        self.enabled = gate_config.get("enabled", False)
+        self.downscale = gate_config.get("downscale", 0.25)
+        self.pixel_threshold = gate_config.get("pixel_threshold", 25)
+        self.motion_threshold = gate_config.get("motion_threshold", 0.01)
+        self.force_every = gate_config.get("force_every", 30)
+
+        # Counter regions (x, y, w, h) in full-frame pixels
+        self.regions = [
+            (pos["x"], pos["y"], pos["width"], pos["height"])
+            for pos in config.get("counters", {}).get("counter_positions", {}).values()
+        ]
+
+        # Downscaled grayscale frame from the last detection
+        self.reference = None
+        self.frames_since_detection = 0
+
+        # Counters
+        self.frames_processed = 0
+        self.frames_skipped = 0
+        self.forced_detections = 0
+        self.motion_detections = 0
+
+    def prepare_frame(self, frame):
+        """Downscale and blur a frame for cheap differencing"""
+        small = cv2.resize(frame, None, fx=self.downscale, fy=self.downscale,
+                           interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def get_motion_scores(self, small):
+        """Get the fraction of changed pixels in each counter region"""
+        changed = cv2.absdiff(small, self.reference) > self.pixel_threshold
+
+        if not self.regions:
+            return [float(changed.mean())]
+
+        scores = []
+        for x, y, w, h in self.regions:
+            x1, y1 = int(x * self.downscale), int(y * self.downscale)
+            x2, y2 = int((x + w) * self.downscale), int((y + h) * self.downscale)
+            region = changed[y1:y2, x1:x2]
+            scores.append(float(region.mean()) if region.size else 0.0)
+
+        return scores
+
+    def should_detect(self, frame):
+        """Decide whether this frame needs a fresh detection"""
+        self.frames_processed += 1
+
+        if not self.enabled:
+            return True
+
+        small = self.prepare_frame(frame)
+
+        if self.reference is None or self.reference.shape != small.shape:
+            detect = True
+        elif self.frames_since_detection + 1 >= self.force_every:
+            # Periodic full detection so state cannot go stale
+            detect = True
+            self.forced_detections += 1
+        elif max(self.get_motion_scores(small)) > self.motion_threshold:
+            detect = True
+            self.motion_detections += 1
+        else:
+            detect = False
+
+        if detect:
+            # Compare against the frame the current detections came from
+            self.reference = small
+            self.frames_since_detection = 0
+        else:
+            self.frames_skipped += 1
+            self.frames_since_detection += 1
+
+        return detect
+
+    def get_stats(self):
+        """Get motion gate statistics"""
+        return {
+            'frames_processed': self.frames_processed,
+            'frames_skipped': self.frames_skipped,
+            'forced_detections': self.forced_detections,
+            'motion_detections': self.motion_detections,
+            'skip_ratio': self.frames_skipped / self.frames_processed if self.frames_processed else 0
+        }
+
+    def reset(self):
+        """Reset reference frame and counters"""
+        self.reference = None
+        self.frames_since_detection = 0
+        self.frames_processed = 0
+        self.frames_skipped = 0
+        self.forced_detections = 0
+        self.motion_detections = 0
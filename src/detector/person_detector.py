@@ -5,45 +5,65 @@ Handles customer detection and tracking using OpenCV and YOLO
 
 import cv2
 import numpy as np
-import platform
+import threading
 import time
-from collections import defaultdict, deque
+from collections import deque
+
+from . import tracker
+from .tracker import assign_detections
+from .backends import DETECTOR_BACKENDS, extract_yolo_detections, load_backend
+from .counter_index import CounterIndex
+from utils.clock import SystemClock
 
 class PersonDetector:
     """Person detection and tracking class"""
     
-    def __init__(self, config):
-        """Initialize the person detector"""
+    def __init__(self, config, clock=None, inference_client=None):
+        """Initialize the person detector
+        
+        With an inference_client, frames go to a shared InferenceServer
+        and no model is loaded here.
+        """
         self.config = config["detection"]
+        self.clock = clock or SystemClock()
+        self.inference_client = inference_client
         self.confidence_threshold = self.config.get("confidence_threshold", 0.5)
         self.nms_threshold = self.config.get("nms_threshold", 0.4)
         self.person_class_id = self.config.get("person_class_id", 0)
         
-        # Initialize detection model with Windows-friendly approach
-        self.model = None
-        self.hog = None
+        # Region-of-interest inference: "full", "merged" or "per_counter"
+        self.roi_mode = self.config.get("roi_mode", "full")
+        self.roi_padding = self.config.get("roi_padding", 32)
+        self.counter_index = CounterIndex(config.get("counters", {}).get("counter_positions", {}))
+        self.counter_regions = list(self.counter_index.rects)
         
-        # On Windows, default to HOG to avoid YOLO download delays
-        if platform.system() == "Windows":
-            print("Windows detected - using HOG detector for reliability")
-            self.use_hog_detector()
+        # Detection backend ("auto" picks a Windows-friendly one); the model
+        # loads (and runs one warm-up inference) on a background thread so
+        # camera setup is not blocked, detection returns nothing until then
+        self.backend_name = self.config.get("backend", "auto")
+        if self.backend_name not in DETECTOR_BACKENDS:
+            raise ValueError(f"Unknown detection backend: {self.backend_name} "
+                             f"(expected one of {', '.join(DETECTOR_BACKENDS)})")
+        self.backend = None
+        # Model sessions are not thread-safe; pipeline.detection_workers > 1
+        # share this detector, so backend calls run one at a time
+        self.backend_lock = threading.Lock()
+        self.model_path = self.config.get("model_path", "yolov8n.pt")
+        self.async_model_load = self.config.get("async_model_load", False)
+        self.warmup_size = self.config.get("warmup_size", 640)
+        self.model_ready = threading.Event()
+        self.model_thread = None
+        self.model_load_time = None
+        self.frames_before_ready = 0
+        
+        if self.inference_client is not None:
+            self.model_load_time = 0.0
+            self.model_ready.set()
+        elif self.async_model_load:
+            self.model_thread = threading.Thread(target=self.load_model, daemon=True)
+            self.model_thread.start()
         else:
-            # Try YOLO first on other platforms
-            try:
-                print("Attempting to load YOLO model...")
-                from ultralytics import YOLO
-                self.model = YOLO('yolov8n.pt')
-                print("✓ YOLO model loaded successfully")
-            except Exception as e:
-                print(f"YOLO unavailable ({e}), using HOG detector")
-                self.use_hog_detector()
-    
-    def use_hog_detector(self):
-        """Initialize HOG detector"""
-        self.model = None
-        self.hog = cv2.HOGDescriptor()
-        self.hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
-        print("✓ HOG detector initialized")
+            self.load_model()
         
         # Tracking variables
         self.tracked_persons = {}
@@ -54,115 +74,156 @@ class PersonDetector:
         # Performance tracking
         self.detection_times = deque(maxlen=100)
     
-    def detect_persons_yolo(self, frame):
-        """Detect persons using YOLO"""
+    def load_model(self):
+        """Load the detection model, warm it up, then mark the detector ready"""
         start_time = time.time()
         
+        # Runs on a background thread: whatever fails, the detector must
+        # still become ready or every frame would wait on it forever
         try:
-            # Run YOLO detection
-            results = self.model(frame, verbose=False)
-            
-            detections = []
-            for result in results:
-                boxes = result.boxes
-                if boxes is not None:
-                    for box in boxes:
-                        # Check if detection is a person and meets confidence threshold
-                        if (int(box.cls) == self.person_class_id and 
-                            float(box.conf) >= self.confidence_threshold):
-                            
-                            # Extract bounding box coordinates
-                            x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                            confidence = float(box.conf)
-                            
-                            detections.append({
-                                'bbox': [int(x1), int(y1), int(x2-x1), int(y2-y1)],
-                                'confidence': confidence,
-                                'center': [int((x1+x2)/2), int((y1+y2)/2)]
-                            })
-            
-            detection_time = time.time() - start_time
-            self.detection_times.append(detection_time)
-            
-            return detections
+            try:
+                self.backend = load_backend(self.config, self.warmup_size)
+            except Exception as e:
+                print(f"Detection backend failed to load ({e}), using HOG detector")
+                self.backend = load_backend(dict(self.config, backend="hog"))
             
+            # Import the track assignment solver now rather than on a busy frame
+            if tracker.HAS_SCIPY:
+                try:
+                    tracker.scipy_optimize.load()
+                except Exception as e:
+                    print(f"SciPy unavailable ({e}), using greedy track assignment")
+                    tracker.HAS_SCIPY = False
         except Exception as e:
-            print(f"YOLO detection error: {e}")
-            return []
+            print(f"Detector setup error: {e}")
+        finally:
+            self.model_load_time = time.time() - start_time
+            self.model_ready.set()
+            print(f"✓ Detector ready after {self.model_load_time:.2f}s")
     
-    def detect_persons_hog(self, frame):
-        """Detect persons using HOG descriptor (fallback)"""
+    def wait_until_ready(self, timeout=None):
+        """Block until the model is loaded; False on timeout"""
+        return self.model_ready.wait(timeout)
+    
+    def extract_yolo_detections(self, result):
+        """Convert one YOLO result into person detections in a single batch"""
+        return extract_yolo_detections(result, self.person_class_id, self.confidence_threshold)
+    
+    def detect_batch(self, images):
+        """Detect persons in several images, with one model call where the backend allows"""
+        with self.backend_lock:
+            return self.backend.detect_batch(images)
+    
+    def detect_persons(self, frame):
+        """Main detection method"""
+        if not self.model_ready.is_set():
+            self.frames_before_ready += 1
+            return []
+        
         start_time = time.time()
         
+        if self.roi_mode in ("merged", "per_counter") and self.counter_regions:
+            detections = self.detect_persons_roi(frame)
+        else:
+            detections = self.run_detector(frame)
+        
+        detection_time = time.time() - start_time
+        self.detection_times.append(detection_time)
+        
+        return detections
+    
+    def run_detector(self, image):
+        """Run the active detection backend on an image"""
+        if self.inference_client is not None:
+            try:
+                return self.inference_client.detect(image)
+            except Exception as e:
+                print(f"Inference server error: {e}")
+                return []
+        if self.backend is None:
+            return []
         try:
-            # Convert to grayscale for HOG
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            
-            # Detect persons
-            boxes, weights = self.hog.detectMultiScale(
-                gray, 
-                winStride=(8, 8),
-                padding=(32, 32),
-                scale=1.05
-            )
-            
-            detections = []
-            for i, (x, y, w, h) in enumerate(boxes):
-                if weights[i] >= self.confidence_threshold:
-                    detections.append({
-                        'bbox': [x, y, w, h],
-                        'confidence': weights[i],
-                        'center': [x + w//2, y + h//2]
-                    })
-            
-            detection_time = time.time() - start_time
-            self.detection_times.append(detection_time)
-            
-            return detections
-            
+            with self.backend_lock:
+                return self.backend.detect(image)
         except Exception as e:
-            print(f"HOG detection error: {e}")
+            print(f"{self.backend.name} detection error: {e}")
             return []
     
-    def detect_persons(self, frame):
-        """Main detection method"""
-        if self.model is not None:
-            return self.detect_persons_yolo(frame)
-        else:
-            return self.detect_persons_hog(frame)
+    def get_roi_crops(self, frame_shape):
+        """Get (x1, y1, x2, y2) crops covering the counter regions"""
+        frame_height, frame_width = frame_shape[:2]
+        pad = self.roi_padding
+        
+        crops = []
+        for x, y, w, h in self.counter_regions:
+            x1, y1 = max(0, x - pad), max(0, y - pad)
+            x2, y2 = min(frame_width, x + w + pad), min(frame_height, y + h + pad)
+            if x2 > x1 and y2 > y1:
+                crops.append((x1, y1, x2, y2))
+        
+        if self.roi_mode == "merged" and crops:
+            # Single crop bounding the union of all counters
+            crops = [(min(c[0] for c in crops), min(c[1] for c in crops),
+                      max(c[2] for c in crops), max(c[3] for c in crops))]
+        
+        return crops
+    
+    def detect_persons_roi(self, frame):
+        """Detect persons only inside the counter regions"""
+        crops = self.get_roi_crops(frame.shape)
+        
+        detections = []
+        for x1, y1, x2, y2 in crops:
+            # Map crop-local boxes back to frame coordinates
+            for detection in self.run_detector(frame[y1:y2, x1:x2]):
+                bx, by, bw, bh = detection['bbox']
+                cx, cy = detection['center']
+                detections.append({
+                    'bbox': [int(bx) + x1, int(by) + y1, int(bw), int(bh)],
+                    'confidence': float(detection['confidence']),
+                    'center': [int(cx) + x1, int(cy) + y1]
+                })
+        
+        # Overlapping per-counter crops can see the same person twice
+        if len(crops) > 1 and len(detections) > 1:
+            keep = cv2.dnn.NMSBoxes(
+                [d['bbox'] for d in detections],
+                [d['confidence'] for d in detections],
+                0.0,
+                self.nms_threshold
+            )
+            detections = [detections[i] for i in np.array(keep).reshape(-1)]
+        
+        return detections
     
     def track_persons(self, detections):
-        """Track persons across frames with unique IDs"""
+        """Track persons across frames with unique IDs (sets 'track_id' on each detection)"""
+        track_ids = list(self.tracked_persons.keys())
+        track_centers = [self.tracked_persons[track_id]['center'] for track_id in track_ids]
         current_centers = [det['center'] for det in detections]
         
-        # Update existing tracks
-        updated_tracks = set()
-        for track_id, track_data in list(self.tracked_persons.items()):
-            best_match_idx = None
-            min_distance = float('inf')
-            
-            # Find closest detection to this track
-            for i, center in enumerate(current_centers):
-                distance = np.sqrt((center[0] - track_data['center'][0])**2 + 
-                                 (center[1] - track_data['center'][1])**2)
-                
-                if distance < min_distance and distance < self.max_distance:
-                    min_distance = distance
-                    best_match_idx = i
-            
-            if best_match_idx is not None:
-                # Update track
-                self.tracked_persons[track_id].update({
-                    'center': current_centers[best_match_idx],
-                    'bbox': detections[best_match_idx]['bbox'],
-                    'confidence': detections[best_match_idx]['confidence'],
-                    'disappeared': 0,
-                    'last_seen': time.time()
-                })
-                updated_tracks.add(best_match_idx)
-            else:
-                # Track not matched, increment disappeared counter
-                self.tracked_persons[track_id]['disappeared'] += 1
+        # One-to-one assignment over the full track/detection cost matrix
+        matches, unmatched_tracks, unmatched_detections = assign_detections(
+            track_centers, current_centers, self.max_distance
+        )
+        
+        current_time = self.clock.time()
+        
+        # Update matched tracks
+        for track_idx, detection_idx in matches:
+            detection = detections[detection_idx]
+            detection['track_id'] = track_ids[track_idx]
+            self.tracked_persons[track_ids[track_idx]].update({
+                'center': detection['center'],
+                'bbox': detection['bbox'],
+                'confidence': detection['confidence'],
+                'disappeared': 0,
+                'last_seen': current_time
+            })
+        
+        # Track not matched, increment disappeared counter
+        for track_idx in unmatched_tracks:
+            self.tracked_persons[track_ids[track_idx]]['disappeared'] += 1
         
         # Remove tracks that have disappeared for too long
         to_remove = []
@@ -174,27 +235,36 @@ class PersonDetector:
             del self.tracked_persons[track_id]
         
         # Add new tracks for unmatched detections
-        for i, detection in enumerate(detections):
-            if i not in updated_tracks:
-                self.tracked_persons[self.next_id] = {
-                    'center': detection['center'],
-                    'bbox': detection['bbox'],
-                    'confidence': detection['confidence'],
-                    'disappeared': 0,
-                    'first_seen': time.time(),
-                    'last_seen': time.time()
-                }
-                self.next_id += 1
+        for detection_idx in unmatched_detections:
+            detection = detections[detection_idx]
+            detection['track_id'] = self.next_id
+            self.tracked_persons[self.next_id] = {
+                'center': detection['center'],
+                'bbox': detection['bbox'],
+                'confidence': detection['confidence'],
+                'disappeared': 0,
+                'first_seen': current_time,
+                'last_seen': current_time
+            }
+            self.next_id += 1
         
         return self.tracked_persons
     
     def get_detection_stats(self):
         """Get detection performance statistics"""
+        model_stats = {
+            'backend': self.backend.name if self.backend is not None else None,
+            'model_ready': self.model_ready.is_set(),
+            'model_load_time': self.model_load_time,
+            'frames_before_ready': self.frames_before_ready
+        }
+        
         if not self.detection_times:
             return {
                 'avg_detection_time': 0,
                 'fps': 0,
-                'total_detections': 0
+                'total_detections': 0,
+                **model_stats
             }
         
         avg_time = sum(self.detection_times) / len(self.detection_times)
@@ -203,7 +273,8 @@ class PersonDetector:
         return {
             'avg_detection_time': avg_time,
             'fps': fps,
-            'total_detections': len(self.tracked_persons)
+            'total_detections': len(self.tracked_persons),
+            **model_stats
         }
     
     def reset_tracking(self):
@@ -214,20 +285,26 @@ class PersonDetector:
     
     def get_persons_in_area(self, area_coords):
         """Get persons within a specific area"""
-        x, y, w, h = area_coords
-        persons_in_area = []
-        
-        for track_id, track_data in self.tracked_persons.items():
-            center_x, center_y = track_data['center']
-            
-            if (x <= center_x <= x + w and y <= center_y <= y + h):
-                persons_in_area.append({
-                    'id': track_id,
-                    'center': track_data['center'],
-                    'bbox': track_data['bbox'],
-                    'confidence': track_data['confidence'],
-                    'first_seen': track_data['first_seen'],
-                    'last_seen': track_data['last_seen']
-                })
-        
-        return persons_in_area
+        track_ids = list(self.tracked_persons.keys())
+        centers = [self.tracked_persons[track_id]['center'] for track_id in track_ids]
+        inside = CounterIndex.points_in_rect(centers, area_coords)
+        return [self.get_person_record(track_ids[i]) for i in np.flatnonzero(inside)]
+    
+    def get_persons_in_counter(self, counter_id):
+        """Get persons within a configured counter area"""
+        track_ids = list(self.tracked_persons.keys())
+        centers = [self.tracked_persons[track_id]['center'] for track_id in track_ids]
+        return [self.get_person_record(track_ids[i])
+                for i in self.counter_index.members_of(centers, counter_id)]
+    
+    def get_person_record(self, track_id):
+        """Get the public record of a tracked person"""
+        track_data = self.tracked_persons[track_id]
+        return {
+            'id': track_id,
+            'center': track_data['center'],
+            'bbox': track_data['bbox'],
+            'confidence': track_data['confidence'],
+            'first_seen': track_data['first_seen'],
+            'last_seen': track_data['last_seen']
+        }
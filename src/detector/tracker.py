@@ -0,0 +1,81 @@
+"""
+Track Assignment Module
+Optimal one-to-one matching of existing tracks to new detections
+"""
+
+import numpy as np
+
+from utils.lazy_import import LazyModule, module_available
+
+# SciPy's solver is imported on first use (scipy.optimize is slow to load);
+# fall back to greedy matching without it
+HAS_SCIPY = module_available("scipy.optimize")
+scipy_optimize = LazyModule("scipy.optimize")
+
+def distance_matrix(track_centers, detection_centers):
+    """Euclidean distance between every track and detection center"""
+    diff = track_centers[:, None, :] - detection_centers[None, :, :]
+    return np.sqrt(np.einsum('ijk,ijk->ij', diff, diff))
+
+def greedy_assignment(cost, gated):
+    """Match cheapest pairs first, each track and detection used once"""
+    track_idx, det_idx = np.nonzero(gated)
+    order = np.argsort(cost[track_idx, det_idx], kind='stable')
+
+    used_tracks = set()
+    used_detections = set()
+    matches = []
+    for t, d in zip(track_idx[order].tolist(), det_idx[order].tolist()):
+        if t not in used_tracks and d not in used_detections:
+            used_tracks.add(t)
+            used_detections.add(d)
+            matches.append((t, d))
+
+    return matches
+
+def optimal_assignment(cost, gated, max_distance):
+    """Minimum total distance matching over gated pairs"""
+    # Only rows/columns with at least one candidate take part
+    rows = np.flatnonzero(gated.any(axis=1))
+    cols = np.flatnonzero(gated.any(axis=0))
+    sub_cost = cost[np.ix_(rows, cols)]
+    sub_gated = gated[np.ix_(rows, cols)]
+
+    # Gated-out pairs cost more than any full set of feasible pairs, so the
+    # solver maximizes the number of feasible matches before total distance
+    forbidden = max_distance * (min(len(rows), len(cols)) + 1)
+    sub_cost = np.where(sub_gated, sub_cost, forbidden)
+
+    row_idx, col_idx = scipy_optimize.linear_sum_assignment(sub_cost)
+    keep = sub_gated[row_idx, col_idx]
+    return list(zip(rows[row_idx[keep]].tolist(), cols[col_idx[keep]].tolist()))
+
+def assign_detections(track_centers, detection_centers, max_distance):
+    """
+    Assign detections to tracks by center distance.
+
+    Returns (matches, unmatched_tracks, unmatched_detections) where
+    matches is a list of (track_index, detection_index) pairs closer
+    than max_distance, with every track and detection used at most once.
+    """
+    track_centers = np.asarray(track_centers, dtype=np.float64).reshape(-1, 2)
+    detection_centers = np.asarray(detection_centers, dtype=np.float64).reshape(-1, 2)
+    num_tracks, num_detections = len(track_centers), len(detection_centers)
+
+    matches = []
+    if num_tracks and num_detections:
+        cost = distance_matrix(track_centers, detection_centers)
+        gated = cost < max_distance
+
+        if gated.any():
+            if HAS_SCIPY:
+                matches = optimal_assignment(cost, gated, max_distance)
+            else:
+                matches = greedy_assignment(cost, gated)
+
+    matched_tracks = {t for t, _ in matches}
+    matched_detections = {d for _, d in matches}
+    unmatched_tracks = [t for t in range(num_tracks) if t not in matched_tracks]
+    unmatched_detections = [d for d in range(num_detections) if d not in matched_detections]
+
+    return matches, unmatched_tracks, unmatched_detections
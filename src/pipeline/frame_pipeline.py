@@ -0,0 +1,241 @@
+"""
+Frame Pipeline Module
+Threaded capture, detection and render stages connected by bounded queues
+"""
+
+import threading
+import time
+from collections import deque
+
+DROP_POLICIES = ("drop_oldest", "latest_only")
+
+class BoundedFrameQueue:
+    """Bounded hand-off queue that drops frames instead of blocking"""
+
+    def __init__(self, maxsize=2, drop_policy="drop_oldest", on_drop=None):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy '{drop_policy}', expected one of {DROP_POLICIES}")
+
+        # latest-only keeps a single slot that is always overwritten
+        self.maxsize = 1 if drop_policy == "latest_only" else max(1, maxsize)
+        self.drop_policy = drop_policy
+        self.items = deque()
+        self.condition = threading.Condition()
+        self.on_drop = on_drop
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, item):
+        """Add an item, dropping the oldest one when full"""
+        dropped = []
+        with self.condition:
+            while len(self.items) >= self.maxsize:
+                dropped.append(self.items.popleft())
+                self.dropped += 1
+            self.items.append(item)
+            self.condition.notify()
+
+        if self.on_drop:
+            for old_item in dropped:
+                self.on_drop(old_item)
+
+    def get(self, timeout=None):
+        """Get the next item, or None on timeout or when closed and empty"""
+        with self.condition:
+            if not self.items and not self.closed:
+                self.condition.wait(timeout)
+            if self.items:
+                return self.items.popleft()
+            return None
+
+    def close(self):
+        """Wake up all consumers, no more items will be added"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def __len__(self):
+        return len(self.items)
+
+class StageStats:
+    """Latency tracking for a single pipeline stage"""
+
+    def __init__(self, name):
+        self.name = name
+        self.processed = 0
+        self.latencies = deque(maxlen=100)
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        """Record one processed item"""
+        with self.lock:
+            self.processed += 1
+            self.latencies.append(seconds)
+
+    def average_latency(self):
+        """Average latency in seconds over the recent window"""
+        with self.lock:
+            if not self.latencies:
+                return 0
+            return sum(self.latencies) / len(self.latencies)
+
+class FramePipeline:
+    """Capture thread, detection worker pool and caller-driven render stage"""
+
+    def __init__(self, read_frame, detect, render, config, release_frame=None):
+        """
+        read_frame() returns the next frame or None when the source ends,
+        detect(frame) returns detections and render(frame, detections)
+        returns the output frame. Render runs on the thread calling
+        render_next() so GUI calls stay on the main thread.
+        
+        release_frame(frame), if given, is called for every captured frame
+        the pipeline is done with: dropped, stale, or rendered into a
+        different output. An output that is the frame itself (annotated in
+        place) belongs to the caller of render_next().
+        """
+        pipeline_config = config.get("pipeline", {})
+        self.num_workers = max(1, pipeline_config.get("detection_workers", 1))
+        queue_size = pipeline_config.get("queue_size", 2)
+        drop_policy = pipeline_config.get("drop_policy", "drop_oldest")
+
+        self.read_frame = read_frame
+        self.detect = detect
+        self.render = render
+        self.release_frame = release_frame
+
+        on_drop = (lambda item: release_frame(item[2])) if release_frame else None
+        self.frame_queue = BoundedFrameQueue(queue_size, drop_policy, on_drop)
+        self.result_queue = BoundedFrameQueue(queue_size, drop_policy, on_drop)
+
+        self.stats = {name: StageStats(name) for name in ("capture", "detect", "render")}
+        self.end_to_end = StageStats("end_to_end")
+        self.stale_results = 0
+        self.last_rendered_seq = -1
+
+        self.running = False
+        self.finished = False
+        self.capture_thread = None
+        self.worker_threads = []
+        self.active_workers = 0
+        self.worker_lock = threading.Lock()
+
+    def start(self):
+        """Start capture and detection threads"""
+        self.running = True
+        self.capture_thread = threading.Thread(target=self.capture_loop, daemon=True)
+        self.capture_thread.start()
+
+        self.active_workers = self.num_workers
+        for _ in range(self.num_workers):
+            worker = threading.Thread(target=self.detection_loop, daemon=True)
+            worker.start()
+            self.worker_threads.append(worker)
+
+    def capture_loop(self):
+        """Capture stage: read frames as fast as the source delivers them"""
+        seq = 0
+        while self.running:
+            start_time = time.perf_counter()
+            frame = self.read_frame()
+            if frame is None:
+                break
+
+            self.stats["capture"].record(time.perf_counter() - start_time)
+            self.frame_queue.put((seq, time.perf_counter(), frame))
+            seq += 1
+
+        self.frame_queue.close()
+
+    def detection_loop(self):
+        """Detection stage: one of the worker pool threads"""
+        while self.running:
+            item = self.frame_queue.get(timeout=0.1)
+            if item is None:
+                if self.frame_queue.closed:
+                    break
+                continue
+
+            seq, captured_at, frame = item
+            start_time = time.perf_counter()
+            try:
+                detections = self.detect(frame)
+            except Exception as e:
+                print(f"Detection worker error: {e}")
+                detections = []
+
+            self.stats["detect"].record(time.perf_counter() - start_time)
+            self.result_queue.put((seq, captured_at, frame, detections))
+
+        with self.worker_lock:
+            self.active_workers -= 1
+            if self.active_workers == 0:
+                self.result_queue.close()
+
+    def render_next(self, timeout=0.1):
+        """Render stage: process the next detection result on this thread"""
+        item = self.result_queue.get(timeout=timeout)
+        if item is None:
+            if self.result_queue.closed:
+                self.finished = True
+            return None
+
+        seq, captured_at, frame, detections = item
+        if seq <= self.last_rendered_seq:
+            # A slower worker finished an older frame, never go back in time
+            self.stale_results += 1
+            if self.release_frame:
+                self.release_frame(frame)
+            return None
+        self.last_rendered_seq = seq
+
+        start_time = time.perf_counter()
+        output = self.render(frame, detections)
+        finished_at = time.perf_counter()
+        if self.release_frame and output is not frame:
+            self.release_frame(frame)
+
+        self.stats["render"].record(finished_at - start_time)
+        self.end_to_end.record(finished_at - captured_at)
+
+        return output
+
+    def stop(self):
+        """Stop all pipeline threads"""
+        self.running = False
+        self.frame_queue.close()
+        self.result_queue.close()
+
+        if self.capture_thread:
+            self.capture_thread.join(timeout=2)
+        for worker in self.worker_threads:
+            worker.join(timeout=2)
+        self.worker_threads = []
+
+    def get_stats(self):
+        """Get queue depth and latency for every stage"""
+        queues = {"capture": None, "detect": self.frame_queue, "render": self.result_queue}
+
+        stats = {}
+        for name, stage in self.stats.items():
+            input_queue = queues[name]
+            stats[name] = {
+                'processed': stage.processed,
+                'avg_latency_ms': stage.average_latency() * 1000,
+                'queue_depth': len(input_queue) if input_queue else 0,
+                'dropped': input_queue.dropped if input_queue else 0
+            }
+
+        stats['end_to_end_ms'] = self.end_to_end.average_latency() * 1000
+        stats['stale_results'] = self.stale_results
+        return stats
+
+    def format_stats(self):
+        """Get a one-line summary of the pipeline stats"""
+        stats = self.get_stats()
+        parts = [
+            f"{name}: {stats[name]['avg_latency_ms']:.1f}ms q={stats[name]['queue_depth']} "
+            f"drop={stats[name]['dropped']}"
+            for name in ("capture", "detect", "render")
+        ]
+        return " | ".join(parts) + f" | e2e: {stats['end_to_end_ms']:.1f}ms"
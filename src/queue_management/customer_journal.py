@@ -0,0 +1,47 @@
+"""
+Customer Journal Module
+Append-only on-disk journal for customers evicted from memory
+"""
+
+import json
+import os
+import threading
+
+class CustomerJournal:
+    """Newline-delimited JSON journal of evicted customer records"""
+
+    def __init__(self, path):
+        self.path = path
+        self.records_written = 0
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def append(self, customers):
+        """Append customer records to the journal"""
+        if not customers:
+            return
+
+        lines = [json.dumps(customer.to_dict(), separators=(',', ':')) for customer in customers]
+        with self.lock:
+            with open(self.path, 'a') as f:
+                f.write('\n'.join(lines) + '\n')
+            self.records_written += len(lines)
+
+    def read(self):
+        """Iterate over journaled customer records"""
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash can leave a partial last line
+                    continue
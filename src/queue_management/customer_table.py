@@ -0,0 +1,124 @@
+"""
+Customer Table Module
+Columnar NumPy storage of customer timing records for bulk queue math
+"""
+
+import numpy as np
+
+STATUS_CODES = {"waiting": 0, "current": 1, "served": 2}
+
+class CustomerTable:
+    """Growable column store of customer entry/service times, queue and status"""
+
+    def __init__(self, capacity=256):
+        self.size = 0
+        self.entry_time = np.empty(capacity, dtype=np.float64)
+        self.service_start_time = np.empty(capacity, dtype=np.float64)
+        self.service_end_time = np.empty(capacity, dtype=np.float64)
+        self.queue_id = np.empty(capacity, dtype=np.int32)
+        self.status = np.empty(capacity, dtype=np.int8)
+
+    def __len__(self):
+        return self.size
+
+    def columns(self):
+        """Get all column arrays"""
+        return (self.entry_time, self.service_start_time, self.service_end_time,
+                self.queue_id, self.status)
+
+    def reserve(self, capacity):
+        """Grow the columns to hold at least capacity rows"""
+        if capacity <= len(self.entry_time):
+            return
+
+        new_capacity = max(capacity, 2 * len(self.entry_time))
+        for name in ("entry_time", "service_start_time", "service_end_time", "queue_id", "status"):
+            old = getattr(self, name)
+            new = np.empty(new_capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def append(self, queue_id, entry_time, service_start_time=None, service_end_time=None, status="waiting"):
+        """Append one record and return its row index"""
+        self.reserve(self.size + 1)
+        row = self.size
+        self.entry_time[row] = entry_time
+        self.service_start_time[row] = np.nan if service_start_time is None else service_start_time
+        self.service_end_time[row] = np.nan if service_end_time is None else service_end_time
+        self.queue_id[row] = queue_id
+        self.status[row] = STATUS_CODES[status]
+        self.size += 1
+        return row
+
+    def append_customer(self, customer):
+        """Append a Customer's timing record"""
+        return self.append(customer.queue_id, customer.entry_time, customer.service_start_time,
+                           customer.service_end_time, customer.status)
+
+    def extend(self, queue_ids, entry_times, service_start_times=None, service_end_times=None, statuses=None):
+        """Append many records from array-likes in one step"""
+        entry_times = np.asarray(entry_times, dtype=np.float64)
+        count = len(entry_times)
+        start, end = self.size, self.size + count
+        self.reserve(end)
+
+        self.entry_time[start:end] = entry_times
+        self.service_start_time[start:end] = np.nan if service_start_times is None else service_start_times
+        self.service_end_time[start:end] = np.nan if service_end_times is None else service_end_times
+        self.queue_id[start:end] = queue_ids
+        self.status[start:end] = STATUS_CODES["waiting"] if statuses is None else statuses
+        self.size = end
+
+    def drop_oldest(self, count):
+        """Remove the first count rows, keeping the allocated capacity"""
+        count = min(count, self.size)
+        if count <= 0:
+            return
+        remaining = self.size - count
+        for column in self.columns():
+            column[:remaining] = column[count:self.size]
+        self.size = remaining
+
+    def clear(self):
+        """Remove all records, keeping the allocated capacity"""
+        self.size = 0
+
+    def select(self, queue_id=None, status=None, last=None):
+        """Boolean mask of rows matching queue and status, among the newest last rows"""
+        mask = np.ones(self.size, dtype=bool)
+        if last is not None:
+            mask[:max(0, self.size - last)] = False
+        if queue_id is not None:
+            mask &= self.queue_id[:self.size] == queue_id
+        if status is not None:
+            mask &= self.status[:self.size] == STATUS_CODES[status]
+        return mask
+
+    def wait_times(self, current_time, mask=None):
+        """Wait time per row: until service start, or until now if still waiting"""
+        entry = self.entry_time[:self.size]
+        start = self.service_start_time[:self.size]
+        waits = np.where(np.isnan(start), current_time, start) - entry
+        return waits if mask is None else waits[mask]
+
+    def service_times(self, mask=None):
+        """Service time per completed row"""
+        durations = self.service_end_time[:self.size] - self.service_start_time[:self.size]
+        if mask is not None:
+            durations = durations[mask]
+        return durations[~np.isnan(durations)]
+
+    def summary(self, current_time, queue_id=None, last=None):
+        """Aggregate wait and service statistics"""
+        mask = self.select(queue_id=queue_id, last=last)
+        waits = self.wait_times(current_time, mask)
+        services = self.service_times(mask)
+
+        return {
+            'customers': int(mask.sum()),
+            'average_wait_time': float(waits.mean()) if len(waits) else 0,
+            'max_wait_time': float(waits.max()) if len(waits) else 0,
+            'p90_wait_time': float(np.percentile(waits, 90)) if len(waits) else 0,
+            'average_service_time': float(services.mean()) if len(services) else 0,
+            'served': int(len(services))
+        }
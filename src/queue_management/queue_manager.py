@@ -9,14 +9,28 @@ import numpy as np
 from datetime import datetime, timedelta
 from collections import defaultdict, deque
 import os
+from types import MappingProxyType
+
+from .customer_journal import CustomerJournal
+from .customer_table import CustomerTable
+from detector.counter_index import CounterIndex
+from storage.history import open_history_store
+from utils.clock import SystemClock
 
 class Customer:
     """Individual customer tracking class"""
     
+    # Slots keep per-customer memory small, there is one object per visit
+    __slots__ = (
+        'person_id', 'queue_id', 'entry_time', 'service_start_time', 'service_end_time',
+        'position', 'status', 'estimated_wait_time', 'actual_wait_time', 'service_time',
+        'customer_type'
+    )
+    
     def __init__(self, person_id, queue_id, entry_time=None):
         self.person_id = person_id
         self.queue_id = queue_id
-        self.entry_time = entry_time or time.time()
+        self.entry_time = entry_time if entry_time is not None else time.time()
         self.service_start_time = None
         self.service_end_time = None
         self.position = 0
@@ -26,24 +40,24 @@ class Customer:
         self.service_time = 0
         self.customer_type = "regular"  # regular, express
     
-    def start_service(self):
+    def start_service(self, timestamp=None):
         """Mark customer as starting service"""
-        self.service_start_time = time.time()
+        self.service_start_time = timestamp if timestamp is not None else time.time()
         self.actual_wait_time = self.service_start_time - self.entry_time
         self.status = "current"
     
-    def complete_service(self):
+    def complete_service(self, timestamp=None):
         """Mark customer service as complete"""
-        self.service_end_time = time.time()
+        self.service_end_time = timestamp if timestamp is not None else time.time()
         if self.service_start_time:
             self.service_time = self.service_end_time - self.service_start_time
         self.status = "served"
     
-    def get_current_wait_time(self):
+    def get_current_wait_time(self, current_time=None):
         """Get current wait time"""
         if self.service_start_time:
             return self.actual_wait_time
-        return time.time() - self.entry_time
+        return (current_time if current_time is not None else time.time()) - self.entry_time
     
     def to_dict(self):
         """Convert customer to dictionary for serialization"""
@@ -64,22 +78,44 @@ class Customer:
 class Queue:
     """Individual queue tracking class"""
     
-    def __init__(self, queue_id, queue_type="regular", position_coords=None):
+    def __init__(self, queue_id, queue_type="regular", position_coords=None,
+                 served_window=1000, on_evict=None, clock=None, on_service_complete=None,
+                 history_window=5000):
         self.queue_id = queue_id
+        self.clock = clock or SystemClock()
         self.queue_type = queue_type  # regular, express
         self.position_coords = position_coords or {}
         
         # Queue state
         self.customers = []
         self.current_customer = None
-        self.served_customers = []
         
-        # Performance metrics
+        # Recently served customers, older ones are handed to on_evict
+        self.served_window = served_window
+        self.served_customers = deque()
+        self.on_evict = on_evict
+        
+        # Called with (queue_id, service_time) whenever a service finishes
+        self.on_service_complete = on_service_complete
+        
+        # Compact timing record of recently served customers, the source of the
+        # rolling averages; older ones already reach the journal through on_evict
+        self.history_window = history_window
+        self.history = CustomerTable()
+        
+        # Snapshot caching: version bumps whenever queue contents change
+        self.version = 0
+        self._snapshot_version = -1
+        self._snapshot_base = None
+        self._snapshot = None
+        
+        # Performance metrics (totals stay exact after eviction)
         self.total_customers_served = 0
+        self.total_service_time = 0
+        self.total_wait_time = 0
         self.average_service_time = 0
         self.average_wait_time = 0
-        self.service_times = deque(maxlen=100)
-        self.wait_times = deque(maxlen=100)
+        self.average_window = 100  # served customers behind the rolling averages
         
         # Cashier tracking
         self.cashier_id = None
@@ -104,45 +140,72 @@ class Queue:
         customer.estimated_wait_time = self.calculate_estimated_wait_time()
         
         self.customers.append(customer)
+        self.mark_dirty()
         return True
     
     def serve_next_customer(self):
         """Move next customer to service position"""
         if self.customers and not self.current_customer:
             self.current_customer = self.customers.pop(0)
-            self.current_customer.start_service()
+            self.current_customer.start_service(self.clock.time())
             
             # Update positions for remaining customers
             for i, customer in enumerate(self.customers):
                 customer.position = i + 1
             
+            self.mark_dirty()
             return self.current_customer
         return None
     
     def complete_current_service(self):
         """Complete service for current customer"""
         if self.current_customer:
-            self.current_customer.complete_service()
+            self.current_customer.complete_service(self.clock.time())
             
             # Update metrics
-            self.service_times.append(self.current_customer.service_time)
-            self.wait_times.append(self.current_customer.actual_wait_time)
             self.total_customers_served += 1
+            self.total_service_time += self.current_customer.service_time
+            self.total_wait_time += self.current_customer.actual_wait_time
             
-            # Calculate averages
-            if self.service_times:
-                self.average_service_time = sum(self.service_times) / len(self.service_times)
-            if self.wait_times:
-                self.average_wait_time = sum(self.wait_times) / len(self.wait_times)
-            
-            # Archive served customer
+            # Archive served customer, then average over the newest rows
+            self.history.append_customer(self.current_customer)
+            self.trim_history()
+            summary = self.history.summary(self.clock.time(), last=self.average_window)
+            self.average_service_time = summary['average_service_time']
+            self.average_wait_time = summary['average_wait_time']
             self.served_customers.append(self.current_customer)
+            self.trim_served_customers()
             completed_customer = self.current_customer
             self.current_customer = None
             
+            if self.on_service_complete:
+                self.on_service_complete(self.queue_id, completed_customer.service_time)
+            
+            self.mark_dirty()
             return completed_customer
         return None
     
+    def trim_served_customers(self):
+        """Evict served customers beyond the in-memory window"""
+        if self.served_window is None or len(self.served_customers) <= self.served_window:
+            return
+        
+        evicted = []
+        while len(self.served_customers) > self.served_window:
+            evicted.append(self.served_customers.popleft())
+        
+        if self.on_evict:
+            self.on_evict(evicted)
+    
+    def trim_history(self):
+        """Drop the oldest history rows once the table outgrows its window"""
+        # Trim in batches so the row shift is amortized over many services
+        if self.history_window is None:
+            return
+        slack = max(1, self.history_window // 10)
+        if len(self.history) > self.history_window + slack:
+            self.history.drop_oldest(len(self.history) - self.history_window)
+    
     def calculate_estimated_wait_time(self):
         """Calculate estimated wait time for new customer"""
         if not self.customers and not self.current_customer:
@@ -155,7 +218,7 @@ class Queue:
         # Add current customer remaining time if any
         current_remaining = 0
         if self.current_customer and self.current_customer.service_start_time:
-            elapsed = time.time() - self.current_customer.service_start_time
+            elapsed = self.clock.time() - self.current_customer.service_start_time
             current_remaining = max(0, avg_service - elapsed)
         
         return current_remaining + (queue_length * avg_service)
@@ -167,10 +230,10 @@ class Queue:
             length += 1
         return length
     
-    def get_queue_status(self):
+    def get_queue_status(self, estimated_wait_time=None):
         """Get queue status for alerts"""
         length = self.get_queue_length()
-        avg_wait = self.calculate_estimated_wait_time()
+        avg_wait = estimated_wait_time if estimated_wait_time is not None else self.calculate_estimated_wait_time()
         
         if length > self.optimal_length * 2:
             return "critical"
@@ -183,6 +246,7 @@ class Queue:
     
     def to_dict(self):
         """Convert queue to dictionary"""
+        estimated_wait_time = self.calculate_estimated_wait_time()
         return {
             'queue_id': self.queue_id,
             'queue_type': self.queue_type,
@@ -192,20 +256,69 @@ class Queue:
             'average_service_time': self.average_service_time,
             'average_wait_time': self.average_wait_time,
             'queue_length': self.get_queue_length(),
-            'queue_status': self.get_queue_status(),
-            'estimated_wait_time': self.calculate_estimated_wait_time(),
+            'queue_status': self.get_queue_status(estimated_wait_time),
+            'estimated_wait_time': estimated_wait_time,
             'cashier_id': self.cashier_id,
             'status': self.status
         }
+    
+    def mark_dirty(self):
+        """Invalidate the cached snapshot after changing queue contents"""
+        self.version += 1
+    
+    def snapshot(self):
+        """Get a read-only view of the queue, reusing the last one when nothing changed"""
+        estimated_wait_time = self.calculate_estimated_wait_time()
+        
+        if (self._snapshot is not None and self._snapshot_version == self.version and
+                self._snapshot['estimated_wait_time'] == estimated_wait_time):
+            return self._snapshot
+        
+        # Customers are only re-serialized when the queue contents changed
+        if self._snapshot_version != self.version:
+            self._snapshot_base = {
+                'queue_id': self.queue_id,
+                'queue_type': self.queue_type,
+                'customers': tuple(MappingProxyType(c.to_dict()) for c in self.customers),
+                'current_customer': (MappingProxyType(self.current_customer.to_dict())
+                                     if self.current_customer else None),
+                'total_customers_served': self.total_customers_served,
+                'average_service_time': self.average_service_time,
+                'average_wait_time': self.average_wait_time,
+                'queue_length': self.get_queue_length(),
+                'cashier_id': self.cashier_id,
+                'status': self.status
+            }
+            self._snapshot_version = self.version
+        
+        view = dict(self._snapshot_base)
+        view['queue_status'] = self.get_queue_status(estimated_wait_time)
+        view['estimated_wait_time'] = estimated_wait_time
+        self._snapshot = MappingProxyType(view)
+        return self._snapshot
 
 class QueueManager:
     """Main queue management class"""
     
-    def __init__(self, config):
+    def __init__(self, config, clock=None):
         self.config = config
         self.queue_config = config["queue"]
+        self.clock = clock or SystemClock()
         self.counter_config = config["counters"]
         
+        # In-memory retention, evicted customers are spilled to the journal
+        retention_config = self.queue_config.get("retention", {})
+        self.served_window = retention_config.get("served_window", 1000)
+        self.customer_window = retention_config.get("customer_window", 5000)
+        self.journal = CustomerJournal(
+            retention_config.get("journal_path", os.path.join("data", "customer_journal.jsonl"))
+        )
+        self.customers_evicted = 0
+        self.total_customers_seen = 0
+        
+        # Optional hook receiving (queue_id, service_time) of every finished service
+        self.on_service_complete = None
+        
         # Initialize queues
         self.queues = {}
         self.initialize_queues()
@@ -217,6 +330,7 @@ class QueueManager:
         # Data storage
         self.data_dir = "data"
         os.makedirs(self.data_dir, exist_ok=True)
+        self.snapshot_store = open_history_store(config.get("analytics", {}), self.clock)
         
         # Performance tracking
         self.daily_stats = defaultdict(list)
@@ -229,6 +343,9 @@ class QueueManager:
         express_lanes = self.counter_config.get("express_lanes", [])
         counter_positions = self.counter_config.get("counter_positions", {})
         
+        # Counter rectangles compiled once for vectorized assignment
+        self.counter_index = CounterIndex(counter_positions)
+        
         for counter_id in range(1, self.counter_config["total_counters"] + 1):
             queue_type = "express" if counter_id in express_lanes else "regular"
             position_coords = counter_positions.get(str(counter_id), {})
@@ -236,44 +353,47 @@ class QueueManager:
             self.queues[counter_id] = Queue(
                 queue_id=counter_id,
                 queue_type=queue_type,
-                position_coords=position_coords
+                position_coords=position_coords,
+                served_window=self.served_window,
+                on_evict=self.journal.append,
+                clock=self.clock,
+                on_service_complete=self.service_completed,
+                history_window=self.customer_window
             )
     
+    def service_completed(self, queue_id, service_time):
+        """Forward a finished service to the on_service_complete hook"""
+        if self.on_service_complete:
+            self.on_service_complete(queue_id, service_time)
+    
     def update_queues(self, detections, frame_shape):
         """Update queue information based on detections"""
-        current_time = time.time()
+        current_time = self.clock.time()
+        
+        # Assign every detection to one counter in one broadcast comparison; a
+        # person standing where counters overlap must not join both queues
+        members = self.counter_index.assign_nearest([d.get('center', [0, 0]) for d in detections])
         
         # Track persons in each queue area
         for queue_id, queue in self.queues.items():
-            persons_in_queue = self.get_persons_in_queue_area(detections, queue_id, frame_shape)
+            persons_in_queue = [detections[i] for i in members.get(queue_id, [])]
             self.update_queue_customers(queue, persons_in_queue, current_time)
         
         # Update customer-queue mapping
         self.update_customer_mapping()
+        self.trim_customers()
         
-        # Generate queue data for visualization
+        # Read-only snapshots for visualization, analytics and alerts
         queue_data = {}
         for queue_id, queue in self.queues.items():
-            queue_data[queue_id] = queue.to_dict()
+            queue_data[queue_id] = queue.snapshot()
         
-        return queue_data
+        return MappingProxyType(queue_data)
     
     def get_persons_in_queue_area(self, detections, queue_id, frame_shape):
         """Get persons detected in specific queue area"""
-        if str(queue_id) not in self.counter_config["counter_positions"]:
-            return []
-        
-        position = self.counter_config["counter_positions"][str(queue_id)]
-        x, y, w, h = position["x"], position["y"], position["width"], position["height"]
-        
-        persons_in_area = []
-        for detection in detections:
-            center_x, center_y = detection.get('center', [0, 0])
-            
-            if x <= center_x <= x + w and y <= center_y <= y + h:
-                persons_in_area.append(detection)
-        
-        return persons_in_area
+        centers = [d.get('center', [0, 0]) for d in detections]
+        return [detections[i] for i in self.counter_index.members_of(centers, queue_id)]
     
     def update_queue_customers(self, queue, persons_in_area, current_time):
         """Update customers in a specific queue"""
@@ -282,20 +402,24 @@ class QueueManager:
         
         # Determine current customer (closest to checkout)
         if persons_in_area:
-            # First person is likely being served
-            current_detection = persons_in_area[0]
+            person_ids = [self.get_or_create_customer_id(p, queue.queue_id) for p in persons_in_area]
+            tracked = all('track_id' in p for p in persons_in_area)
+            
+            # With stable IDs we can tell when the customer being served left
+            if tracked and queue.current_customer and queue.current_customer.person_id not in person_ids:
+                queue.complete_current_service()
             
             # Check if we need to start service for a new customer
             if not queue.current_customer:
-                # Look for existing customer or create new one
-                customer_id = self.get_or_create_customer_id(current_detection, queue.queue_id)
-                customer = Customer(customer_id, queue.queue_id)
-                queue.current_customer = customer
-                queue.current_customer.start_service()
-                self.all_customers[customer_id] = customer
+                # First person is likely being served
+                self.start_customer_service(queue, person_ids[0], current_time)
             
             # Handle waiting customers
-            waiting_detections = persons_in_area[1:] if len(persons_in_area) > 1 else []
+            if tracked:
+                current_id = queue.current_customer.person_id
+                waiting_detections = [p for p, pid in zip(persons_in_area, person_ids) if pid != current_id]
+            else:
+                waiting_detections = persons_in_area[1:] if len(persons_in_area) > 1 else []
             self.update_waiting_customers(queue, waiting_detections, current_time)
         
         else:
@@ -306,38 +430,69 @@ class QueueManager:
                     # Serve next customer if any
                     queue.serve_next_customer()
     
+    def start_customer_service(self, queue, customer_id, current_time):
+        """Start service for a customer, promoting them from the waiting line if queued"""
+        customer = None
+        for waiting_customer in queue.customers:
+            if waiting_customer.person_id == customer_id:
+                customer = waiting_customer
+                break
+        
+        if customer is not None:
+            queue.customers.remove(customer)
+        else:
+            # Look for existing customer or create new one
+            customer = self.all_customers.get(customer_id)
+            if customer is None or customer.status != "waiting":
+                customer = Customer(customer_id, queue.queue_id, current_time)
+                self.total_customers_seen += 1
+        
+        customer.queue_id = queue.queue_id
+        queue.current_customer = customer
+        queue.current_customer.start_service(current_time)
+        queue.mark_dirty()
+        self.all_customers[customer_id] = customer
+    
     def update_waiting_customers(self, queue, waiting_detections, current_time):
         """Update waiting customers in queue"""
         # Remove customers who are no longer in queue
         current_customer_ids = set()
+        queued_customers = {customer.person_id: customer for customer in queue.customers}
         
         for detection in waiting_detections:
             customer_id = self.get_or_create_customer_id(detection, queue.queue_id)
             current_customer_ids.add(customer_id)
             
             # Check if customer is already in queue
-            existing_customer = None
-            for customer in queue.customers:
-                if customer.person_id == customer_id:
-                    existing_customer = customer
-                    break
-            
-            if not existing_customer:
-                # New customer joining queue
-                new_customer = Customer(customer_id, queue.queue_id, current_time)
+            if customer_id not in queued_customers:
+                # Returning customer keeps their entry time, otherwise a new one joins
+                new_customer = self.all_customers.get(customer_id)
+                if new_customer is None or new_customer.status != "waiting":
+                    new_customer = Customer(customer_id, queue.queue_id, current_time)
+                    self.total_customers_seen += 1
                 queue.add_customer(new_customer)
+                queued_customers[customer_id] = new_customer
                 self.all_customers[customer_id] = new_customer
         
         # Remove customers who left the queue
-        queue.customers = [c for c in queue.customers if c.person_id in current_customer_ids]
+        remaining = [c for c in queue.customers if c.person_id in current_customer_ids]
+        if len(remaining) != len(queue.customers):
+            queue.customers = remaining
+            queue.mark_dirty()
         
         # Update positions
         for i, customer in enumerate(queue.customers):
-            customer.position = i + 1
+            if customer.position != i + 1:
+                customer.position = i + 1
+                queue.mark_dirty()
     
     def get_or_create_customer_id(self, detection, queue_id):
         """Get or create unique customer ID"""
-        # Use detection center as a simple ID (in real implementation, use proper tracking)
+        # Tracker IDs are stable for a person's whole visit
+        if 'track_id' in detection:
+            return f"customer_{detection['track_id']}"
+        
+        # Fall back to detection center when no tracker is running
         center = detection.get('center', [0, 0])
         return f"customer_{queue_id}_{center[0]}_{center[1]}"
     
@@ -352,6 +507,41 @@ class QueueManager:
             for customer in queue.customers:
                 self.customer_queue_mapping[customer.person_id] = queue_id
     
+    def trim_customers(self):
+        """Evict the oldest inactive customers once all_customers outgrows its window"""
+        # Trim in batches so the scan is amortized over many frames
+        slack = max(1, self.customer_window // 10)
+        if len(self.all_customers) <= self.customer_window + slack:
+            return
+        
+        abandoned = []
+        excess = len(self.all_customers) - self.customer_window
+        for customer_id in list(self.all_customers):
+            if excess <= 0:
+                break
+            if customer_id in self.customer_queue_mapping:
+                continue
+            
+            customer = self.all_customers.pop(customer_id)
+            excess -= 1
+            self.customers_evicted += 1
+            
+            # Served customers reach the journal through their queue's window
+            if customer.status != "served":
+                abandoned.append(customer)
+        
+        self.journal.append(abandoned)
+    
+    def get_retention_stats(self):
+        """Get in-memory retention statistics"""
+        return {
+            'customers_in_memory': len(self.all_customers),
+            'served_in_memory': sum(len(q.served_customers) for q in self.queues.values()),
+            'customers_evicted': self.customers_evicted,
+            'total_customers_seen': self.total_customers_seen,
+            'journal_records': self.journal.records_written
+        }
+    
     def get_queue_recommendations(self):
         """Get recommendations for queue optimization"""
         recommendations = []
@@ -414,19 +604,17 @@ class QueueManager:
         return metrics
     
     def save_queue_data(self):
-        """Save queue data to file"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = os.path.join(self.data_dir, f"queue_data_{timestamp}.json")
+        """Save queue data to the snapshot store"""
+        current_time = self.clock.time()
         
         data = {
-            'timestamp': timestamp,
+            'timestamp': datetime.fromtimestamp(current_time).strftime("%Y%m%d_%H%M%S"),
             'queues': {qid: q.to_dict() for qid, q in self.queues.items()},
             'performance_metrics': self.get_performance_metrics(),
             'recommendations': self.get_queue_recommendations()
         }
         
-        with open(filename, 'w') as f:
-            json.dump(data, f, indent=2)
+        self.snapshot_store.append('queue', data, current_time)
     
     def reset_counters(self):
         """Reset all queue counters"""
@@ -434,14 +622,18 @@ class QueueManager:
             queue.customers.clear()
             queue.current_customer = None
             queue.served_customers.clear()
+            queue.history.clear()
             queue.total_customers_served = 0
-            queue.service_times.clear()
-            queue.wait_times.clear()
+            queue.total_service_time = 0
+            queue.total_wait_time = 0
             queue.average_service_time = 0
             queue.average_wait_time = 0
+            queue.mark_dirty()
         
         self.all_customers.clear()
         self.customer_queue_mapping.clear()
+        self.customers_evicted = 0
+        self.total_customers_seen = 0
         print("All queue counters reset")
     
     def get_queue_separation_lines(self, queue_id, frame_shape):
@@ -0,0 +1 @@
+# Replay module
@@ -0,0 +1,216 @@
+"""
+Detection Recording Module
+Compact memory-mappable recordings of per-frame detections and track IDs
+"""
+
+import json
+import os
+import struct
+import threading
+
+import numpy as np
+
+RECORDING_MAGIC = b"QVDETREC"
+RECORDING_VERSION = 1
+TRAILER = struct.Struct("<QQ8s")  # index offset, metadata length, magic
+
+# One row per detection, frames index into it with (start, count)
+DETECTION_DTYPE = np.dtype([
+    ('x', '<i4'), ('y', '<i4'), ('width', '<i4'), ('height', '<i4'),
+    ('center_x', '<i4'), ('center_y', '<i4'),
+    ('confidence', '<f4'), ('track_id', '<i8')
+])
+FRAME_DTYPE = np.dtype([('timestamp', '<f8'), ('start', '<i8'), ('count', '<i4')])
+
+NO_TRACK = -1
+
+def detections_to_rows(detections):
+    """Pack detection dicts into DETECTION_DTYPE rows"""
+    return np.array([(*detection['bbox'], *detection['center'], detection['confidence'],
+                      detection.get('track_id', NO_TRACK)) for detection in detections],
+                    dtype=DETECTION_DTYPE)
+
+def rows_to_detections(rows):
+    """Detection dicts, as the detector returns them, from recorded rows"""
+    detections = []
+    for x, y, width, height, center_x, center_y, confidence, track_id in rows.tolist():
+        detection = {'bbox': [x, y, width, height], 'confidence': confidence, 'center': [center_x, center_y]}
+        if track_id != NO_TRACK:
+            detection['track_id'] = track_id
+        detections.append(detection)
+    return detections
+
+class DetectionRecorder:
+    """Appends per-frame detections to a recording file
+
+    Detection rows are streamed to a temp file as frames arrive; close()
+    appends the frame index and metadata and renames the file into place,
+    so an interrupted recording is never mistaken for a complete one.
+    """
+
+    def __init__(self, path, frame_shape=None, metadata=None):
+        self.path = path
+        self.temp_path = path + '.tmp'
+        self.frame_shape = tuple(frame_shape) if frame_shape else None
+        self.metadata = dict(metadata or {})
+        self.frames = []  # (timestamp, start, count)
+        self.detection_count = 0
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(self.temp_path, 'wb')
+
+    def record(self, timestamp, detections, frame_shape=None):
+        """Append one frame's detections"""
+        rows = detections_to_rows(detections)
+        with self.lock:
+            if self.file is None:
+                raise ValueError(f"Recording {self.path} is closed")
+            if frame_shape is not None and self.frame_shape is None:
+                self.frame_shape = tuple(frame_shape)
+            self.file.write(rows.tobytes())
+            self.frames.append((timestamp, self.detection_count, len(rows)))
+            self.detection_count += len(rows)
+
+    def close(self):
+        """Write the frame index and metadata and publish the recording"""
+        with self.lock:
+            if self.file is None:
+                return
+            index = np.array(self.frames, dtype=FRAME_DTYPE)
+            metadata = dict(self.metadata)
+            metadata.update({
+                'version': RECORDING_VERSION,
+                'frames': len(index),
+                'detections': self.detection_count,
+                'frame_shape': list(self.frame_shape) if self.frame_shape else None
+            })
+            encoded = json.dumps(metadata, separators=(',', ':')).encode()
+
+            index_offset = self.detection_count * DETECTION_DTYPE.itemsize
+            self.file.write(index.tobytes())
+            self.file.write(encoded)
+            self.file.write(TRAILER.pack(index_offset, len(encoded), RECORDING_MAGIC))
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+            self.file = None
+            os.replace(self.temp_path, self.path)
+
+class DetectionRecording:
+    """Read-only memory-mapped view of a recording
+
+    Iterating yields (timestamp, detections) per frame, so a recording can
+    be passed straight to ReplayEngine.run.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            f.seek(size - TRAILER.size)
+            index_offset, metadata_length, magic = TRAILER.unpack(f.read(TRAILER.size))
+            if magic != RECORDING_MAGIC:
+                raise ValueError(f"{path} is not a detection recording")
+            f.seek(size - TRAILER.size - metadata_length)
+            self.metadata = json.loads(f.read(metadata_length))
+        if self.metadata.get('version') != RECORDING_VERSION:
+            raise ValueError(f"Unsupported recording version: {self.metadata.get('version')}")
+
+        frame_shape = self.metadata.get('frame_shape')
+        self.frame_shape = tuple(frame_shape) if frame_shape else None
+
+        # np.memmap cannot map zero-length arrays
+        num_detections = self.metadata['detections']
+        num_frames = self.metadata['frames']
+        self.detections = (np.memmap(path, dtype=DETECTION_DTYPE, mode='r', shape=(num_detections,))
+                           if num_detections else np.empty(0, dtype=DETECTION_DTYPE))
+        self.index = (np.memmap(path, dtype=FRAME_DTYPE, mode='r', offset=index_offset, shape=(num_frames,))
+                      if num_frames else np.empty(0, dtype=FRAME_DTYPE))
+
+    def __len__(self):
+        return len(self.index)
+
+    def __iter__(self):
+        for frame_index in range(len(self.index)):
+            yield self.frame(frame_index)
+
+    @property
+    def timestamps(self):
+        """Frame timestamps, oldest first"""
+        return self.index['timestamp']
+
+    def frame(self, frame_index):
+        """(timestamp, detections) of one frame"""
+        timestamp, start, count = self.index[frame_index].tolist()
+        return timestamp, rows_to_detections(self.detections[start:start + count])
+
+    def frame_at(self, timestamp):
+        """Index of the first frame at or after timestamp"""
+        return int(np.searchsorted(self.index['timestamp'], timestamp, side='left'))
+
+    def frames_between(self, start_time=None, end_time=None):
+        """Iterate over (timestamp, detections) with start_time <= timestamp <= end_time"""
+        first = 0 if start_time is None else self.frame_at(start_time)
+        last = (len(self.index) if end_time is None else
+                int(np.searchsorted(self.index['timestamp'], end_time, side='right')))
+        for frame_index in range(first, last):
+            yield self.frame(frame_index)
+
+    def close(self):
+        """Drop the memory maps"""
+        self.detections = np.empty(0, dtype=DETECTION_DTYPE)
+        self.index = np.empty(0, dtype=FRAME_DTYPE)
+
+class DetectionReplaySource:
+    """Stands in for PersonDetector, returning recorded detections frame by frame
+
+    Each detect_persons call returns the next recorded frame, whatever the
+    pixels, and sets a ManualClock to that frame's timestamp. Recorded
+    detections already carry their track IDs, so track_persons keeps them.
+    """
+
+    def __init__(self, recording, clock=None):
+        self.recording = recording if isinstance(recording, DetectionRecording) else DetectionRecording(recording)
+        self.clock = clock
+        self.position = 0
+        self.model_ready = threading.Event()
+        self.model_ready.set()
+
+    @property
+    def finished(self):
+        """Whether every recorded frame has been returned"""
+        return self.position >= len(self.recording)
+
+    def wait_until_ready(self, timeout=None):
+        """Recordings are always ready"""
+        return True
+
+    def detect_persons(self, frame=None):
+        """Detections of the next recorded frame; [] after the last one"""
+        if self.finished:
+            return []
+        timestamp, detections = self.recording.frame(self.position)
+        self.position += 1
+        if self.clock is not None and hasattr(self.clock, 'set'):
+            self.clock.set(timestamp)
+        return detections
+
+    def track_persons(self, detections):
+        """Recorded detections keep their recorded track IDs"""
+        return detections
+
+    def get_detection_stats(self):
+        """Replay progress in the shape of PersonDetector stats"""
+        return {
+            'avg_detection_time': 0,
+            'fps': 0,
+            'total_detections': self.recording.metadata['detections'],
+            'model_ready': True,
+            'model_load_time': 0,
+            'frames_before_ready': 0,
+            'replayed_frames': self.position,
+            'recorded_frames': len(self.recording)
+        }
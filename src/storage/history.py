@@ -0,0 +1,49 @@
+"""
+History Store Module
+Opens the configured snapshot store, shared by every component using a path
+"""
+
+import os
+import threading
+
+from .snapshot_store import SnapshotStore
+from .segment_journal import SegmentJournal
+
+HISTORY_BACKENDS = ("sqlite", "segments")
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def open_history_store(analytics_config, clock=None):
+    """Get the shared store for config["analytics"]
+
+    The clock (wall clock by default) times journal segment rotation; the
+    first component opening a path decides it.
+    """
+    backend = analytics_config.get("history_backend", "sqlite")
+    if backend not in HISTORY_BACKENDS:
+        raise ValueError(f"Unknown history backend: {backend}")
+
+    if backend == "segments":
+        journal_config = analytics_config.get("journal", {})
+        path = journal_config.get("path", os.path.join("data", "journal"))
+    else:
+        path = analytics_config.get("history_db", os.path.join("data", "history.db"))
+
+    key = (backend, os.path.abspath(path))
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None or store.closed:
+            if backend == "segments":
+                store = SegmentJournal(
+                    path,
+                    compression=journal_config.get("compression", "gzip"),
+                    max_segment_bytes=journal_config.get("max_segment_bytes", 8 * 2**20),
+                    max_segment_seconds=journal_config.get("max_segment_seconds", 3600),
+                    block_records=journal_config.get("block_records", 256),
+                    clock=clock
+                )
+            else:
+                store = SnapshotStore(path)
+            _stores[key] = store
+        return store
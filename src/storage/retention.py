@@ -0,0 +1,218 @@
+"""
+Retention Module
+Compacts old snapshots into hourly/daily rollups and expires old data files
+"""
+
+import json
+import os
+import time
+
+from utils.clock import SystemClock
+
+RAW_KINDS = ("queue", "performance")
+HOUR = 3600
+DAY = 86400
+
+def combine_values(values, weights):
+    """Weighted mean of numbers and dicts of numbers; other values keep the latest"""
+    dicts = [(value, weight) for value, weight in zip(values, weights) if isinstance(value, dict)]
+    if dicts:
+        keys = []
+        for value, _ in dicts:
+            keys.extend(key for key in value if key not in keys)
+        combined = {}
+        for key in keys:
+            pairs = [(value[key], weight) for value, weight in dicts if key in value]
+            result = combine_values([v for v, _ in pairs], [w for _, w in pairs])
+            if result is not None:
+                combined[key] = result
+        return combined
+
+    numbers = [(value, weight) for value, weight in zip(values, weights)
+               if isinstance(value, (int, float)) and not isinstance(value, bool)]
+    if numbers:
+        total_weight = sum(weight for _, weight in numbers)
+        return sum(value * weight for value, weight in numbers) / total_weight
+
+    # Strings and flags keep their latest value, lists are not rolled up
+    scalars = [value for value in values if isinstance(value, (str, bool))]
+    return scalars[-1] if scalars else None
+
+def rollup_snapshots(snapshots, period, period_start):
+    """Roll snapshots (or finer rollups) up into one record keeping their layout"""
+    weights = [snapshot.get('samples', 1) for snapshot in snapshots]
+    payloads = [{k: v for k, v in snapshot.items() if k not in ('ts', 'samples', 'period', 'period_start')}
+                for snapshot in snapshots]
+
+    rollup = combine_values(payloads, weights)
+    rollup.update({
+        'period': period,
+        'period_start': period_start,
+        'samples': sum(weights)
+    })
+    return rollup
+
+class RetentionManager:
+    """Enforces analytics.data_retention_days on the history store and data files"""
+
+    def __init__(self, config, store, clock=None):
+        self.analytics_config = config["analytics"]
+        self.retention_config = self.analytics_config.get("retention", {})
+        self.store = store
+        self.clock = clock or SystemClock()
+
+        self.retention_days = self.analytics_config.get("data_retention_days", 30)
+        self.raw_hours = self.retention_config.get("raw_hours", 48)
+        self.daily_retention_days = self.retention_config.get("daily_retention_days", 365)
+        self.interval_seconds = self.retention_config.get("interval_seconds", 3600)
+        self.batch_size = self.retention_config.get("batch_size", 200)
+        self.max_batches = self.retention_config.get("max_batches", 50)
+        self.pause_seconds = self.retention_config.get("pause_seconds", 0.05)
+        self.expire_files = self.retention_config.get("expire_files", {
+            "data": "queue_data_",
+            "data/performance": "performance_",
+            "data/reports": "",
+            "data/charts": ""
+        })
+
+    def new_report(self, dry_run):
+        """Empty run report"""
+        return {
+            'dry_run': dry_run,
+            'snapshots_compacted': 0,
+            'rollups_written': 0,
+            'rollups_expired': 0,
+            'files_deleted': 0,
+            'bytes_reclaimed': 0,
+            'batches': 0
+        }
+
+    def run(self, dry_run=False, now=None, should_stop=None):
+        """One compaction pass; with dry_run nothing is written or deleted"""
+        if now is None:
+            now = self.clock.time()
+        report = self.new_report(dry_run)
+
+        steps = []
+        for kind in RAW_KINDS:
+            steps.append((kind, f"{kind}_hourly", 'hour', HOUR, now - self.raw_hours * HOUR))
+        for kind in RAW_KINDS:
+            steps.append((f"{kind}_hourly", f"{kind}_daily", 'day', DAY, now - self.retention_days * DAY))
+
+        # Rollups a dry run would have written, so later steps see them
+        pending = {}
+        for source_kind, target_kind, period, period_seconds, cutoff in steps:
+            self.compact(source_kind, target_kind, period, period_seconds, cutoff, report, dry_run,
+                         should_stop, pending)
+
+        for kind in RAW_KINDS:
+            self.expire_rollups(f"{kind}_daily", now - self.daily_retention_days * DAY, report, dry_run, pending)
+
+        self.expire_data_files(now - self.retention_days * DAY, report, dry_run, should_stop)
+        return report
+
+    def first_timestamp(self, kind, pending, start_time=None):
+        """Oldest timestamp of one kind in the store or pending rollups, or None"""
+        candidates = [rollup['ts'] for rollup in pending.get(kind, [])
+                      if start_time is None or rollup['ts'] >= start_time]
+        first = self.store.first_timestamp(kind, start_time)
+        if first is not None:
+            candidates.append(first)
+        return min(candidates) if candidates else None
+
+    def pace(self, report, should_stop):
+        """Count a batch and yield I/O to the frame loop; False once the budget is spent"""
+        report['batches'] += 1
+        if self.pause_seconds:
+            time.sleep(self.pause_seconds)
+        if should_stop and should_stop():
+            return False
+        return report['batches'] < self.max_batches
+
+    def compact(self, source_kind, target_kind, period, period_seconds, cutoff, report, dry_run,
+                should_stop, pending=None):
+        """Replace whole periods of source_kind older than cutoff by one rollup each"""
+        if pending is None:
+            pending = {}
+        first = self.first_timestamp(source_kind, pending)
+        while first is not None and report['batches'] < self.max_batches:
+            start = first - first % period_seconds
+            end = start + period_seconds
+            if end > cutoff:
+                break
+
+            snapshots = [s for s in self.store.query(source_kind, start, end) if s['ts'] < end]
+            snapshots += [r for r in pending.get(source_kind, []) if start <= r['ts'] < end]
+            if snapshots:
+                rollup = rollup_snapshots(snapshots, period, start)
+                report['snapshots_compacted'] += len(snapshots)
+                report['rollups_written'] += 1
+                report['bytes_reclaimed'] += (self.encoded_size(snapshots) - self.encoded_size([rollup]))
+                if dry_run:
+                    pending.setdefault(target_kind, []).append(dict(rollup, ts=start))
+                else:
+                    # One step, so a crash never leaves the period both raw and rolled up
+                    self.store.replace_range(source_kind, start, end, target_kind, rollup, start)
+
+            if not self.pace(report, should_stop):
+                break
+            first = self.first_timestamp(source_kind, pending, end)
+
+    def expire_rollups(self, kind, cutoff, report, dry_run, pending=None):
+        """Delete rollups older than cutoff"""
+        expired = self.store.query(kind, end_time=cutoff)
+        expired += (pending or {}).get(kind, [])
+        expired = [s for s in expired if s['ts'] < cutoff]
+        if not expired:
+            return
+        report['rollups_expired'] += len(expired)
+        report['bytes_reclaimed'] += self.encoded_size(expired)
+        if not dry_run:
+            self.store.delete_range(kind, 0, cutoff)
+
+    def expire_data_files(self, cutoff, report, dry_run, should_stop):
+        """Delete report, chart and legacy snapshot files last modified before cutoff"""
+        batch = []
+        for directory, prefix in self.expire_files.items():
+            if not os.path.isdir(directory):
+                continue
+            for filename in sorted(os.listdir(directory)):
+                path = os.path.join(directory, filename)
+                if not filename.startswith(prefix) or not os.path.isfile(path):
+                    continue
+                stat = os.stat(path)
+                if stat.st_mtime >= cutoff:
+                    continue
+
+                report['files_deleted'] += 1
+                report['bytes_reclaimed'] += stat.st_size
+                if not dry_run:
+                    batch.append(path)
+                    if len(batch) >= self.batch_size:
+                        self.delete_files(batch)
+                        batch = []
+                        if not self.pace(report, should_stop):
+                            return
+        self.delete_files(batch)
+
+    @staticmethod
+    def encoded_size(snapshots):
+        """Compact JSON size of snapshots"""
+        return sum(len(json.dumps(s, separators=(',', ':'))) for s in snapshots)
+
+    @staticmethod
+    def delete_files(paths):
+        """Delete files, ignoring ones already gone"""
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def format_report(report):
+        """One-line summary of a run report"""
+        verb = "Would reclaim" if report['dry_run'] else "Reclaimed"
+        return (f"{verb} {report['bytes_reclaimed'] / 2**20:.1f} MB: "
+                f"{report['snapshots_compacted']} snapshots into {report['rollups_written']} rollups, "
+                f"{report['rollups_expired']} expired rollups, {report['files_deleted']} files")
@@ -0,0 +1,387 @@
+"""
+Segment Journal Module
+Rolling append-only snapshot journal sealed into compressed, indexed segments
+"""
+
+import gzip
+import json
+import math
+import os
+import struct
+import threading
+
+from utils.clock import SystemClock
+from .snapshot_store import read_legacy_json_files
+
+# Try to import zstandard, fall back to gzip without it
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+SEGMENT_MAGIC = b"QVSEGIDX"
+TRAILER = struct.Struct("<Q8s")  # footer length, magic
+
+def compress(codec, data):
+    """Compress one block"""
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=6)
+    return data
+
+def decompress(codec, data):
+    """Decompress one block"""
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "gzip":
+        return gzip.decompress(data)
+    return data
+
+class SegmentJournal:
+    """Snapshot store writing NDJSON segments, rotated into compressed indexed files
+
+    The active segment is plain newline-delimited JSON opened for append.
+    On rotation it is rewritten as independently compressed blocks followed
+    by a JSON index footer, via a temp file and rename, so sealed segments
+    are never seen half written.
+    """
+
+    def __init__(self, directory="data/journal", compression="gzip", max_segment_bytes=8 * 2**20,
+                 max_segment_seconds=3600, block_records=256, clock=None):
+        self.directory = directory
+        self.clock = clock or SystemClock()
+        if compression == "zstd" and not HAS_ZSTD:
+            print("Warning: zstandard not available, journal segments use gzip")
+            compression = "gzip"
+        self.compression = compression
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_seconds = max_segment_seconds
+        self.block_records = block_records
+        self.closed = False
+
+        self.lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+        # Drop temp files of interrupted seals, then seal leftover active segments
+        for filename in os.listdir(self.directory):
+            if filename.endswith('.tmp'):
+                os.remove(os.path.join(self.directory, filename))
+        for path in self.list_files('.ndjson'):
+            self.seal_file(path)
+
+        # Index footers of sealed segments, oldest first
+        self.segments = [(path, self.read_footer(path)) for path in self.list_files('.seg')]
+        self.next_sequence = self.sequence_of(self.segments[-1][0]) + 1 if self.segments else 0
+
+        self.active_file = None
+        self.active_path = None
+        self.active_records = []  # (ts, kind, line)
+        self.active_bytes = 0
+        self.active_started = 0
+
+    def list_files(self, extension):
+        """Segment files with an extension, in sequence order"""
+        names = sorted(f for f in os.listdir(self.directory)
+                       if f.startswith('segment_') and f.endswith(extension))
+        return [os.path.join(self.directory, name) for name in names]
+
+    @staticmethod
+    def sequence_of(path):
+        """Sequence number from a segment file name"""
+        return int(os.path.basename(path).split('.')[0][len('segment_'):])
+
+    def append(self, kind, payload, timestamp=None):
+        """Store one snapshot; raises ValueError once the journal is closed"""
+        if timestamp is None:
+            timestamp = self.clock.time()
+        line = json.dumps({'ts': timestamp, 'kind': kind, 'data': payload}, separators=(',', ':'))
+
+        with self.lock:
+            if self.closed:
+                raise ValueError(f"Journal {self.directory} is closed")
+            if self.active_file is None:
+                self.open_segment()
+            self.active_file.write(line + '\n')
+            self.active_file.flush()
+            self.active_records.append((timestamp, kind, line))
+            self.active_bytes += len(line) + 1
+
+            if (self.active_bytes >= self.max_segment_bytes or
+                    self.clock.time() - self.active_started >= self.max_segment_seconds):
+                self.rotate()
+
+    def open_segment(self):
+        """Start a new active segment"""
+        self.active_path = os.path.join(self.directory, f"segment_{self.next_sequence:08d}.ndjson")
+        self.next_sequence += 1
+        self.active_file = open(self.active_path, 'a')
+        self.active_records = []
+        self.active_bytes = 0
+        self.active_started = self.clock.time()
+
+    def rotate(self):
+        """Seal the active segment (lock held)"""
+        if self.active_file is None:
+            return
+        self.active_file.close()
+        self.active_file = None
+        sealed_path = self.seal_file(self.active_path)
+        if sealed_path:
+            self.segments.append((sealed_path, self.read_footer(sealed_path)))
+        self.active_path = None
+        self.active_records = []
+        self.active_bytes = 0
+
+    def seal_file(self, path):
+        """Rewrite an NDJSON segment as compressed blocks plus index footer"""
+        records = []
+        with open(path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash can leave a partial last line
+                    continue
+                records.append((record['ts'], record['kind'], line))
+
+        if not records:
+            os.remove(path)
+            return None
+
+        sealed_path = path[:-len('.ndjson')] + '.seg'
+        self.write_sealed(sealed_path, records)
+        os.remove(path)
+        return sealed_path
+
+    def write_sealed(self, sealed_path, records):
+        """Atomically write (ts, kind, line) records as a sealed segment"""
+        temp_path = sealed_path + '.tmp'
+        blocks = []
+        kinds = {}
+        offset = 0
+        with open(temp_path, 'wb') as f:
+            for start in range(0, len(records), self.block_records):
+                block = records[start:start + self.block_records]
+                data = compress(self.compression, ('\n'.join(line for _, _, line in block)).encode())
+                f.write(data)
+                timestamps = [ts for ts, _, _ in block]
+                block_kinds = sorted({kind for _, kind, _ in block})
+                blocks.append({
+                    'offset': offset,
+                    'length': len(data),
+                    'count': len(block),
+                    'start_ts': min(timestamps),
+                    'end_ts': max(timestamps),
+                    'kinds': block_kinds
+                })
+                offset += len(data)
+                for _, kind, _ in block:
+                    kinds[kind] = kinds.get(kind, 0) + 1
+
+            footer = json.dumps({
+                'codec': self.compression,
+                'count': len(records),
+                'start_ts': min(b['start_ts'] for b in blocks),
+                'end_ts': max(b['end_ts'] for b in blocks),
+                'kinds': kinds,
+                'blocks': blocks
+            }, separators=(',', ':')).encode()
+            f.write(footer)
+            f.write(TRAILER.pack(len(footer), SEGMENT_MAGIC))
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(temp_path, sealed_path)
+
+    @staticmethod
+    def read_footer(path):
+        """Index footer of a sealed segment"""
+        with open(path, 'rb') as f:
+            f.seek(-TRAILER.size, os.SEEK_END)
+            footer_length, magic = TRAILER.unpack(f.read(TRAILER.size))
+            if magic != SEGMENT_MAGIC:
+                raise ValueError(f"{path} is not a sealed segment")
+            f.seek(-TRAILER.size - footer_length, os.SEEK_END)
+            return json.loads(f.read(footer_length))
+
+    @staticmethod
+    def overlaps(start_ts, end_ts, start_time, end_time):
+        """Whether [start_ts, end_ts] intersects the query range"""
+        return ((start_time is None or end_ts >= start_time) and
+                (end_time is None or start_ts <= end_time))
+
+    def read_records(self, path, footer):
+        """Every (ts, kind, line) record of a sealed segment"""
+        records = []
+        with open(path, 'rb') as f:
+            for block in footer['blocks']:
+                f.seek(block['offset'])
+                data = decompress(footer['codec'], f.read(block['length']))
+                for line in data.decode().split('\n'):
+                    record = json.loads(line)
+                    records.append((record['ts'], record['kind'], line))
+        return records
+
+    def read_segment(self, path, footer, kind, start_time, end_time):
+        """Matching records of one sealed segment, reading only overlapping blocks"""
+        records = []
+        with open(path, 'rb') as f:
+            for block in footer['blocks']:
+                if kind not in block['kinds']:
+                    continue
+                if not self.overlaps(block['start_ts'], block['end_ts'], start_time, end_time):
+                    continue
+                f.seek(block['offset'])
+                data = decompress(footer['codec'], f.read(block['length']))
+                for line in data.decode().split('\n'):
+                    record = json.loads(line)
+                    if record['kind'] == kind and self.in_range(record['ts'], start_time, end_time):
+                        records.append((record['ts'], record['data']))
+        return records
+
+    @staticmethod
+    def in_range(ts, start_time, end_time):
+        """Whether ts lies in [start_time, end_time]"""
+        return (start_time is None or ts >= start_time) and (end_time is None or ts <= end_time)
+
+    def query(self, kind, start_time=None, end_time=None, limit=None):
+        """Snapshots of one kind in [start_time, end_time], oldest first
+
+        With limit, only the newest limit snapshots in the range are returned.
+        """
+        with self.lock:
+            records = [(ts, json.loads(line)['data']) for ts, record_kind, line in self.active_records
+                       if record_kind == kind and self.in_range(ts, start_time, end_time)]
+            segments = list(self.segments)
+
+        # Newest segments first, so a limited query can stop early
+        for path, footer in reversed(segments):
+            if limit is not None and len(records) >= limit:
+                cutoff = sorted(ts for ts, _ in records)[-limit]
+                if footer['end_ts'] < cutoff:
+                    break
+            if kind not in footer['kinds']:
+                continue
+            if not self.overlaps(footer['start_ts'], footer['end_ts'], start_time, end_time):
+                continue
+            records.extend(self.read_segment(path, footer, kind, start_time, end_time))
+
+        records.sort(key=lambda record: record[0])
+        if limit is not None:
+            records = records[-limit:] if limit else []
+
+        result = []
+        for ts, data in records:
+            data['ts'] = ts
+            result.append(data)
+        return result
+
+    def first_timestamp(self, kind, start_time=None):
+        """Oldest timestamp of one kind at or after start_time, or None"""
+        with self.lock:
+            candidates = [ts for ts, record_kind, _ in self.active_records
+                          if record_kind == kind and self.in_range(ts, start_time, None)]
+            segments = list(self.segments)
+
+        for path, footer in segments:
+            if kind not in footer['kinds']:
+                continue
+            if not self.overlaps(footer['start_ts'], footer['end_ts'], start_time, None):
+                continue
+            if candidates and footer['start_ts'] >= min(candidates):
+                continue
+            candidates.extend(ts for ts, _ in self.read_segment(path, footer, kind, start_time, None))
+        return min(candidates) if candidates else None
+
+    def replace_range(self, source_kind, start_time, end_time, kind, payload, timestamp):
+        """Replace source_kind snapshots in [start_time, end_time) by one kind snapshot
+
+        Not atomic, but idempotent: a kind snapshot already at timestamp is
+        replaced, so rerunning after a crash never leaves two of them.
+        """
+        self.delete_range(kind, timestamp, math.nextafter(timestamp, math.inf))
+        self.append(kind, payload, timestamp)
+        self.delete_range(source_kind, start_time, end_time)
+
+    def delete_range(self, kind, start_time, end_time):
+        """Delete snapshots of one kind with start_time <= ts < end_time
+
+        Affected sealed segments are rewritten without those records; the
+        active segment is sealed first if it holds any of them.
+        """
+        def expired(ts, record_kind):
+            return record_kind == kind and start_time <= ts < end_time
+
+        deleted = 0
+        with self.lock:
+            if any(expired(ts, record_kind) for ts, record_kind, _ in self.active_records):
+                self.rotate()
+
+            segments = []
+            for path, footer in self.segments:
+                if kind not in footer['kinds'] or not (
+                        footer['start_ts'] < end_time and footer['end_ts'] >= start_time):
+                    segments.append((path, footer))
+                    continue
+
+                records = self.read_records(path, footer)
+                kept = [record for record in records if not expired(record[0], record[1])]
+                deleted += len(records) - len(kept)
+                if not kept:
+                    os.remove(path)
+                elif len(kept) < len(records):
+                    self.write_sealed(path, kept)
+                    segments.append((path, self.read_footer(path)))
+                else:
+                    segments.append((path, footer))
+            self.segments = segments
+
+        return deleted
+
+    def latest(self, kind):
+        """Newest snapshot of one kind, or None"""
+        rows = self.query(kind, limit=1)
+        return rows[0] if rows else None
+
+    def count(self, kind=None):
+        """Number of stored snapshots"""
+        with self.lock:
+            total = sum(1 for _, record_kind, _ in self.active_records
+                        if kind is None or record_kind == kind)
+            for _, footer in self.segments:
+                total += footer['count'] if kind is None else footer['kinds'].get(kind, 0)
+        return total
+
+    def import_json_files(self, directory, prefix, kind):
+        """Import legacy <prefix><YYYYmmdd_HHMMSS>.json files once, oldest first"""
+        manifest_path = os.path.join(self.directory, "imported.txt")
+        imported = set()
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r') as f:
+                imported = {line.strip() for line in f if line.strip()}
+
+        names = []
+        for filepath, timestamp, payload in read_legacy_json_files(directory, prefix, imported):
+            self.append(kind, payload, timestamp)
+            names.append(filepath)
+
+        if names:
+            with open(manifest_path, 'a') as f:
+                f.write('\n'.join(names) + '\n')
+        return len(names)
+
+    def flush(self):
+        """Seal the active segment now"""
+        with self.lock:
+            self.rotate()
+
+    def close(self):
+        """Seal the active segment and stop accepting writes"""
+        with self.lock:
+            self.rotate()
+            self.closed = True
@@ -0,0 +1,181 @@
+"""
+Snapshot Store Module
+Time-indexed SQLite store for periodic queue and performance snapshots
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+def read_legacy_json_files(directory, prefix, skip=()):
+    """Yield (path, timestamp, payload) of <prefix><YYYYmmdd_HHMMSS>.json files, oldest first"""
+    if not os.path.isdir(directory):
+        return
+
+    filenames = sorted(f for f in os.listdir(directory)
+                       if f.startswith(prefix) and f.endswith('.json'))
+    for filename in filenames:
+        filepath = os.path.join(directory, filename)
+        if filepath in skip:
+            continue
+        try:
+            stamp = filename[len(prefix):-len('.json')]
+            timestamp = datetime.strptime(stamp, "%Y%m%d_%H%M%S").timestamp()
+            with open(filepath, 'r') as f:
+                payload = json.load(f)
+        except (ValueError, OSError) as e:
+            print(f"Skipping {filepath}: {e}")
+            continue
+        yield filepath, timestamp, payload
+
+class SnapshotStore:
+    """Append-only snapshot table indexed by (kind, timestamp), in WAL mode"""
+
+    def __init__(self, path="data/history.db"):
+        self.path = path
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.closed = False
+
+        # One connection shared by the worker and UI threads, serialized by a lock
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                id INTEGER PRIMARY KEY,
+                ts REAL NOT NULL,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS snapshots_kind_ts ON snapshots (kind, ts);
+            CREATE TABLE IF NOT EXISTS imported_files (
+                name TEXT PRIMARY KEY
+            );
+        """)
+        self.connection.commit()
+
+    def append(self, kind, payload, timestamp=None):
+        """Store one snapshot"""
+        if timestamp is None:
+            timestamp = time.time()
+
+        with self.lock:
+            self.connection.execute(
+                "INSERT INTO snapshots (ts, kind, payload) VALUES (?, ?, ?)",
+                (timestamp, kind, json.dumps(payload, separators=(',', ':')))
+            )
+            self.connection.commit()
+
+    def query(self, kind, start_time=None, end_time=None, limit=None):
+        """Snapshots of one kind in [start_time, end_time], oldest first
+
+        With limit, only the newest limit snapshots in the range are returned.
+        """
+        sql = "SELECT ts, payload FROM snapshots WHERE kind = ?"
+        params = [kind]
+        if start_time is not None:
+            sql += " AND ts >= ?"
+            params.append(start_time)
+        if end_time is not None:
+            sql += " AND ts <= ?"
+            params.append(end_time)
+        sql += " ORDER BY ts DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self.lock:
+            rows = self.connection.execute(sql, params).fetchall()
+
+        return [self.decode(ts, payload) for ts, payload in reversed(rows)]
+
+    def first_timestamp(self, kind, start_time=None):
+        """Oldest timestamp of one kind at or after start_time, or None"""
+        sql = "SELECT MIN(ts) FROM snapshots WHERE kind = ?"
+        params = [kind]
+        if start_time is not None:
+            sql += " AND ts >= ?"
+            params.append(start_time)
+        with self.lock:
+            return self.connection.execute(sql, params).fetchone()[0]
+
+    def delete_range(self, kind, start_time, end_time):
+        """Delete snapshots of one kind with start_time <= ts < end_time"""
+        with self.lock:
+            cursor = self.connection.execute(
+                "DELETE FROM snapshots WHERE kind = ? AND ts >= ? AND ts < ?",
+                (kind, start_time, end_time)
+            )
+            self.connection.commit()
+            return cursor.rowcount
+
+    def replace_range(self, source_kind, start_time, end_time, kind, payload, timestamp):
+        """Replace source_kind snapshots in [start_time, end_time) by one kind snapshot, atomically
+
+        A kind snapshot already at timestamp is replaced, so reruns are idempotent.
+        """
+        with self.lock:
+            with self.connection:
+                self.connection.execute("DELETE FROM snapshots WHERE kind = ? AND ts = ?", (kind, timestamp))
+                self.connection.execute(
+                    "INSERT INTO snapshots (ts, kind, payload) VALUES (?, ?, ?)",
+                    (timestamp, kind, json.dumps(payload, separators=(',', ':')))
+                )
+                self.connection.execute(
+                    "DELETE FROM snapshots WHERE kind = ? AND ts >= ? AND ts < ?",
+                    (source_kind, start_time, end_time)
+                )
+
+    def latest(self, kind):
+        """Newest snapshot of one kind, or None"""
+        rows = self.query(kind, limit=1)
+        return rows[0] if rows else None
+
+    def count(self, kind=None):
+        """Number of stored snapshots"""
+        with self.lock:
+            if kind is None:
+                return self.connection.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM snapshots WHERE kind = ?", (kind,)
+            ).fetchone()[0]
+
+    @staticmethod
+    def decode(ts, payload):
+        """Payload dict with its store timestamp"""
+        data = json.loads(payload)
+        data['ts'] = ts
+        return data
+
+    def import_json_files(self, directory, prefix, kind):
+        """Import legacy <prefix><YYYYmmdd_HHMMSS>.json files once, oldest first"""
+        with self.lock:
+            imported = {row[0] for row in self.connection.execute("SELECT name FROM imported_files")}
+
+        rows = []
+        names = []
+        for filepath, timestamp, payload in read_legacy_json_files(directory, prefix, imported):
+            rows.append((timestamp, kind, json.dumps(payload, separators=(',', ':'))))
+            names.append((filepath,))
+
+        if rows:
+            with self.lock:
+                self.connection.executemany(
+                    "INSERT INTO snapshots (ts, kind, payload) VALUES (?, ?, ?)", rows
+                )
+                self.connection.executemany("INSERT INTO imported_files (name) VALUES (?)", names)
+                self.connection.commit()
+
+        return len(rows)
+
+    def close(self):
+        """Close the database connection"""
+        with self.lock:
+            self.connection.close()
+            self.closed = True
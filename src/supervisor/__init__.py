@@ -0,0 +1 @@
+# Supervisor module
@@ -0,0 +1,337 @@
+"""
+Camera Supervisor Module
+Runs one queue management worker process per camera and restarts crashed workers
+"""
+
+import copy
+import multiprocessing
+import os
+import threading
+import time
+from multiprocessing.connection import Client
+
+from detector.inference_server import InferenceServer
+from .store_aggregator import StoreAggregator, to_plain
+
+def merge_config(base, overrides):
+    """Deep copy of base with overrides merged in section by section"""
+    merged = copy.deepcopy(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_config(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+def camera_config(config, camera):
+    """Worker config and capture source for one entry of config["cameras"]
+
+    The camera's "config" section overrides the shared settings, e.g. its
+    own counter positions. Paths that exist here are made absolute, as
+    workers run in their own data directory.
+    """
+    shared = {key: value for key, value in config.items() if key not in ("cameras", "supervisor")}
+    worker_config = merge_config(shared, camera.get("config", {}))
+
+    model_path = worker_config.get("detection", {}).get("model_path")
+    if model_path and os.path.exists(model_path):
+        worker_config["detection"]["model_path"] = os.path.abspath(model_path)
+
+    if "video" in camera:
+        source = os.path.abspath(camera["video"])
+    else:
+        source = camera.get("camera", 0)
+    return worker_config, source
+
+class SnapshotPublisher:
+    """Sends a worker's queue snapshots to the aggregator at most once per interval"""
+
+    def __init__(self, connection, camera, system, interval):
+        self.connection = connection
+        self.camera = camera
+        self.system = system
+        self.interval = interval
+        self.last_publish = 0.0
+        self.published = 0
+
+    def publish(self, queue_data):
+        """Send the queue data of the latest frame if the interval has passed"""
+        now = time.time()
+        if now - self.last_publish < self.interval:
+            return
+        self.last_publish = now
+
+        message = {
+            'camera': self.camera,
+            'pid': os.getpid(),
+            'ts': self.system.clock.time(),
+            'frames': self.system.frame_count,
+            'queues': to_plain(queue_data),
+            'metrics': to_plain(self.system.performance_monitor.get_current_metrics())
+        }
+        try:
+            self.connection.send(message)
+            self.published += 1
+        except (OSError, EOFError):
+            # Aggregator gone: stop, the supervisor is shutting down or will restart us
+            print(f"Camera {self.camera}: aggregator unreachable, stopping")
+            self.system.running = False
+
+def run_camera_worker(system_class, name, config, source, workdir, address, authkey,
+                      stop_flag, publish_interval, inference_client=None):
+    """Worker process entry point: run one camera and publish its snapshots"""
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)  # history, reports and journals stay per camera
+
+    connection = Client(address, authkey=authkey)
+    if inference_client is not None:
+        system = system_class(config, inference_client=inference_client)
+    else:
+        system = system_class(config)
+    system.headless = True
+    publisher = SnapshotPublisher(connection, name, system, publish_interval)
+    system.on_queue_update = publisher.publish
+
+    def watch_stop():
+        while not stop_flag.value:
+            time.sleep(0.2)
+        # Keep at it: a stop before run() starts would be undone by run()
+        while True:
+            system.running = False
+            time.sleep(0.2)
+
+    threading.Thread(target=watch_stop, daemon=True).start()
+
+    print(f"Camera {name} worker started (pid {os.getpid()}, source {source})")
+    try:
+        if isinstance(source, int):
+            system.run(camera_id=source)
+        else:
+            system.run(video_path=source)
+    finally:
+        connection.close()
+
+class CameraSupervisor:
+    """Starts a worker process per camera and merges their snapshots into one view
+
+    system_class is the per-camera application, e.g. QueueManagementSystem:
+    built from a config dict, with headless, running, clock, frame_count,
+    performance_monitor and on_queue_update attributes and a
+    run(camera_id, video_path) loop. With detection.inference_server.enabled
+    the workers share one batching InferenceServer instead of loading a
+    model each; system_class then also takes an inference_client argument.
+    If the server does not start the workers load their own models; if it
+    dies it is restarted with the same backoff as workers, which then move
+    onto the new server.
+    """
+
+    def __init__(self, config, system_class, detector_factory=None):
+        self.config = config
+        self.system_class = system_class
+        self.detector_factory = detector_factory  # for the inference server, default PersonDetector
+        self.supervisor_config = config.get("supervisor", {})
+        self.cameras = config.get("cameras", [])
+        if not self.cameras:
+            raise ValueError("No cameras configured")
+        names = [camera["name"] for camera in self.cameras]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Camera names must be unique: {names}")
+
+        self.backoff_seconds = self.supervisor_config.get("restart_backoff_seconds", 1.0)
+        self.max_backoff_seconds = self.supervisor_config.get("max_backoff_seconds", 60.0)
+        self.stable_seconds = self.supervisor_config.get("stable_seconds", 300)
+        self.publish_interval = self.supervisor_config.get("publish_interval", 1.0)
+        self.stats_interval = self.supervisor_config.get("stats_interval", 10)
+        self.stop_timeout = self.supervisor_config.get("stop_timeout", 30)
+        self.data_dir = os.path.abspath(self.supervisor_config.get("data_dir", os.path.join("data", "cameras")))
+
+        # Spawn avoids forking a process with live capture and aggregator threads
+        self.context = multiprocessing.get_context("spawn")
+        self.stop_event = threading.Event()
+        self.aggregator = StoreAggregator(stale_seconds=self.supervisor_config.get("stale_seconds", 10))
+
+        # The shared inference server is supervised like a worker
+        server_config = config.get("detection", {}).get("inference_server", {})
+        self.use_inference_server = server_config.get("enabled", False)
+        self.server_start_timeout = server_config.get("start_timeout_seconds", 300)
+        self.inference_server = None
+        self.server = {
+            'started': 0.0,
+            'restart_at': 0.0,
+            'backoff': 0.0,
+            'failures': 0,
+            'restarts': 0,
+            'last_exit': None
+        }
+
+        self.workers = {}
+        for camera in self.cameras:
+            worker_config, source = camera_config(config, camera)
+            self.workers[camera["name"]] = {
+                'config': worker_config,
+                'source': source,
+                'process': None,
+                'stop_flag': None,
+                'started': 0.0,
+                'restart_at': 0.0,
+                'backoff': 0.0,
+                'failures': 0,
+                'restarts': 0,
+                'last_exit': None,
+                'inference_client': None
+            }
+
+    def start(self):
+        """Start the aggregator, the shared inference server and every worker"""
+        self.aggregator.start()
+        if self.use_inference_server and not self.start_inference_server():
+            print("Inference server failed to start, each camera loads its own model")
+            self.use_inference_server = False
+        for name in self.workers:
+            self.start_worker(name)
+
+    def start_inference_server(self):
+        """Start a fresh inference server and give every worker a client of it; False if it fails"""
+        shared_config, _ = camera_config(self.config, {})
+        server = InferenceServer(shared_config, detector_factory=self.detector_factory,
+                                 max_clients=len(self.workers))
+        if not server.start(self.server_start_timeout):
+            server.stop()
+            return False
+
+        self.inference_server = server
+        self.server['started'] = time.time()
+        for worker in self.workers.values():
+            worker['inference_client'] = server.client()
+        return True
+
+    def start_worker(self, name):
+        """Launch one camera's worker process"""
+        worker = self.workers[name]
+        # Workers poll a lock-free flag: a worker dying while blocked on a
+        # shared Event would leave the Event unusable
+        worker['stop_flag'] = self.context.RawValue('b', 0)
+        process = self.context.Process(
+            target=run_camera_worker,
+            args=(self.system_class, name, worker['config'], worker['source'],
+                  os.path.join(self.data_dir, name), self.aggregator.address, self.aggregator.authkey,
+                  worker['stop_flag'], self.publish_interval, worker['inference_client']),
+            name=f"camera-{name}"
+        )
+        process.start()
+        worker['process'] = process
+        worker['started'] = time.time()
+
+    def stop_worker(self, name):
+        """Ask one worker to finish, terminating it after stop_timeout"""
+        worker = self.workers[name]
+        process = worker['process']
+        if process is None:
+            return
+        worker['stop_flag'].value = 1
+        process.join(self.stop_timeout)
+        if process.is_alive():
+            print(f"Camera {name} worker did not stop, terminating")
+            process.terminate()
+            process.join()
+        worker['process'] = None
+
+    def schedule_restart(self, state, started, exitcode, now):
+        """Record an exit and pick the restart time; returns the delay"""
+        # A process that ran for a while starts over with the shortest delay
+        if now - started >= self.stable_seconds:
+            state['failures'] = 0
+        delay = min(self.backoff_seconds * 2 ** state['failures'], self.max_backoff_seconds)
+        state['failures'] += 1
+        state['backoff'] = delay
+        state['restart_at'] = now + delay
+        state['last_exit'] = exitcode
+        return delay
+
+    def check_workers(self):
+        """Schedule restarts for exited workers and start the ones that are due"""
+        self.check_inference_server()
+        now = time.time()
+        for name, worker in self.workers.items():
+            process = worker['process']
+            if process is not None:
+                if process.is_alive():
+                    continue
+                process.join()
+                delay = self.schedule_restart(worker, worker['started'], process.exitcode, now)
+                worker['process'] = None
+                print(f"Camera {name} worker exited with code {process.exitcode}, restarting in {delay:.1f}s")
+            elif now >= worker['restart_at'] and not self.stop_event.is_set():
+                worker['restarts'] += 1
+                self.start_worker(name)
+
+    def check_inference_server(self):
+        """Restart a dead inference server with backoff and move the workers onto the new one"""
+        if not self.use_inference_server or self.stop_event.is_set():
+            return
+        now = time.time()
+        server = self.inference_server
+        if server is not None:
+            if server.is_alive():
+                return
+            exitcode = server.process.exitcode
+            server.stop()
+            self.inference_server = None
+            delay = self.schedule_restart(self.server, self.server['started'], exitcode, now)
+            print(f"Inference server exited with code {exitcode}, restarting in {delay:.1f}s")
+        elif now >= self.server['restart_at']:
+            self.server['restarts'] += 1
+            if not self.start_inference_server():
+                delay = self.schedule_restart(self.server, now, None, time.time())
+                print(f"Inference server failed to start, retrying in {delay:.1f}s")
+                return
+            # Running workers hold clients of the old server: restart them on the new one
+            for name, worker in self.workers.items():
+                if worker['process'] is not None:
+                    self.stop_worker(name)
+                    self.start_worker(name)
+
+    def run(self):
+        """Supervise until interrupted, printing the store-wide view periodically"""
+        self.start()
+        print(f"Supervising {len(self.workers)} camera(s), aggregator on {self.aggregator.address}")
+        last_stats_time = time.time()
+        try:
+            while not self.stop_event.is_set():
+                self.check_workers()
+                if self.stats_interval and time.time() - last_stats_time >= self.stats_interval:
+                    print(f"Store: {StoreAggregator.format_view(self.aggregator.get_store_view())}")
+                    last_stats_time = time.time()
+                self.stop_event.wait(0.2)
+        except KeyboardInterrupt:
+            print("\nShutdown requested by user")
+        finally:
+            self.stop()
+
+    def get_worker_stats(self):
+        """Liveness and restart counters per camera"""
+        stats = {}
+        for name, worker in self.workers.items():
+            process = worker['process']
+            stats[name] = {
+                'alive': process is not None and process.is_alive(),
+                'pid': process.pid if process is not None else None,
+                'restarts': worker['restarts'],
+                'failures': worker['failures'],
+                'backoff': worker['backoff'],
+                'last_exit': worker['last_exit']
+            }
+        return stats
+
+    def stop(self):
+        """Ask workers to finish (they write their final reports), then close the aggregator"""
+        self.stop_event.set()
+        for worker in self.workers.values():
+            if worker['stop_flag'] is not None:
+                worker['stop_flag'].value = 1
+        for name in self.workers:
+            self.stop_worker(name)
+        if self.inference_server is not None:
+            self.inference_server.stop()
+            self.inference_server = None
+        self.aggregator.close()
@@ -0,0 +1,154 @@
+"""
+Store Aggregator Module
+Merges queue snapshots published by camera workers into one store-wide view
+"""
+
+import os
+import threading
+import time
+from multiprocessing.connection import Listener, Client
+from types import MappingProxyType
+
+def to_plain(value):
+    """Copy read-only snapshot views into plain dicts and lists for sending"""
+    if isinstance(value, (dict, MappingProxyType)):
+        return {key: to_plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_plain(item) for item in value]
+    return value
+
+class StoreAggregator:
+    """Local socket listener keeping the latest snapshot of every camera
+
+    Workers connect with multiprocessing.connection.Client using address
+    and authkey and send snapshot dicts with at least 'camera' and
+    'queues'. Each connection is read on its own thread.
+    """
+
+    def __init__(self, address=('127.0.0.1', 0), authkey=None, stale_seconds=10):
+        self.authkey = authkey or os.urandom(16)
+        self.listener = Listener(address, authkey=self.authkey)
+        self.address = self.listener.address
+        self.stale_seconds = stale_seconds
+
+        self.cameras = {}  # camera name -> latest snapshot
+        self.connections = []
+        self.lock = threading.Lock()
+        self.accept_thread = None
+        self.running = False
+        self.stats = {'connections': 0, 'messages': 0, 'errors': 0}
+
+    def start(self):
+        """Start accepting worker connections"""
+        self.running = True
+        self.accept_thread = threading.Thread(target=self.accept_loop, daemon=True)
+        self.accept_thread.start()
+
+    def accept_loop(self):
+        """Accept connections until closed"""
+        while self.running:
+            try:
+                connection = self.listener.accept()
+            except (OSError, EOFError) as e:
+                if not self.running:
+                    return
+                self.stats['errors'] += 1
+                print(f"Aggregator connection error: {e}")
+                continue
+            if not self.running:
+                connection.close()
+                return
+            with self.lock:
+                self.connections.append(connection)
+                self.stats['connections'] += 1
+            threading.Thread(target=self.read_loop, args=(connection,), daemon=True).start()
+
+    def read_loop(self, connection):
+        """Store snapshots from one worker until it disconnects"""
+        while self.running:
+            try:
+                message = connection.recv()
+            except (EOFError, OSError):
+                break
+            self.update(message)
+        with self.lock:
+            if connection in self.connections:
+                self.connections.remove(connection)
+        connection.close()
+
+    def update(self, message):
+        """Keep a camera's newest snapshot"""
+        message['received'] = time.time()
+        with self.lock:
+            self.cameras[message['camera']] = message
+            self.stats['messages'] += 1
+
+    def get_store_view(self):
+        """Merged view: per-camera snapshots and store-wide totals over live cameras"""
+        now = time.time()
+        with self.lock:
+            cameras = dict(self.cameras)
+
+        view = {
+            'cameras': {},
+            'queues': {},
+            'cameras_online': 0,
+            'total_queue_length': 0,
+            'total_customers_served': 0,
+            'longest_wait': 0.0,
+            'longest_wait_queue': None
+        }
+        for name in sorted(cameras):
+            snapshot = cameras[name]
+            age = now - snapshot['received']
+            online = age <= self.stale_seconds
+            view['cameras'][name] = {
+                'online': online,
+                'age': age,
+                'pid': snapshot.get('pid'),
+                'frames': snapshot.get('frames', 0),
+                'timestamp': snapshot.get('ts'),
+                'metrics': snapshot.get('metrics', {})
+            }
+            if not online:
+                continue
+            view['cameras_online'] += 1
+
+            for queue_id, queue in snapshot['queues'].items():
+                key = f"{name}/{queue_id}"
+                view['queues'][key] = queue
+                view['total_queue_length'] += queue.get('queue_length', 0)
+                view['total_customers_served'] += queue.get('total_customers_served', 0)
+                wait = queue.get('estimated_wait_time', 0) or 0
+                if wait > view['longest_wait']:
+                    view['longest_wait'] = wait
+                    view['longest_wait_queue'] = key
+        return view
+
+    @staticmethod
+    def format_view(view):
+        """One-line summary of a store view"""
+        longest = (f", longest wait {view['longest_wait']:.0f}s at {view['longest_wait_queue']}"
+                   if view['longest_wait_queue'] else "")
+        return (f"{view['cameras_online']}/{len(view['cameras'])} cameras online, "
+                f"{len(view['queues'])} queues, {view['total_queue_length']} waiting, "
+                f"{view['total_customers_served']} served{longest}")
+
+    def close(self):
+        """Stop accepting, drop connections and close the listener"""
+        if not self.running:
+            return
+        self.running = False
+
+        # Wake the accept loop with a connection of our own
+        try:
+            Client(self.address, authkey=self.authkey).close()
+        except OSError:
+            pass
+        self.accept_thread.join(timeout=5)
+        self.listener.close()
+
+        with self.lock:
+            connections, self.connections = self.connections, []
+        for connection in connections:
+            connection.close()
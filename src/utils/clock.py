@@ -0,0 +1,31 @@
+"""
+Clock Module
+Time sources for live capture (wall clock) and offline video (media time)
+"""
+
+import time
+
+class SystemClock:
+    """Wall-clock time, as time.time()"""
+
+    def time(self):
+        """Current time in seconds since the epoch"""
+        return time.time()
+
+class ManualClock:
+    """Clock that only moves when set, e.g. to each video frame's timestamp"""
+
+    def __init__(self, start_time=0.0):
+        self.current_time = start_time
+
+    def time(self):
+        """Current time in seconds since the epoch"""
+        return self.current_time
+
+    def set(self, timestamp):
+        """Jump to a timestamp"""
+        self.current_time = timestamp
+
+    def advance(self, seconds):
+        """Move forward by seconds"""
+        self.current_time += seconds
@@ -0,0 +1,47 @@
+"""
+Lazy Import Module
+Defers loading heavy modules until they are first used
+"""
+
+import importlib
+import importlib.util
+import sys
+import threading
+
+def module_available(name):
+    """Whether a module can be imported, without importing it"""
+    if name in sys.modules:
+        return True
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        # A missing parent package raises instead of returning None
+        return False
+
+class LazyModule:
+    """Stand-in for a module that imports it on first attribute access"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        """Whether the module has been imported yet"""
+        return self._module is not None
+
+    def load(self):
+        """Import the module now (thread-safe) and return it"""
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<LazyModule {self._name} ({state})>"
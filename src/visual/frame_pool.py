@@ -0,0 +1,65 @@
+"""
+Frame Pool Module
+Reusable frame-sized buffers for capture and annotation
+"""
+
+import threading
+import numpy as np
+
+class FramePool:
+    """Free lists of frame buffers by shape, so steady-state frames allocate nothing
+
+    Buffers are handed out by acquire() and given back by release() once
+    nothing reads them any more. An empty free list allocates a new
+    buffer, so the pool grows to the number of frames in flight.
+    """
+
+    def __init__(self, max_free=8):
+        self.max_free = max_free
+        self.free = {}  # (shape, dtype) -> free buffers
+        self.free_ids = set()
+        self.lock = threading.Lock()
+
+        self.allocations = 0
+        self.reuses = 0
+
+    def acquire(self, shape, dtype=np.uint8):
+        """A buffer of this shape and dtype with undefined contents"""
+        key = (tuple(shape), np.dtype(dtype))
+        with self.lock:
+            buffers = self.free.get(key)
+            if buffers:
+                buffer = buffers.pop()
+                self.free_ids.discard(id(buffer))
+                self.reuses += 1
+                return buffer
+            self.allocations += 1
+        return np.empty(shape, dtype=dtype)
+
+    def copy(self, frame):
+        """Pooled copy of a frame"""
+        buffer = self.acquire(frame.shape, frame.dtype)
+        np.copyto(buffer, frame)
+        return buffer
+
+    def release(self, frame):
+        """Give a buffer back; releasing twice or releasing None is harmless"""
+        if frame is None or not frame.flags.owndata:
+            return  # views share memory with a buffer still in use
+        key = (frame.shape, frame.dtype)
+        with self.lock:
+            if id(frame) in self.free_ids:
+                return
+            buffers = self.free.setdefault(key, [])
+            if len(buffers) < self.max_free:
+                buffers.append(frame)
+                self.free_ids.add(id(frame))
+
+    def get_stats(self):
+        """Allocation and reuse counts plus buffers currently free"""
+        with self.lock:
+            return {
+                'allocations': self.allocations,
+                'reuses': self.reuses,
+                'free': sum(len(buffers) for buffers in self.free.values())
+            }
@@ -5,16 +5,27 @@ Handles drawing of separation lines, overlays, and real-time information display
 
 import cv2
 import numpy as np
-import time
 from datetime import datetime
 from collections import deque
+from functools import lru_cache
+
+from utils.clock import SystemClock
+
+ANNOTATION_MODES = ("in_place", "copy")
+CONTROLS_TEXT = "Controls: Q-Quit | S-Save Report | R-Reset | H-Help"
+
+@lru_cache(maxsize=2048)
+def measure_text(text, font, scale, thickness):
+    """Memoized (width, height) of a text string, as cv2.getTextSize"""
+    return cv2.getTextSize(text, font, scale, thickness)[0]
 
 class InterfaceManager:
     """Visual interface management class"""
     
-    def __init__(self, config):
+    def __init__(self, config, clock=None):
         self.config = config
         self.visual_config = config["visual"]
+        self.clock = clock or SystemClock()
         self.counter_config = config["counters"]
         
         # Visual settings
@@ -24,6 +35,11 @@ class InterfaceManager:
         self.font_thickness = self.visual_config.get("font_thickness", 2)
         self.font = cv2.FONT_HERSHEY_SIMPLEX
         
+        # "in_place" draws on the captured frame, "copy" keeps it clean
+        self.annotation_mode = self.visual_config.get("annotation_mode", "in_place")
+        if self.annotation_mode not in ANNOTATION_MODES:
+            raise ValueError(f"Unknown annotation mode '{self.annotation_mode}', expected one of {ANNOTATION_MODES}")
+        
         # Default colors if not specified
         self.default_colors = {
             "current_customer": [0, 255, 0],      # Green
@@ -51,12 +67,32 @@ class InterfaceManager:
         self.show_queue_info = True
         self.show_separation_lines = True
         
+        # Static layer: counter geometry and labels pre-rendered into an
+        # overlay plus mask, rebuilt only when the layout changes
+        self.static_key = None
+        self.static_overlay = None
+        self.static_mask = None
+        self.static_rect = None
+        self.controls_key = None
+        self.controls_patch = None
+        self.static_renders = 0
+        
         print("Interface Manager initialized")
     
-    def draw_interface(self, frame, detections, queue_data, performance_metrics):
-        """Main interface drawing method"""
-        # Create a copy of the frame to work with
-        display_frame = frame.copy()
+    def draw_interface(self, frame, detections, queue_data, performance_metrics, out=None):
+        """Main interface drawing method
+        
+        Draws on out and returns it. Pass out=frame to annotate in place when
+        the clean frame is not needed afterwards, or a frame-sized buffer to
+        keep frame clean without allocating; by default a new copy is drawn on.
+        """
+        if out is None:
+            display_frame = frame.copy()
+        elif out is frame:
+            display_frame = frame
+        else:
+            np.copyto(out, frame)
+            display_frame = out
         
         # Draw separation lines for all queues
         if self.show_separation_lines:
@@ -83,30 +119,17 @@ class InterfaceManager:
     
     def draw_separation_lines(self, frame, queue_data):
         """Draw visual separation lines between current and waiting customers"""
-        for queue_id, queue_info in queue_data.items():
-            if str(queue_id) not in self.counter_config["counter_positions"]:
-                continue
-            
-            position = self.counter_config["counter_positions"][str(queue_id)]
+        positions = self.counter_config["counter_positions"]
+        queue_ids = [queue_id for queue_id in queue_data if str(queue_id) in positions]
+        
+        # Boundaries, service lines and their labels never change between frames
+        self.composite_static_layer(frame, queue_ids)
+        
+        for queue_id in queue_ids:
+            queue_info = queue_data[queue_id]
+            position = positions[str(queue_id)]
             x, y, w, h = position["x"], position["y"], position["width"], position["height"]
-            
-            # Draw queue boundary rectangle
-            boundary_color = tuple(self.colors["queue_boundary"])
-            cv2.rectangle(frame, (x, y), (x + w, y + h), boundary_color, 2)
-            
-            # Draw vertical service separation line (customers line up behind this)
-            service_line_x = x + w // 3  # Vertical line at 1/3 of counter width
-            service_line_color = tuple(self.colors["current_customer"])
-            
-            # Make line thicker and more visible
-            cv2.line(frame, (service_line_x, y), (service_line_x, y + h), 
-                    service_line_color, self.line_thickness + 2)
-            
-            # Add service line label
-            cv2.putText(frame, "SERVICE", (service_line_x + 5, y + 25),
-                       self.font, 0.5, service_line_color, 2)
-            cv2.putText(frame, "LINE", (service_line_x + 5, y + 45),
-                       self.font, 0.5, service_line_color, 2)
+            service_line_x = x + w // 3
             
             # Draw vertical waiting area separator lines
             if queue_info["queue_length"] > 1:
@@ -126,6 +149,73 @@ class InterfaceManager:
         
         return frame
     
+    def draw_counter_geometry(self, canvas, position, boundary_color, service_line_color):
+        """Draw one counter's boundary, service line and labels"""
+        x, y, w, h = position["x"], position["y"], position["width"], position["height"]
+        
+        # Draw queue boundary rectangle
+        cv2.rectangle(canvas, (x, y), (x + w, y + h), boundary_color, 2)
+        
+        # Draw vertical service separation line (customers line up behind this)
+        service_line_x = x + w // 3  # Vertical line at 1/3 of counter width
+        cv2.line(canvas, (service_line_x, y), (service_line_x, y + h),
+                service_line_color, self.line_thickness + 2)
+        
+        # Add service line label
+        cv2.putText(canvas, "SERVICE", (service_line_x + 5, y + 25),
+                   self.font, 0.5, service_line_color, 2)
+        cv2.putText(canvas, "LINE", (service_line_x + 5, y + 45),
+                   self.font, 0.5, service_line_color, 2)
+    
+    def static_layer_key(self, frame_shape, queue_ids):
+        """Everything the static layer depends on"""
+        positions = self.counter_config["counter_positions"]
+        layout = tuple(
+            (str(queue_id), positions[str(queue_id)]["x"], positions[str(queue_id)]["y"],
+             positions[str(queue_id)]["width"], positions[str(queue_id)]["height"])
+            for queue_id in queue_ids
+        )
+        colors = (tuple(self.colors["queue_boundary"]), tuple(self.colors["current_customer"]))
+        return (frame_shape[:2], layout, colors, self.line_thickness)
+    
+    def render_static_layer(self, frame_shape, queue_ids):
+        """Pre-render counter geometry into an overlay and a uint8 mask"""
+        height, width = frame_shape[:2]
+        overlay = np.zeros((height, width, 3), dtype=np.uint8)
+        mask = np.zeros((height, width), dtype=np.uint8)
+        
+        boundary_color = tuple(self.colors["queue_boundary"])
+        service_line_color = tuple(self.colors["current_customer"])
+        for queue_id in queue_ids:
+            position = self.counter_config["counter_positions"][str(queue_id)]
+            self.draw_counter_geometry(overlay, position, boundary_color, service_line_color)
+            self.draw_counter_geometry(mask, position, 255, 255)
+        
+        # Composite only the region that has content
+        x, y, w, h = cv2.boundingRect(mask)
+        self.static_rect = (x, y, w, h) if w and h else None
+        self.static_overlay = overlay
+        self.static_mask = mask
+        self.static_renders += 1
+    
+    def composite_static_layer(self, frame, queue_ids):
+        """Copy the static layer onto frame in place with one masked copy"""
+        key = self.static_layer_key(frame.shape, queue_ids)
+        if key != self.static_key:
+            self.render_static_layer(frame.shape, queue_ids)
+            self.static_key = key
+        
+        if self.static_rect is None:
+            return
+        x, y, w, h = self.static_rect
+        region = frame[y:y + h, x:x + w]
+        cv2.copyTo(self.static_overlay[y:y + h, x:x + w], self.static_mask[y:y + h, x:x + w], region)
+    
+    def invalidate_static_layer(self):
+        """Force the static layer to be rebuilt on the next frame"""
+        self.static_key = None
+        self.controls_key = None
+    
     def draw_customer_boxes(self, frame, detections, queue_data):
         """Draw bounding boxes around detected customers"""
         for detection in detections:
@@ -154,7 +244,7 @@ class InterfaceManager:
             
             # Draw confidence and label
             label_text = f"{label} ({confidence:.2f})"
-            text_size = cv2.getTextSize(label_text, self.font, 0.5, 1)[0]
+            text_size = measure_text(label_text, self.font, 0.5, 1)
             
             # Draw background for text
             cv2.rectangle(frame, (x, y - text_size[1] - 10), 
@@ -185,7 +275,7 @@ class InterfaceManager:
             header_text = f"COUNTER {queue_id} ({queue_type})"
             
             # Draw header background
-            header_size = cv2.getTextSize(header_text, self.font, 0.6, 2)[0]
+            header_size = measure_text(header_text, self.font, 0.6, 2)
             cv2.rectangle(frame, (x, y - 30), (x + header_size[0] + 10, y - 5),
                          (0, 0, 0), -1)
             
@@ -206,7 +296,7 @@ class InterfaceManager:
                 stat_y = y + 20 + (i * 20)
                 
                 # Background for readability
-                stat_size = cv2.getTextSize(stat, self.font, 0.4, 1)[0]
+                stat_size = measure_text(stat, self.font, 0.4, 1)
                 cv2.rectangle(frame, (x, stat_y - 15), (x + stat_size[0] + 10, stat_y + 5),
                              (0, 0, 0, 128), -1)
                 
@@ -217,7 +307,7 @@ class InterfaceManager:
             if queue_info["current_customer"]:
                 current_customer = queue_info["current_customer"]
                 if current_customer["service_start_time"]:
-                    elapsed_time = time.time() - current_customer["service_start_time"]
+                    elapsed_time = self.clock.time() - current_customer["service_start_time"]
                     timer_text = f"Service Time: {elapsed_time:.0f}s"
                     
                     # Draw timer with color based on performance
@@ -283,7 +373,7 @@ class InterfaceManager:
                 alert_color = tuple(self.colors["text"])
             
             # Draw alert background
-            text_size = cv2.getTextSize(alert_text, self.font, 0.6, 2)[0]
+            text_size = measure_text(alert_text, self.font, 0.6, 2)
             cv2.rectangle(frame, (10, alert_y - 20), (text_size[0] + 30, alert_y + 10),
                          alert_color, -1)
             
@@ -298,13 +388,13 @@ class InterfaceManager:
     def draw_system_info(self, frame):
         """Draw system timestamp and info"""
         # Current timestamp
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        timestamp = datetime.fromtimestamp(self.clock.time()).strftime("%Y-%m-%d %H:%M:%S")
         
         # System info
         info_text = f"Queue Management System - {timestamp}"
         
         # Draw background
-        text_size = cv2.getTextSize(info_text, self.font, 0.5, 1)[0]
+        text_size = measure_text(info_text, self.font, 0.5, 1)
         cv2.rectangle(frame, (10, frame.shape[0] - 30), 
                      (text_size[0] + 20, frame.shape[0] - 5),
                      (0, 0, 0, 180), -1)
@@ -313,19 +403,31 @@ class InterfaceManager:
         cv2.putText(frame, info_text, (15, frame.shape[0] - 15),
                    self.font, 0.5, (255, 255, 255), 1)
         
-        # Controls hint
-        controls_text = "Controls: Q-Quit | S-Save Report | R-Reset | H-Help"
-        controls_size = cv2.getTextSize(controls_text, self.font, 0.4, 1)[0]
-        
-        cv2.rectangle(frame, (frame.shape[1] - controls_size[0] - 20, frame.shape[0] - 30),
-                     (frame.shape[1] - 10, frame.shape[0] - 5),
-                     (0, 0, 0, 180), -1)
+        # Controls hint: a fixed patch, rendered once per frame size
+        frame_height, frame_width = frame.shape[:2]
+        if self.controls_key != (frame_height, frame_width):
+            self.render_controls_patch(frame_height, frame_width)
+        x1, y1, patch = self.controls_patch
+        frame[y1:y1 + patch.shape[0], x1:x1 + patch.shape[1]] = patch
         
-        cv2.putText(frame, controls_text, 
-                   (frame.shape[1] - controls_size[0] - 15, frame.shape[0] - 15),
+        return frame
+    
+    def render_controls_patch(self, frame_height, frame_width):
+        """Pre-render the controls hint bar for one frame size"""
+        controls_size = measure_text(CONTROLS_TEXT, self.font, 0.4, 1)
+        canvas = np.zeros((frame_height, frame_width, 3), dtype=np.uint8)
+        
+        x1, y1 = frame_width - controls_size[0] - 20, frame_height - 30
+        x2, y2 = frame_width - 10, frame_height - 5
+        cv2.rectangle(canvas, (x1, y1), (x2, y2), (0, 0, 0, 180), -1)
+        cv2.putText(canvas, CONTROLS_TEXT,
+                   (frame_width - controls_size[0] - 15, frame_height - 15),
                    self.font, 0.4, (255, 255, 255), 1)
         
-        return frame
+        # The bar is opaque, so the patch is copied without a mask
+        x1, y1 = max(0, x1), max(0, y1)
+        self.controls_patch = (x1, y1, canvas[y1:y2 + 1, x1:x2 + 1].copy())
+        self.controls_key = (frame_height, frame_width)
     
     def get_customer_type_at_position(self, position, queue_data):
         """Determine if customer at position is current or waiting"""
@@ -360,12 +462,12 @@ class InterfaceManager:
     def add_alerts(self, alerts):
         """Add new alerts to display"""
         for alert in alerts:
-            alert['timestamp'] = time.time()
+            alert['timestamp'] = self.clock.time()
             self.active_alerts.append(alert)
             self.alert_history.append(alert)
         
         # Remove old alerts (older than 10 seconds)
-        current_time = time.time()
+        current_time = self.clock.time()
         self.active_alerts = [
             alert for alert in self.active_alerts
             if current_time - alert.get('timestamp', 0) < 10
@@ -399,7 +501,7 @@ class InterfaceManager:
                    self.font, 1.0, (255, 255, 255), 2)
         
         # Current time
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        timestamp = datetime.fromtimestamp(self.clock.time()).strftime("%Y-%m-%d %H:%M:%S")
         cv2.putText(dashboard, f"Generated: {timestamp}", (50, 80),
                    self.font, 0.5, (200, 200, 200), 1)
         
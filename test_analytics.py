@@ -0,0 +1,293 @@
+"""
+Analytics Tests
+Tests performance statistics without a camera or stored data
+"""
+
+import sys
+import os
+import json
+import tempfile
+import numpy as np
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+from analytics.streaming_stats import RunningStats, P2Quantile, ServiceTimeStats
+from analytics.performance_monitor import PerformanceMonitor
+from analytics.timeseries import RingSeries, TimeSeriesStore
+from analytics.chart_renderer import ChartRenderer
+from analytics.report_generator import ReportGenerator
+from queue_management.queue_manager import QueueManager
+from utils.clock import ManualClock
+from benchmark import make_shopping_day
+
+def load_test_config():
+    """Load configuration for tests"""
+    with open(os.path.join(os.path.dirname(__file__), 'config.json'), 'r') as f:
+        return json.load(f)
+
+def test_running_stats_match_numpy():
+    """Welford mean, std and extremes match NumPy"""
+    print("Testing running statistics...")
+
+    values = np.random.default_rng(0).lognormal(4.5, 0.5, size=5000)
+    stats = RunningStats()
+    for value in values:
+        stats.add(value)
+
+    assert stats.count == 5000
+    assert abs(stats.mean - values.mean()) < 1e-9 * values.mean()
+    assert abs(stats.std - values.std()) < 1e-9 * values.std()
+    assert stats.min == values.min() and stats.max == values.max()
+
+    print("✓ Running statistics match NumPy")
+    return True
+
+def test_p2_quantiles_track_percentiles():
+    """P² estimates stay close to exact percentiles"""
+    print("Testing streaming quantiles...")
+
+    # Exact for the first few samples
+    small = P2Quantile(0.5)
+    for value in (30.0, 10.0, 20.0):
+        small.add(value)
+    assert small.value == 20.0
+
+    values = np.random.default_rng(1).lognormal(4.5, 0.5, size=20000)
+    stats = ServiceTimeStats()
+    for value in values:
+        stats.add(value)
+
+    for quantile in ServiceTimeStats.QUANTILES:
+        exact = np.percentile(values, quantile * 100)
+        assert abs(stats.percentile(quantile) - exact) / exact < 0.03, (quantile, stats.percentile(quantile), exact)
+
+    print("✓ Streaming quantiles within 3% of exact")
+    return True
+
+def test_current_metrics_cover_whole_shift():
+    """Service time metrics include every service, not only the last 100 per cashier"""
+    print("Testing shift-wide metrics...")
+
+    monitor = PerformanceMonitor(load_test_config())
+    assert 'median_service_time' not in monitor.get_current_metrics()
+
+    for i in range(300):
+        monitor.add_service_time("cashier_1", 180.0 if i % 3 == 2 else 60.0)
+    monitor.add_service_time("cashier_2", 600.0)
+
+    metrics = monitor.get_current_metrics()
+    assert monitor.cashiers["cashier_1"].total_customers_served == 300
+    assert len(monitor.cashiers["cashier_1"].service_times) == 100
+    assert metrics['min_service_time'] == 60.0
+    assert metrics['max_service_time'] == 600.0
+    assert abs(metrics['median_service_time'] - 60.0) < 5
+    assert 170 <= metrics['p90_service_time'] <= 190
+    assert abs(metrics['std_service_time'] - np.std([60.0] * 200 + [180.0] * 100 + [600.0])) < 1e-9
+
+    monitor.update_metrics()
+    assert monitor.system_metrics['active_cashiers'] == 2
+
+    monitor.reset_metrics()
+    assert 'median_service_time' not in monitor.get_current_metrics()
+
+    print("✓ Metrics cover the whole shift")
+    return True
+
+def test_served_customers_reach_service_stats():
+    """Services finished by QueueManager.update_queues feed the streaming quantiles"""
+    print("Testing service time flow...")
+
+    positions = {
+        "1": {"x": 0, "y": 0, "width": 300, "height": 600},
+        "2": {"x": 400, "y": 0, "width": 300, "height": 600}
+    }
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = load_test_config()
+        config["counters"]["total_counters"] = len(positions)
+        config["counters"]["counter_positions"] = positions
+        config["analytics"]["history_db"] = os.path.join(temp_dir, "history.db")
+        config["queue"]["retention"] = {"journal_path": os.path.join(temp_dir, "customers.jsonl")}
+
+        clock = ManualClock()
+        queue_manager = QueueManager(config, clock)
+        monitor = PerformanceMonitor(config, clock)
+        queue_manager.on_service_complete = monitor.add_service_time
+
+        for timestamp, detections in make_shopping_day(positions, 3600, seed=1):
+            clock.set(timestamp)
+            queue_data = queue_manager.update_queues(detections, (720, 1280, 3))
+            monitor.update_frame_data(queue_data, detections)
+        queue_manager.snapshot_store.close()
+        monitor.snapshot_store.close()
+
+    served = sum(queue.total_customers_served for queue in queue_manager.queues.values())
+    metrics = monitor.get_current_metrics()
+    assert served > 0 and monitor.service_stats.count == served
+    assert set(monitor.cashiers) == {1, 2}
+    assert 0 < metrics['median_service_time'] <= metrics['p90_service_time'] <= metrics['p99_service_time']
+
+    print("✓ Served customers reach the service time statistics")
+    return True
+
+def test_timeseries_rollups_are_bounded():
+    """Ring buffers overwrite old buckets and roll samples up per minute and hour"""
+    print("Testing time series store...")
+
+    ring = RingSeries(('value',), resolution=1, capacity=10)
+    for second in range(25):
+        ring.record(1000 + second, [second])
+    timestamps, counts, means = ring.window()
+    assert timestamps.tolist() == list(range(1015, 1025))
+    assert means[:, 0].tolist() == list(range(15, 25))
+    ring.record(1000, [99])  # older than the retained window
+    assert ring.window()[0][0] == 1015
+
+    # One simulated day of per-second samples in fixed memory
+    store = TimeSeriesStore(('value',), second_buckets=60, minute_buckets=120, hour_buckets=48)
+    start = 3600 * 24 * 1000
+    for second in range(0, 24 * 3600, 5):
+        store.record({'value': second // 3600}, start + second)
+
+    assert len(store.window('second')[0]) == 12
+    assert len(store.window('minute')[0]) == 120
+    hours, counts, means = store.window('hour')
+    assert len(hours) == 24 and counts.tolist() == [720] * 24
+    assert means[:, 0].tolist() == list(range(24))
+
+    minutes, _, _ = store.window('minute', start + 23 * 3600, start + 23 * 3600 + 599)
+    assert len(minutes) == 10
+
+    profile = store.hour_of_day_means()
+    assert sum(count for _, count in profile.values()) == 24 * 720
+
+    print("✓ Time series bounded with rollups")
+    return True
+
+def test_hourly_trends_from_rollups():
+    """Hourly trends come from the hour-of-day rollup"""
+    print("Testing hourly trends...")
+
+    monitor = PerformanceMonitor(load_test_config())
+    for _ in range(3):
+        monitor.update_metrics()
+    monitor.add_service_time("cashier_1", 90.0)
+    monitor.update_metrics()
+
+    trends = monitor.get_hourly_trends()
+    assert len(trends) == 1
+    trend = next(iter(trends.values()))
+    assert trend['data_points'] == 4
+    assert trend['average_customers_served'] == 0.25
+    assert trend['average_service_time'] == 22.5
+
+    monitor.reset_metrics()
+    assert monitor.get_hourly_trends() == {}
+
+    print("✓ Hourly trends read from rollups")
+    return True
+
+def chart_spec(title):
+    """Small two-panel chart spec"""
+    return {'title': title, 'grid': (1, 2), 'figsize': (4, 2), 'panels': [
+        {'type': 'line', 'x': [0, 1, 2], 'y': [1, 3, 2], 'title': 'Line'},
+        {'type': 'hist', 'values': [1, 2, 2, 3], 'bins': 3, 'title': 'Hist'}
+    ]}
+
+def test_chart_renderer_inline_formats():
+    """Charts render from plain-data specs as PNG or SVG"""
+    print("Testing chart formats...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for chart_format, magic in (("png", b"\x89PNG"), ("svg", b"<?xml")):
+            renderer = ChartRenderer({"use_processes": False, "dpi": 50, "format": chart_format})
+            path = renderer.submit(chart_spec("Inline"), os.path.join(temp_dir, "chart"))
+            assert path.endswith("." + chart_format)
+            with open(path, 'rb') as f:
+                assert f.read(5).startswith(magic)
+
+        try:
+            ChartRenderer({"format": "gif"})
+            assert False, "unknown format accepted"
+        except ValueError:
+            pass
+
+    print("✓ Charts rendered as PNG and SVG")
+    return True
+
+def test_chart_settings_reach_renderer():
+    """analytics.charts in config.json configures the report chart renderer"""
+    print("Testing chart settings...")
+
+    config = load_test_config()
+    assert "charts" in config["analytics"] and "charts" not in config["queue"]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config["analytics"]["history_db"] = os.path.join(temp_dir, "history.db")
+        config["analytics"]["charts"].update({"dpi": 72, "format": "svg", "use_processes": False})
+        report_generator = ReportGenerator(config, ManualClock(1700000000.0))
+        renderer = report_generator.chart_renderer
+        assert renderer.dpi == 72 and renderer.chart_format == "svg" and not renderer.use_processes
+        report_generator.close()
+
+    print("✓ Chart settings reach the renderer")
+    return True
+
+def test_chart_renderer_process_pool():
+    """The process pool coalesces repeated charts and recovers from timeouts"""
+    print("Testing chart process pool...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        renderer = ChartRenderer({"dpi": 50, "timeout_seconds": 60})
+        base = os.path.join(temp_dir, "hourly")
+        for i in range(5):
+            path = renderer.submit(chart_spec(f"Version {i}"), base)
+        assert renderer.wait(60)
+
+        stats = renderer.get_stats()
+        assert os.path.exists(path)
+        assert stats['submitted'] == 5 and stats['coalesced'] >= 3
+        assert stats['rendered'] + stats['coalesced'] == 5
+
+        # A job overrunning its timeout is dropped and the pool replaced
+        renderer.timeout_seconds = 0.001
+        renderer.submit(chart_spec("Slow"), os.path.join(temp_dir, "slow"))
+        assert renderer.wait(60)
+        assert renderer.get_stats()['timeouts'] == 1
+
+        renderer.timeout_seconds = 60
+        path = renderer.submit(chart_spec("After"), os.path.join(temp_dir, "after"))
+        renderer.close(60)
+        assert os.path.exists(path)
+
+    print("✓ Chart pool coalesces and recovers")
+    return True
+
+def run_all_tests():
+    """Run all analytics tests"""
+    tests = [
+        test_running_stats_match_numpy,
+        test_p2_quantiles_track_percentiles,
+        test_current_metrics_cover_whole_shift,
+        test_served_customers_reach_service_stats,
+        test_timeseries_rollups_are_bounded,
+        test_hourly_trends_from_rollups,
+        test_chart_renderer_inline_formats,
+        test_chart_settings_reach_renderer,
+        test_chart_renderer_process_pool,
+    ]
+
+    passed = 0
+    for test_func in tests:
+        try:
+            if test_func():
+                passed += 1
+        except Exception as e:
+            print(f"✗ {test_func.__name__} FAILED: {e}")
+
+    print(f"\nAnalytics Tests: {passed}/{len(tests)} passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    exit(0 if run_all_tests() else 1)
@@ -0,0 +1,444 @@
+"""
+Detection Pipeline Tests
+Tests detector result extraction and tracking without a camera or model
+"""
+
+import sys
+import os
+import json
+import threading
+import time
+import numpy as np
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+from benchmark import make_fake_result, legacy_yolo_extraction, make_yolo_output
+from detector.person_detector import PersonDetector
+from detector.motion_gate import MotionGate
+from detector.inference_server import InferenceServer
+from detector.backends import decode_yolov8, letterbox, nms
+from detector import tracker
+from detector import person_detector
+from utils.lazy_import import LazyModule, module_available
+
+def load_test_config():
+    """Load configuration for tests"""
+    with open(os.path.join(os.path.dirname(__file__), 'config.json'), 'r') as f:
+        return json.load(f)
+
+def make_detector():
+    """Create a detector with known thresholds"""
+    detector = PersonDetector(load_test_config())
+    detector.wait_until_ready()
+    detector.person_class_id = 0
+    detector.confidence_threshold = 0.5
+    return detector
+
+def test_batched_yolo_extraction():
+    """Batched YOLO extraction matches the per-box loop"""
+    print("Testing batched YOLO extraction...")
+
+    detector = make_detector()
+    for num_boxes in (0, 1, 5, 50, 200):
+        result = make_fake_result(num_boxes, seed=num_boxes)
+        expected = legacy_yolo_extraction(result, 0, 0.5)
+        detections = detector.extract_yolo_detections(result)
+
+        assert detections == expected
+        for detection in detections:
+            assert all(type(v) is int for v in detection['bbox'] + detection['center'])
+            assert type(detection['confidence']) is float
+
+    print("✓ Batched extraction matches per-box extraction")
+    return True
+
+def test_detector_state_initialized():
+    """Tracking and timing state exists regardless of backend"""
+    print("Testing detector state...")
+
+    detector = make_detector()
+    assert detector.tracked_persons == {}
+    assert len(detector.detection_times) == 0
+    assert detector.get_detection_stats()['fps'] == 0
+
+    print("✓ Detector state initialized")
+    return True
+
+def test_roi_inference_maps_to_frame():
+    """ROI crops map detections back to frame coordinates"""
+    print("Testing ROI inference...")
+
+    detector = make_detector()
+    detector.counter_regions = [(100, 50, 200, 300), (250, 50, 200, 300)]
+    detector.roi_padding = 0
+
+    # Fake backend: one person at a fixed crop-local position
+    crop_shapes = []
+    def fake_run_detector(image):
+        crop_shapes.append(image.shape[:2])
+        return [{'bbox': [10, 20, 40, 80], 'confidence': 0.9, 'center': [30, 60]}]
+    detector.run_detector = fake_run_detector
+
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    detector.roi_mode = "merged"
+    detections = detector.detect_persons(frame)
+    assert crop_shapes == [(300, 350)]
+    assert detections == [{'bbox': [110, 70, 40, 80], 'confidence': 0.9, 'center': [130, 110]}]
+
+    crop_shapes.clear()
+    detector.roi_mode = "per_counter"
+    detections = detector.detect_persons(frame)
+    assert crop_shapes == [(300, 200), (300, 200)]
+    assert sorted(d['center'] for d in detections) == [[130, 110], [280, 110]]
+
+    # Crops are clipped to the frame
+    detector.counter_regions = [(600, 400, 200, 200)]
+    assert detector.get_roi_crops(frame.shape) == [(600, 400, 640, 480)]
+
+    print("✓ ROI detections mapped to frame coordinates")
+    return True
+
+def test_detection_waits_for_model():
+    """No detections are returned until the background model load finishes"""
+    print("Testing background model load...")
+
+    detector = make_detector()
+    assert detector.model_ready.is_set() and detector.model_load_time is not None
+
+    calls = []
+    def fake_run_detector(image):
+        calls.append(image.shape)
+        return [{'bbox': [10, 20, 40, 80], 'confidence': 0.9, 'center': [30, 60]}]
+    detector.run_detector = fake_run_detector
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    # Still loading: the backend is not touched
+    detector.model_ready.clear()
+    assert detector.detect_persons(frame) == []
+    assert calls == [] and detector.get_detection_stats()['frames_before_ready'] == 1
+    assert not detector.wait_until_ready(timeout=0.01)
+
+    detector.model_ready.set()
+    assert len(detector.detect_persons(frame)) == 1 and len(calls) == 1
+
+    # Lazy modules import on first attribute access only
+    module = LazyModule("colorsys")
+    assert not module.loaded
+    assert module.rgb_to_hsv(1.0, 0.0, 0.0) == (0.0, 1.0, 1.0)
+    assert module.loaded
+    assert module_available("json")
+    assert not module_available("no_such_module_for_tests")
+    assert not module_available("no_such_package_for_tests.child")
+
+    print("✓ Detection waits for the model")
+    return True
+
+def test_failed_model_load_still_ready():
+    """A backend that raises while loading falls back to HOG and the detector still becomes ready"""
+    print("Testing failed model load...")
+
+    real_load_backend = person_detector.load_backend
+    def failing_load_backend(config, warmup_size=0):
+        if config.get("backend") != "hog":
+            raise RuntimeError("model file corrupt")
+        return real_load_backend(config, warmup_size)
+
+    config = load_test_config()
+    config["detection"]["async_model_load"] = True
+    person_detector.load_backend = failing_load_backend
+    try:
+        detector = PersonDetector(config)
+        assert detector.wait_until_ready(timeout=30)
+    finally:
+        person_detector.load_backend = real_load_backend
+    assert detector.backend.name == "hog"
+    assert detector.detect_persons(np.zeros((64, 64, 3), dtype=np.uint8)) == []
+
+    print("✓ Failed model load falls back to HOG")
+    return True
+
+def test_backend_calls_are_serialized():
+    """Detection worker threads sharing one detector never run the backend concurrently"""
+    print("Testing backend serialization...")
+
+    class CountingBackend:
+        name = "counting"
+
+        def __init__(self):
+            self.active = 0
+            self.max_active = 0
+
+        def detect(self, image):
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            time.sleep(0.005)
+            self.active -= 1
+            return []
+
+    detector = make_detector()
+    detector.roi_mode = "full"
+    detector.backend = CountingBackend()
+    frame = np.zeros((64, 64, 3), dtype=np.uint8)
+
+    def worker():
+        for _ in range(10):
+            detector.detect_persons(frame)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert detector.backend.max_active == 1
+
+    print("✓ Backend calls serialized across workers")
+    return True
+
+def test_motion_gate_skips_static_frames():
+    """Motion gate skips still frames and forces periodic detection"""
+    print("Testing motion gate...")
+
+    config = load_test_config()
+    config["counters"]["counter_positions"] = {"1": {"x": 100, "y": 100, "width": 200, "height": 200}}
+    config["detection"]["motion_gate"] = {"enabled": True, "force_every": 5}
+    gate = MotionGate(config)
+
+    still = np.full((480, 640, 3), 80, dtype=np.uint8)
+    decisions = [gate.should_detect(still) for _ in range(10)]
+    # First frame, then a forced detection every 5 frames
+    assert decisions == [True, False, False, False, False, True, False, False, False, False]
+    assert gate.get_stats()['frames_skipped'] == 8
+    assert gate.get_stats()['forced_detections'] == 1
+
+    # Movement outside the counter is ignored, inside it triggers detection
+    gate.reset()
+    assert gate.should_detect(still)
+    outside = still.copy()
+    outside[400:480, 500:640] = 255
+    assert not gate.should_detect(outside)
+    inside = still.copy()
+    inside[150:250, 150:250] = 255
+    assert gate.should_detect(inside)
+    assert gate.get_stats()['motion_detections'] == 1
+
+    # Disabled gate always detects
+    config["detection"]["motion_gate"]["enabled"] = False
+    assert all(MotionGate(config).should_detect(still) for _ in range(3))
+
+    print("✓ Motion gate skips static frames")
+    return True
+
+def test_tracking_assignment_is_one_to_one():
+    """Two tracks never claim the same detection"""
+    print("Testing track assignment...")
+
+    detector = make_detector()
+    def detection(x, y):
+        return {'bbox': [x - 20, y - 40, 40, 80], 'confidence': 0.9, 'center': [x, y]}
+
+    detector.track_persons([detection(0, 0), detection(50, 0)])
+    assert sorted(detector.tracked_persons) == [1, 2]
+
+    # Both tracks are nearest to the first detection
+    tracks = detector.track_persons([detection(40, 0), detection(90, 0)])
+    assert sorted(tracks) == [1, 2]
+    assert tracks[1]['center'] == [40, 0] and tracks[2]['center'] == [90, 0]
+
+    # Gated-out pairs are never matched
+    tracks = detector.track_persons([detection(500, 500)])
+    assert sorted(tracks) == [1, 2, 3]
+    assert tracks[1]['disappeared'] == 1 and tracks[2]['disappeared'] == 1
+
+    # Greedy fallback is also one-to-one
+    has_scipy = tracker.HAS_SCIPY
+    try:
+        tracker.HAS_SCIPY = False
+        matches, unmatched_tracks, unmatched_detections = tracker.assign_detections(
+            [[0, 0], [50, 0]], [[40, 0], [90, 0]], 100
+        )
+    finally:
+        tracker.HAS_SCIPY = has_scipy
+    assert len({d for _, d in matches}) == len(matches) == 2
+    assert unmatched_tracks == [] and unmatched_detections == []
+
+    print("✓ Track assignment is one-to-one")
+    return True
+
+class EchoBatchDetector:
+    """Server-side detector reporting each image's fill value and its batch size"""
+
+    def __init__(self, config):
+        self.delay = config["detection"].get("echo_delay", 0.02)
+
+    def wait_until_ready(self, timeout=None):
+        return True
+
+    def detect_batch(self, images):
+        time.sleep(self.delay)
+        return [[{'bbox': [0, 0, image.shape[1], image.shape[0]], 'confidence': 1.0,
+                  'center': [int(image[0, 0, 0]), len(images)]}] for image in images]
+
+def test_inference_server_batches_and_routes():
+    """Concurrent pipelines share batched model calls and each gets its own result"""
+    print("Testing batched inference server...")
+
+    config = load_test_config()
+    config["detection"]["inference_server"] = {"max_batch_size": 4, "max_wait_ms": 20,
+                                               "max_frame_shape": [200, 200, 3]}
+    server = InferenceServer(config, detector_factory=EchoBatchDetector, max_clients=6)
+    assert server.start(timeout=60)
+    try:
+        clients = [server.client() for _ in range(5)]
+        errors = []
+
+        def stream(slot, client):
+            for i in range(6):
+                image = np.full((100 + slot, 120, 3), slot * 10 + i, dtype=np.uint8)
+                detection = client.detect(image)[0]
+                if detection['center'][0] != slot * 10 + i or detection['bbox'][3] != 100 + slot:
+                    errors.append((slot, i, detection))
+
+        threads = [threading.Thread(target=stream, args=(slot, client)) for slot, client in enumerate(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        batch_sizes = [size for client in clients for size in client.batch_sizes]
+        assert max(batch_sizes) > 1 and max(batch_sizes) <= 4
+        assert all(client.get_stats()['requests'] == 6 for client in clients)
+
+        # A detector using a client loads no model and is ready at once
+        detector = PersonDetector(config, inference_client=server.client())
+        assert detector.backend is None and detector.model_ready.is_set()
+        detections = detector.detect_persons(np.full((50, 60, 3), 7, dtype=np.uint8))
+        assert detections[0]['center'] == [7, 1] and detections[0]['bbox'] == [0, 0, 60, 50]
+
+        try:
+            clients[0].detect(np.zeros((300, 300, 3), dtype=np.uint8))
+            assert False, "oversized frame accepted"
+        except ValueError:
+            pass
+    finally:
+        server.stop()
+
+    print("✓ Inference server batches and routes results")
+    return True
+
+def test_yolov8_decoding_maps_to_frame():
+    """Letterbox, decoding and NMS of raw YOLOv8 output give frame-space person boxes"""
+    print("Testing YOLOv8 output decoding...")
+
+    # 1280x720 halves to 640x360 with 140 px bars above and below
+    frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+    padded, scale, pad = letterbox(frame, 640)
+    assert padded.shape == (640, 640, 3) and scale == 0.5 and pad == (0, 140)
+    assert (padded[:140] == 114).all() and (padded[140:500] == 0).all()
+
+    people = [(40, 200, 90, 330), (300, 150, 380, 400)]
+    output = make_yolo_output(people)
+    # A confident box whose best class is not a person is dropped
+    output[:4, 0] = [500, 300, 60, 60]
+    output[4:, 0] = 0
+    output[4, 0], output[4 + 2, 0] = 0.8, 0.95
+
+    detections = decode_yolov8(output, scale, pad, frame.shape, nms_threshold=0.4)
+    assert [d['bbox'] for d in detections] == [[80, 120, 100, 260], [600, 20, 160, 500]]
+    assert detections[0]['center'] == [130, 250]
+    assert all(type(v) is int for d in detections for v in d['bbox'] + d['center'])
+    assert all(type(d['confidence']) is float for d in detections)
+    assert decode_yolov8(output, scale, pad, frame.shape, confidence_threshold=0.95) == []
+
+    # Overlaps above the threshold are suppressed, the best box first
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 11, 11], [20, 20, 30, 30], [0, 0, 10, 5]], dtype=np.float32)
+    scores = np.array([0.6, 0.9, 0.5, 0.7], dtype=np.float32)
+    assert nms(boxes, scores, 0.4).tolist() == [1, 3, 2]
+    assert nms(boxes, scores, 0.9).tolist() == [1, 3, 0, 2]
+
+    print("✓ YOLOv8 output decoded to frame coordinates")
+    return True
+
+def test_backend_selection():
+    """Unknown backends are rejected, unusable ones fall back to HOG"""
+    print("Testing detector backend selection...")
+
+    config = load_test_config()
+    config["detection"]["backend"] = "tensorrt"
+    try:
+        PersonDetector(config)
+        assert False, "unknown backend accepted"
+    except ValueError:
+        pass
+
+    config["detection"].update(backend="onnxruntime", model_path="missing_model.onnx", async_model_load=False)
+    detector = PersonDetector(config)
+    assert detector.backend.name == "hog"
+    assert detector.get_detection_stats()['backend'] == "hog"
+    assert detector.detect_batch([np.zeros((64, 64, 3), dtype=np.uint8)]) == [[]]
+
+    print("✓ Detector backends selected")
+    return True
+
+def test_inference_client_recovers_after_timeout():
+    """A request answered after its client timed out never becomes the answer to the next one"""
+    print("Testing inference client timeouts...")
+
+    config = load_test_config()
+    config["detection"]["echo_delay"] = 0.6
+    config["detection"]["inference_server"] = {"max_batch_size": 1, "max_wait_ms": 0,
+                                               "max_frame_shape": [50, 50, 3], "timeout_seconds": 0.3}
+    server = InferenceServer(config, detector_factory=EchoBatchDetector, max_clients=1)
+    assert server.start(timeout=60)
+    try:
+        client = server.client()
+        try:
+            client.detect(np.full((20, 20, 3), 1, dtype=np.uint8))
+            assert False, "slow request did not time out"
+        except TimeoutError:
+            pass
+
+        # The server skips or drops the stale request and answers this frame
+        client.timeout = 5
+        detection = client.detect(np.full((30, 30, 3), 2, dtype=np.uint8))[0]
+        assert detection['center'][0] == 2 and detection['bbox'][3] == 30
+        assert client.get_stats()['errors'] == 1
+    finally:
+        server.stop()
+
+    print("✓ Inference client recovers after a timeout")
+    return True
+
+def run_all_tests():
+    """Run all detection tests"""
+    tests = [
+        test_batched_yolo_extraction,
+        test_detector_state_initialized,
+        test_roi_inference_maps_to_frame,
+        test_detection_waits_for_model,
+        test_failed_model_load_still_ready,
+        test_backend_calls_are_serialized,
+        test_motion_gate_skips_static_frames,
+        test_tracking_assignment_is_one_to_one,
+        test_inference_server_batches_and_routes,
+        test_inference_client_recovers_after_timeout,
+        test_yolov8_decoding_maps_to_frame,
+        test_backend_selection,
+    ]
+
+    passed = 0
+    for test_func in tests:
+        try:
+            if test_func():
+                passed += 1
+        except Exception as e:
+            print(f"✗ {test_func.__name__} FAILED: {e}")
+
+    print(f"\nDetection Tests: {passed}/{len(tests)} passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    exit(0 if run_all_tests() else 1)
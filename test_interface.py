@@ -0,0 +1,124 @@
+"""
+Interface Rendering Tests
+Tests the cached static overlay against drawing every frame
+"""
+
+import sys
+import os
+import json
+import numpy as np
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+from benchmark import legacy_draw_separation_lines, legacy_draw_controls, make_counter_scene
+from visual.interface_manager import InterfaceManager, measure_text
+
+def make_interface(num_counters):
+    """Interface manager over a grid of counters, plus its scene"""
+    with open(os.path.join(os.path.dirname(__file__), 'config.json'), 'r') as f:
+        config = json.load(f)
+    positions, queue_data, detections = make_counter_scene(num_counters, width=1280, height=720)
+    config["counters"]["counter_positions"] = positions
+    return InterfaceManager(config), queue_data
+
+def test_static_layer_matches_direct_drawing():
+    """Composited static layer gives the same pixels as drawing every frame"""
+    print("Testing static layer compositing...")
+
+    interface, queue_data = make_interface(12)
+    frame = np.random.default_rng(0).integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+
+    for _ in range(3):
+        expected = legacy_draw_separation_lines(interface, frame.copy(), queue_data)
+        expected = legacy_draw_controls(interface, expected)
+        actual = interface.draw_separation_lines(frame.copy(), queue_data)
+        actual = interface.draw_system_info(actual)
+
+        # Only the timestamp bar at the bottom left is drawn differently
+        assert np.array_equal(expected[:-30], actual[:-30])
+        assert np.array_equal(expected[-30:, 640:], actual[-30:, 640:])
+    assert interface.static_renders == 1
+
+    print("✓ Static layer matches direct drawing")
+    return True
+
+def test_static_layer_rebuilds_on_layout_change():
+    """Moving a counter or changing frame size rebuilds the layer"""
+    print("Testing static layer invalidation...")
+
+    interface, queue_data = make_interface(4)
+    frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+
+    interface.draw_separation_lines(frame.copy(), queue_data)
+    interface.draw_separation_lines(frame.copy(), queue_data)
+    assert interface.static_renders == 1
+
+    interface.counter_config["counter_positions"]["2"]["x"] += 15
+    moved = interface.draw_separation_lines(frame.copy(), queue_data)
+    assert interface.static_renders == 2
+    assert np.array_equal(moved, legacy_draw_separation_lines(interface, frame.copy(), queue_data))
+
+    interface.draw_separation_lines(np.zeros((1080, 1920, 3), dtype=np.uint8), queue_data)
+    assert interface.static_renders == 3
+
+    interface.invalidate_static_layer()
+    interface.draw_separation_lines(np.zeros((1080, 1920, 3), dtype=np.uint8), queue_data)
+    assert interface.static_renders == 4
+
+    # Text measurement is memoized by (text, font, scale, thickness)
+    measure_text.cache_clear()
+    measure_text("COUNTER 1 (EXPRESS)", interface.font, 0.6, 2)
+    measure_text("COUNTER 1 (EXPRESS)", interface.font, 0.6, 2)
+    assert measure_text.cache_info().hits == 1
+
+    print("✓ Static layer rebuilt on layout change")
+    return True
+
+def test_annotation_modes():
+    """In-place drawing changes the frame, drawing on a buffer keeps it clean"""
+    print("Testing annotation modes...")
+
+    interface, queue_data = make_interface(4)
+    frame = np.random.default_rng(1).integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+    metrics = {'total_customers_served': 3, 'queue_efficiency': 0.9, 'fps': 25.0}
+
+    expected = interface.draw_interface(frame, [], queue_data, metrics)
+    assert expected is not frame
+
+    clean = frame.copy()
+    buffer = np.empty_like(frame)
+    output = interface.draw_interface(frame, [], queue_data, metrics, out=buffer)
+    assert output is buffer and np.array_equal(frame, clean)
+
+    output = interface.draw_interface(frame, [], queue_data, metrics, out=frame)
+    assert output is frame and not np.array_equal(frame, clean)
+
+    # The timestamp may tick between calls; everything above it matches
+    assert np.array_equal(output[:-30], expected[:-30]) and np.array_equal(buffer[:-30], expected[:-30])
+
+    print("✓ Annotation modes draw the same interface")
+    return True
+
+def run_all_tests():
+    """Run all interface tests"""
+    tests = [
+        test_static_layer_matches_direct_drawing,
+        test_static_layer_rebuilds_on_layout_change,
+        test_annotation_modes,
+    ]
+
+    passed = 0
+    for test_func in tests:
+        try:
+            if test_func():
+                passed += 1
+        except Exception as e:
+            print(f"✗ {test_func.__name__} FAILED: {e}")
+
+    print(f"\nInterface Tests: {passed}/{len(tests)} passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    exit(0 if run_all_tests() else 1)
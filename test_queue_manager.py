@@ -0,0 +1,300 @@
+"""
+Queue Manager Tests
+Tests customer identity, queue flow and timing without a camera
+"""
+
+import sys
+import os
+import json
+import tempfile
+import tracemalloc
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from queue_management.queue_manager import QueueManager, Customer
+from queue_management.customer_table import CustomerTable
+from detector.counter_index import CounterIndex
+from utils.clock import ManualClock
+
+def load_test_config():
+    """Load configuration with a single counter covering the test area"""
+    with open(os.path.join(os.path.dirname(__file__), 'config.json'), 'r') as f:
+        config = json.load(f)
+    config["counters"]["total_counters"] = 1
+    config["counters"]["counter_positions"] = {"1": {"x": 0, "y": 0, "width": 600, "height": 600}}
+    return config
+
+def person(track_id, x, y):
+    """Build a tracked detection"""
+    return {'bbox': [x - 20, y - 40, 40, 80], 'confidence': 0.9, 'center': [x, y], 'track_id': track_id}
+
+def test_track_ids_keep_customer_identity():
+    """Pixel jitter does not create new customers when track IDs are present"""
+    print("Testing stable customer identity...")
+
+    queue_manager = QueueManager(load_test_config())
+    queue = queue_manager.queues[1]
+
+    for frame in range(200):
+        jitter = frame % 3
+        queue_manager.update_queues([person(1, 100 + jitter, 100 + jitter),
+                                     person(2, 100 - jitter, 300 + jitter)], (720, 1280))
+
+    assert len(queue_manager.all_customers) == 2
+    assert queue.current_customer.person_id == "customer_1"
+    assert [c.person_id for c in queue.customers] == ["customer_2"]
+
+    print("✓ Customers keep one identity across frames")
+    return True
+
+def test_waiting_customer_promoted_with_wait_time():
+    """A waiting customer keeps their entry time when they reach the counter"""
+    print("Testing customer promotion...")
+
+    queue_manager = QueueManager(load_test_config())
+    queue = queue_manager.queues[1]
+
+    queue_manager.update_queues([person(1, 100, 100), person(2, 100, 300)], (720, 1280))
+    waiting = queue.customers[0]
+    waiting.entry_time -= 30  # joined the line 30 seconds ago
+
+    # Customer 1 leaves, customer 2 walks up to the counter
+    queue_manager.update_queues([person(2, 100, 120)], (720, 1280))
+
+    assert queue.total_customers_served == 1
+    assert queue.current_customer is waiting
+    assert queue.customers == []
+    assert waiting.actual_wait_time >= 30
+
+    print("✓ Waiting customer promoted with their wait time")
+    return True
+
+def test_manual_clock_drives_timing():
+    """Service and wait times follow the injected clock, not the wall clock"""
+    print("Testing manual clock timing...")
+
+    clock = ManualClock(1714550400.0)
+    queue_manager = QueueManager(load_test_config(), clock)
+    queue = queue_manager.queues[1]
+
+    queue_manager.update_queues([person(1, 100, 100), person(2, 100, 300)], (720, 1280))
+    assert queue.current_customer.service_start_time == 1714550400.0
+    assert queue.customers[0].entry_time == 1714550400.0
+
+    # Customer 1 is served for 95 s of video time, then customer 2 walks up
+    clock.advance(95)
+    queue_manager.update_queues([person(2, 100, 120)], (720, 1280))
+    assert queue.total_customers_served == 1
+    assert queue.served_customers[-1].service_time == 95
+    assert queue.average_service_time == 95 and queue.average_wait_time == 0
+    assert queue.current_customer.actual_wait_time == 95
+
+    clock.advance(30)
+    assert queue.calculate_estimated_wait_time() == 95 - 30
+
+    print("✓ Timing follows the manual clock")
+    return True
+
+def test_untracked_detections_still_supported():
+    """Detections without track IDs fall back to center-based IDs"""
+    print("Testing untracked detections...")
+
+    queue_manager = QueueManager(load_test_config())
+    detections = [{'bbox': [80, 60, 40, 80], 'confidence': 0.9, 'center': [100, 100]}]
+    queue_data = queue_manager.update_queues(detections, (720, 1280))
+
+    assert queue_data[1]['current_customer']['person_id'] == "customer_1_100_100"
+
+    print("✓ Untracked detections supported")
+    return True
+
+def test_queue_snapshots_are_cached_and_read_only():
+    """Static queues reuse their snapshot, changes produce a new one"""
+    print("Testing queue snapshots...")
+
+    queue_manager = QueueManager(load_test_config())
+    queue = queue_manager.queues[1]
+
+    # No current customer: estimated wait is constant, nothing is rebuilt
+    first = queue_manager.update_queues([], (720, 1280))
+    second = queue_manager.update_queues([], (720, 1280))
+    assert first[1] is second[1]
+
+    # A new customer invalidates the snapshot
+    detections = [person(1, 100, 100), person(2, 100, 300)]
+    changed = queue_manager.update_queues(detections, (720, 1280))
+    assert changed[1] is not first[1]
+    assert changed[1]['queue_length'] == 2
+    assert changed[1]['current_customer']['person_id'] == "customer_1"
+    assert [c['person_id'] for c in changed[1]['customers']] == ["customer_2"]
+
+    # Same people again: customer views are shared, only timing fields refresh
+    again = queue_manager.update_queues(detections, (720, 1280))
+    assert again[1]['customers'] is changed[1]['customers']
+    assert again[1]['current_customer'] is changed[1]['current_customer']
+
+    # Views are read-only and match the full serialization
+    for view in (again, again[1], again[1]['current_customer']):
+        try:
+            view['queue_length'] = 0
+            assert False, "snapshot is writable"
+        except TypeError:
+            pass
+    full = queue.to_dict()
+    assert {k: v for k, v in again[1].items() if k not in ('customers', 'current_customer', 'estimated_wait_time')} == \
+        {k: v for k, v in full.items() if k not in ('customers', 'current_customer', 'estimated_wait_time')}
+
+    print("✓ Queue snapshots cached and read-only")
+    return True
+
+def test_customer_table_bulk_math():
+    """Columnar table matches per-customer wait, service and position math"""
+    print("Testing customer table...")
+
+    assert not hasattr(Customer("c", 1, 100.0), '__dict__')
+
+    table = CustomerTable(capacity=2)
+    table.append(1, 100.0, 130.0, 190.0, "served")
+    table.append(1, 110.0, 190.0, None, "current")
+    table.extend([1, 2, 1], [150.0, 120.0, 140.0])
+    assert len(table) == 5
+
+    waits = table.wait_times(200.0)
+    assert waits.tolist() == [30.0, 80.0, 50.0, 80.0, 60.0]
+    assert table.service_times().tolist() == [60.0]
+
+    summary = table.summary(200.0, queue_id=1)
+    assert summary['customers'] == 4 and summary['served'] == 1
+    assert summary['average_wait_time'] == 55.0
+
+    # Rolling statistics over the newest rows only
+    recent = table.summary(200.0, last=2)
+    assert recent['customers'] == 2 and recent['average_wait_time'] == 70.0
+
+    # Dropping the oldest rows keeps the newest in order
+    table.drop_oldest(2)
+    assert len(table) == 3 and table.entry_time[:3].tolist() == [150.0, 120.0, 140.0]
+
+    print("✓ Customer table bulk math")
+    return True
+
+def test_counter_index_matches_area_checks():
+    """Counter assignment keeps inclusive bounds and overlapping counters"""
+    print("Testing counter index...")
+
+    index = CounterIndex({
+        "2": {"x": 100, "y": 0, "width": 100, "height": 100},
+        "1": {"x": 0, "y": 0, "width": 100, "height": 100},
+    })
+    assert index.counter_ids == [1, 2]
+
+    # Edge point x=100 lies inside both counters
+    centers = [[50, 50], [100, 100], [150, 50], [250, 50]]
+    assert index.assign(centers) == {1: [0, 1], 2: [1, 2]}
+    assert index.members_of(centers, "2") == [1, 2]
+    assert index.members_of(centers, 9) == []
+    assert index.assign([]) == {1: [], 2: []}
+    assert index.assign_nearest(centers) == {1: [0, 1], 2: [2]}
+    assert index.assign_nearest([[160, 50], [110, 50]]) == {1: [], 2: [0, 1]}
+    assert index.assign_nearest([]) == {1: [], 2: []}
+    assert CounterIndex.points_in_rect(centers, (0, 0, 100, 100)).tolist() == [True, True, False, False]
+
+    # QueueManager hands each queue only its own detections
+    config = load_test_config()
+    config["counters"]["total_counters"] = 2
+    config["counters"]["counter_positions"] = {"1": {"x": 0, "y": 0, "width": 300, "height": 600},
+                                               "2": {"x": 300, "y": 0, "width": 300, "height": 600}}
+    queue_manager = QueueManager(config)
+    queue_data = queue_manager.update_queues([person(1, 100, 100), person(2, 400, 100),
+                                              person(3, 400, 300), person(4, 900, 100)], (720, 1280))
+    assert queue_data[1]['queue_length'] == 1
+    assert queue_data[2]['queue_length'] == 2
+    assert queue_manager.get_persons_in_queue_area([person(5, 300, 50)], 2, (720, 1280))[0]['track_id'] == 5
+
+    # A person where two counters overlap joins only the nearer queue
+    config["counters"]["counter_positions"]["2"]["x"] = 200
+    queue_manager = QueueManager(config)
+    queue_data = queue_manager.update_queues([person(6, 260, 100)], (720, 1280))
+    assert queue_data[1]['queue_length'] == 0 and queue_data[2]['queue_length'] == 1
+    assert queue_manager.all_customers['customer_6'].queue_id == 2
+
+    print("✓ Counter index assignment")
+    return True
+
+def simulate_store_day(queue_manager, hours=24, seconds_per_frame=4, service_frames=3):
+    """Drive a queue with a steady flow of tracked customers for a synthetic day"""
+    frames = int(hours * 3600 / seconds_per_frame)
+    for frame in range(frames):
+        # Three people in line, the front one leaves every few frames
+        front = frame // service_frames
+        queue_manager.update_queues([person(front, 100, 100),
+                                     person(front + 1, 100, 250),
+                                     person(front + 2, 100, 400)], (720, 1280))
+        yield frame, frames
+
+def test_soak_memory_stays_flat():
+    """A synthetic 24-hour day keeps memory flat and totals exact"""
+    print("Testing 24-hour soak...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = load_test_config()
+        config["queue"]["retention"] = {
+            "served_window": 200,
+            "customer_window": 500,
+            "journal_path": os.path.join(temp_dir, "customers.jsonl")
+        }
+        queue_manager = QueueManager(config)
+        queue = queue_manager.queues[1]
+
+        tracemalloc.start()
+        try:
+            for frame, frames in simulate_store_day(queue_manager):
+                if frame == frames // 4:
+                    warm_memory = tracemalloc.get_traced_memory()[0]
+            end_memory = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+
+        served = queue.total_customers_served
+        stats = queue_manager.get_retention_stats()
+        journal_served = sum(1 for r in queue_manager.journal.read() if r['status'] == 'served')
+
+        assert served > 7000
+        assert stats['served_in_memory'] == 200
+        assert stats['customers_in_memory'] <= 550
+        assert len(queue.history) <= 550
+        # Every served customer is either still in memory or in the journal
+        assert journal_served + len(queue.served_customers) == served
+        # Memory after 18 more hours grows by less than 128 KB
+        assert end_memory - warm_memory < 128 * 1024, end_memory - warm_memory
+
+    print(f"✓ Memory flat over {served} customers ({(end_memory - warm_memory) / 1024:.0f} KB drift)")
+    return True
+
+def run_all_tests():
+    """Run all queue manager tests"""
+    tests = [
+        test_track_ids_keep_customer_identity,
+        test_waiting_customer_promoted_with_wait_time,
+        test_manual_clock_drives_timing,
+        test_untracked_detections_still_supported,
+        test_queue_snapshots_are_cached_and_read_only,
+        test_customer_table_bulk_math,
+        test_counter_index_matches_area_checks,
+        test_soak_memory_stays_flat,
+    ]
+
+    passed = 0
+    for test_func in tests:
+        try:
+            if test_func():
+                passed += 1
+        except Exception as e:
+            print(f"✗ {test_func.__name__} FAILED: {e}")
+
+    print(f"\nQueue Manager Tests: {passed}/{len(tests)} passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    exit(0 if run_all_tests() else 1)
@@ -0,0 +1,240 @@
+"""
+Replay Engine Tests
+Tests deterministic re-analysis of recorded detections
+"""
+
+import sys
+import os
+import json
+import tempfile
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+from benchmark import make_shopping_day
+from replay.replay_engine import ReplayEngine
+from replay.detection_recording import DetectionRecorder, DetectionRecording, DetectionReplaySource
+from utils.clock import ManualClock
+
+POSITIONS = {
+    "1": {"x": 0, "y": 0, "width": 300, "height": 600},
+    "2": {"x": 400, "y": 0, "width": 300, "height": 600}
+}
+
+def load_test_config(temp_dir):
+    """Load configuration with two counters and storage in temp_dir"""
+    with open(os.path.join(os.path.dirname(__file__), 'config.json'), 'r') as f:
+        config = json.load(f)
+    config["counters"]["total_counters"] = len(POSITIONS)
+    config["counters"]["counter_positions"] = POSITIONS
+    config["analytics"]["history_db"] = os.path.join(temp_dir, "history.db")
+    config["queue"]["retention"] = {"journal_path": os.path.join(temp_dir, "customers.jsonl")}
+    return config
+
+def replay_day(temp_dir, hours=2):
+    """Replay a synthetic day and return its summary without wall-clock fields"""
+    engine = ReplayEngine(load_test_config(temp_dir), save_interval=300)
+    summary = engine.run(make_shopping_day(POSITIONS, hours * 3600, seed=3))
+    engine.close()
+    for key in ('wall_seconds', 'speedup'):
+        summary.pop(key)
+    return engine, summary
+
+def test_replay_is_deterministic():
+    """Replaying the same records twice gives identical results"""
+    print("Testing deterministic replay...")
+
+    with tempfile.TemporaryDirectory() as first_dir, tempfile.TemporaryDirectory() as second_dir:
+        first_engine, first = replay_day(first_dir)
+        second_engine, second = replay_day(second_dir)
+
+    assert first['records'] == 2 * 3600 * 2
+    assert first['queue_metrics']['total_customers_served'] > 0
+    assert first == second
+    assert first_engine.alerts == second_engine.alerts
+
+    print("✓ Replay is deterministic")
+    return True
+
+def test_replay_uses_record_time():
+    """Service times and snapshots follow record timestamps, not the wall clock"""
+    print("Testing replay timing...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        engine = ReplayEngine(load_test_config(temp_dir), save_interval=600)
+        start_time = 1714550400.0
+
+        # One customer served for exactly 100 s, sampled once a second
+        records = [(start_time + second, [{'bbox': [130, 60, 40, 80], 'confidence': 0.9,
+                                           'center': [150, 100], 'track_id': 1}])
+                   for second in range(101)]
+        records += [(start_time + 101 + second, []) for second in range(3600)]
+        summary = engine.run(records)
+
+        queue = engine.queue_manager.queues[1]
+        assert queue.total_customers_served == 1
+        assert queue.served_customers[-1].service_time == 101
+        assert summary['recorded_seconds'] == 3700
+
+        # A snapshot every 600 s of record time plus one at the end
+        store = engine.queue_manager.snapshot_store
+        snapshots = store.query('queue')
+        assert len(snapshots) == 3700 // 600 + 1
+        assert snapshots[0]['ts'] == start_time + 600
+        engine.close()
+
+    print("✓ Replay follows record time")
+    return True
+
+def test_recording_round_trip():
+    """Recorded frames read back with their timestamps, boxes and track IDs"""
+    print("Testing detection recording...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "detections.qdr")
+        frames = list(make_shopping_day(POSITIONS, 600, seed=5))
+        frames[3] = (frames[3][0], [{'bbox': [5, 6, 7, 8], 'confidence': 0.5, 'center': [8, 10]}])
+
+        recorder = DetectionRecorder(path, frame_shape=(720, 1280, 3))
+        for timestamp, detections in frames:
+            recorder.record(timestamp, detections)
+        assert not os.path.exists(path)  # published on close only
+        recorder.close()
+
+        recording = DetectionRecording(path)
+        assert len(recording) == len(frames)
+        assert recording.frame_shape == (720, 1280, 3)
+        assert os.path.getsize(path) < 200 + 20 * len(frames) + 40 * recording.metadata['detections']
+
+        for (timestamp, detections), (replayed_time, replayed) in zip(frames, recording):
+            assert replayed_time == timestamp
+            assert [d['bbox'] for d in replayed] == [d['bbox'] for d in detections]
+            assert [d['center'] for d in replayed] == [d['center'] for d in detections]
+            assert [d.get('track_id') for d in replayed] == [d.get('track_id') for d in detections]
+        assert 'track_id' not in recording.frame(3)[1][0]
+
+        # Frames are found by timestamp without reading the others
+        start_time = frames[0][0]
+        assert recording.frame_at(start_time + 10) == 20
+        assert len(list(recording.frames_between(start_time + 10, start_time + 20))) == 21
+
+        # Replaying the recording matches replaying the original records
+        engine = ReplayEngine(load_test_config(temp_dir))
+        replayed_summary = engine.run(recording)
+        engine = ReplayEngine(load_test_config(temp_dir))
+        original_summary = engine.run(frames)
+        assert replayed_summary['queue_metrics'] == original_summary['queue_metrics']
+        recording.close()
+
+    print("✓ Recordings round trip")
+    return True
+
+def test_replay_source_stands_in_for_detector():
+    """The system runs on recorded detections and recorded time, without a model"""
+    print("Testing replay source in the main system...")
+
+    import numpy as np
+    import main as app
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = load_test_config(temp_dir)
+        config["detection"]["motion_gate"] = {"enabled": True}
+        config_path = os.path.join(temp_dir, "config.json")
+        with open(config_path, 'w') as f:
+            json.dump(config, f)
+
+        path = os.path.join(temp_dir, "detections.qdr")
+        frames = list(make_shopping_day(POSITIONS, 300, seed=7))
+        recorder = DetectionRecorder(path)
+        for timestamp, detections in frames:
+            recorder.record(timestamp, detections)
+        recorder.close()
+
+        clock = ManualClock()
+        source = DetectionReplaySource(path, clock)
+        system = app.QueueManagementSystem(config_path, clock=clock, detector=source)
+        system.headless = True
+        system.start_recording(os.path.join(temp_dir, "again.qdr"))
+
+        frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+        while not source.finished:
+            system.process_frame(frame)
+        assert clock.time() == frames[-1][0]
+        system.recorder.close()
+
+        # Offline video processing owns the clock, a source may not set it too
+        try:
+            system.run_offline(os.path.join(temp_dir, "footage.mp4"))
+            assert False, "two clock owners accepted"
+        except ValueError:
+            pass
+
+        # Re-recording the replay reproduces the recording
+        again = DetectionRecording(os.path.join(temp_dir, "again.qdr"))
+        assert len(again) == len(frames)
+        assert [t for t, _ in again] == [t for t, _ in frames]
+        assert all(a == b for (_, a), (_, b) in zip(again, DetectionRecording(path)))
+        system.report_generator.close()
+        system.report_generator.snapshot_store.close()
+
+    print("✓ Replay source stands in for the detector")
+    return True
+
+def test_replay_keeps_live_history_clean():
+    """A command-line replay writes only to its own store, or nowhere"""
+    print("Testing replay storage...")
+
+    import main as app
+    from storage.snapshot_store import SnapshotStore
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = load_test_config(temp_dir)
+        config_path = os.path.join(temp_dir, "config.json")
+        with open(config_path, 'w') as f:
+            json.dump(config, f)
+
+        path = os.path.join(temp_dir, "detections.qdr")
+        recorder = DetectionRecorder(path)
+        for timestamp, detections in make_shopping_day(POSITIONS, 600, seed=9):
+            recorder.record(timestamp, detections)
+        recorder.close()
+
+        summary = app.run_detection_replay(config_path, path)
+        assert summary['queue_metrics']['total_customers_served'] > 0
+        store_dir = os.path.join(temp_dir, "replay")
+        app.run_detection_replay(config_path, path, store_dir)
+
+        # The configured live store and journal are never created
+        assert not os.path.exists(config["analytics"]["history_db"])
+        assert not os.path.exists(config["queue"]["retention"]["journal_path"])
+        store = SnapshotStore(os.path.join(store_dir, "history.db"))
+        assert len(store.query('queue')) > 0
+        store.close()
+
+    print("✓ Replay keeps the live history clean")
+    return True
+
+def run_all_tests():
+    """Run all replay tests"""
+    tests = [
+        test_replay_is_deterministic,
+        test_replay_uses_record_time,
+        test_recording_round_trip,
+        test_replay_source_stands_in_for_detector,
+        test_replay_keeps_live_history_clean,
+    ]
+
+    passed = 0
+    for test_func in tests:
+        try:
+            if test_func():
+                passed += 1
+        except Exception as e:
+            print(f"✗ {test_func.__name__} FAILED: {e}")
+
+    print(f"\nReplay Tests: {passed}/{len(tests)} passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    exit(0 if run_all_tests() else 1)
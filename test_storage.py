@@ -0,0 +1,354 @@
+"""
+Storage Tests
+Tests the historical snapshot store and legacy data migration
+"""
+
+import sys
+import os
+import json
+import tempfile
+import time
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from storage.snapshot_store import SnapshotStore
+from storage.segment_journal import SegmentJournal
+from storage.history import open_history_store
+from storage.retention import RetentionManager, rollup_snapshots
+from queue_management.queue_manager import QueueManager
+from utils.clock import ManualClock
+
+def load_test_config(temp_dir):
+    """Load configuration storing history in temp_dir"""
+    with open(os.path.join(os.path.dirname(__file__), 'config.json'), 'r') as f:
+        config = json.load(f)
+    config["analytics"]["history_db"] = os.path.join(temp_dir, "history.db")
+    return config
+
+def test_snapshot_range_queries():
+    """Range and limit queries return snapshots in time order"""
+    print("Testing snapshot range queries...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = SnapshotStore(os.path.join(temp_dir, "history.db"))
+        # Written out of order, as worker threads may
+        for minute in (3, 1, 4, 0, 2):
+            store.append('queue', {'minute': minute}, 1000 + 60 * minute)
+        store.append('performance', {'minute': 2}, 1120)
+
+        assert [d['minute'] for d in store.query('queue')] == [0, 1, 2, 3, 4]
+        assert [d['minute'] for d in store.query('queue', 1060, 1180)] == [1, 2, 3]
+        assert [d['minute'] for d in store.query('queue', limit=2)] == [3, 4]
+        assert store.latest('queue')['ts'] == 1240
+        assert store.count() == 6 and store.count('performance') == 1
+        store.close()
+
+        # WAL mode persists with the database
+        reopened = SnapshotStore(os.path.join(temp_dir, "history.db"))
+        mode = reopened.connection.execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode == 'wal'
+        assert reopened.count('queue') == 5
+        reopened.close()
+
+    print("✓ Snapshot range queries ordered")
+    return True
+
+def test_legacy_files_migrated_in_order():
+    """Legacy JSON files are imported once, timestamped from their names"""
+    print("Testing legacy migration...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for stamp in ("20250712_214321", "20250712_211358", "20250713_010000"):
+            with open(os.path.join(temp_dir, f"queue_data_{stamp}.json"), 'w') as f:
+                json.dump({'timestamp': stamp}, f)
+        with open(os.path.join(temp_dir, "queue_data_20250714_000000.json"), 'w') as f:
+            f.write("{")
+
+        store = SnapshotStore(os.path.join(temp_dir, "history.db"))
+        assert store.import_json_files(temp_dir, 'queue_data_', 'queue') == 3
+        assert store.import_json_files(temp_dir, 'queue_data_', 'queue') == 0
+
+        stamps = [d['timestamp'] for d in store.query('queue')]
+        assert stamps == ["20250712_211358", "20250712_214321", "20250713_010000"]
+        assert [d['timestamp'] for d in store.query('queue', limit=1)] == ["20250713_010000"]
+        store.close()
+
+    print("✓ Legacy files migrated in order")
+    return True
+
+def test_queue_manager_saves_to_store():
+    """save_queue_data appends a snapshot instead of writing a file"""
+    print("Testing queue data saving...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        queue_manager = QueueManager(load_test_config(temp_dir))
+        queue_manager.save_queue_data()
+        queue_manager.save_queue_data()
+
+        data = queue_manager.snapshot_store.query('queue')
+        assert len(data) == 2
+        assert set(data[0]['queues']) == {str(qid) for qid in queue_manager.queues}
+        assert 'performance_metrics' in data[0]
+        queue_manager.snapshot_store.close()
+
+    print("✓ Queue data saved to the snapshot store")
+    return True
+
+def test_segment_journal_seals_and_queries():
+    """Journal rotates into compressed indexed segments and answers range queries"""
+    print("Testing segment journal...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "journal")
+        journal = SegmentJournal(path, max_segment_bytes=1000, block_records=4)
+        for minute in range(60):
+            journal.append('queue', {'minute': minute, 'queues': {'1': {'queue_length': minute % 5}}},
+                           1000 + 60 * minute)
+            if minute % 10 == 0:
+                journal.append('performance', {'minute': minute}, 1000 + 60 * minute)
+
+        # Several sealed segments plus the active one, no stray files
+        sealed = [f for f in os.listdir(path) if f.endswith('.seg')]
+        assert len(sealed) >= 3
+        assert not [f for f in os.listdir(path) if f.endswith('.tmp')]
+
+        assert [d['minute'] for d in journal.query('queue')] == list(range(60))
+        assert [d['minute'] for d in journal.query('queue', 1000 + 60 * 20, 1000 + 60 * 24)] == [20, 21, 22, 23, 24]
+        assert [d['minute'] for d in journal.query('queue', limit=3)] == [57, 58, 59]
+        assert [d['minute'] for d in journal.query('performance')] == [0, 10, 20, 30, 40, 50]
+        assert journal.latest('queue')['ts'] == 1000 + 60 * 59
+        assert journal.count('queue') == 60 and journal.count() == 66
+
+        # A crash leaves an active segment with a torn last line
+        journal.append('queue', {'minute': 60}, 1000 + 60 * 60)
+        with open(journal.active_path, 'a') as f:
+            f.write('{"ts": 9999, "kind": "queue", "da')
+        reopened = SegmentJournal(path, max_segment_bytes=1000, block_records=4)
+        assert not [f for f in os.listdir(path) if f.endswith('.ndjson')]
+        assert [d['minute'] for d in reopened.query('queue')] == list(range(61))
+        reopened.close()
+
+    print("✓ Segment journal sealed and queried")
+    return True
+
+def test_segment_journal_follows_clock_and_close():
+    """Rotation uses the injected clock; a closed journal refuses writes"""
+    print("Testing segment journal clock...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        clock = ManualClock(5000.0)
+        journal = SegmentJournal(os.path.join(temp_dir, "journal"), max_segment_seconds=60, clock=clock)
+        journal.append('queue', {'minute': 0})
+        clock.advance(30)
+        journal.append('queue', {'minute': 1})
+        assert len(journal.segments) == 0
+        clock.advance(30)
+        journal.append('queue', {'minute': 2})
+        assert len(journal.segments) == 1
+        assert [d['ts'] for d in journal.query('queue')] == [5000.0, 5030.0, 5060.0]
+
+        journal.close()
+        try:
+            journal.append('queue', {'minute': 3})
+            assert False, "append after close should fail"
+        except ValueError:
+            pass
+        assert journal.count('queue') == 3
+
+    print("✓ Segment journal follows its clock and stays closed")
+    return True
+
+def test_history_store_shared_per_path():
+    """Components configured with the same journal share one writer"""
+    print("Testing history store selection...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = load_test_config(temp_dir)
+        config["analytics"]["history_backend"] = "segments"
+        config["analytics"]["journal"] = {"path": os.path.join(temp_dir, "journal")}
+
+        queue_manager = QueueManager(config)
+        store = open_history_store(config["analytics"])
+        assert store is queue_manager.snapshot_store
+        assert isinstance(store, SegmentJournal)
+
+        queue_manager.save_queue_data()
+        assert len(store.query('queue')) == 1
+        store.close()
+        assert open_history_store(config["analytics"]) is not store
+        assert len(open_history_store(config["analytics"]).query('queue')) == 1
+
+        config["analytics"]["history_backend"] = "csv"
+        try:
+            open_history_store(config["analytics"])
+            assert False, "unknown backend accepted"
+        except ValueError:
+            pass
+
+    print("✓ History store shared per path")
+    return True
+
+def make_retention(temp_dir, store, expire_files=None, clock=None):
+    """Retention manager over store with no pacing delay"""
+    config = load_test_config(temp_dir)
+    config["analytics"]["retention"] = {"raw_hours": 48, "daily_retention_days": 365, "pause_seconds": 0,
+                                        "max_batches": 10000, "expire_files": expire_files or {}}
+    return RetentionManager(config, store, clock)
+
+def fill_week(store, now):
+    """A week of per-minute queue snapshots ending at now"""
+    start = now - 7 * 86400
+    for minute in range(7 * 1440):
+        store.append('queue', {'queues': {'1': {'queue_length': minute % 4, 'queue_type': 'regular',
+                                                'customers': []}}}, start + 60 * minute)
+
+def test_rollups_keep_snapshot_layout():
+    """Rollups average numeric fields weighted by samples"""
+    print("Testing rollups...")
+
+    hour = rollup_snapshots([{'ts': 0, 'queues': {'1': {'queue_length': 2, 'queue_type': 'express'}}},
+                             {'ts': 60, 'queues': {'1': {'queue_length': 4, 'queue_type': 'express'}}}],
+                            'hour', 0)
+    assert hour == {'queues': {'1': {'queue_length': 3.0, 'queue_type': 'express'}},
+                    'period': 'hour', 'period_start': 0, 'samples': 2}
+
+    day = rollup_snapshots([hour, {'queues': {'1': {'queue_length': 6}}, 'samples': 1}], 'day', 0)
+    assert day['queues']['1']['queue_length'] == 4.0 and day['samples'] == 3
+
+    print("✓ Rollups keep snapshot layout")
+    return True
+
+def test_retention_compacts_old_snapshots():
+    """Raw snapshots past raw_hours become hourly rollups; dry run changes nothing"""
+    print("Testing retention compaction...")
+
+    for backend in ("sqlite", "segments"):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            if backend == "sqlite":
+                store = SnapshotStore(os.path.join(temp_dir, "history.db"))
+            else:
+                store = SegmentJournal(os.path.join(temp_dir, "journal"), max_segment_bytes=64 * 1024)
+            now = 1699999200.0  # on an hour boundary
+            fill_week(store, now)
+            retention = make_retention(temp_dir, store)
+
+            dry = retention.run(dry_run=True, now=now)
+            assert store.count('queue') == 7 * 1440 and store.count('queue_hourly') == 0
+            assert dry['rollups_written'] > 100 and dry['bytes_reclaimed'] > 0
+
+            report = retention.run(now=now)
+            assert report['rollups_written'] == dry['rollups_written']
+            assert report['snapshots_compacted'] == dry['snapshots_compacted']
+
+            # Everything older than 48 hours is now hourly; nothing was lost
+            raw = store.query('queue')
+            hourly = store.query('queue_hourly')
+            assert min(d['ts'] for d in raw) >= now - 48 * 3600 - 3600
+            assert sum(d['samples'] for d in hourly) + len(raw) == 7 * 1440
+            assert all(d['queues']['1']['queue_length'] == 1.5 for d in hourly)
+
+            # A second pass has nothing left to do
+            assert retention.run(now=now)['rollups_written'] == 0
+
+            # Much later, hourly rollups become daily ones
+            later = retention.run(now=now + 40 * 86400)
+            assert store.count('queue_hourly') == 0 and store.count('queue') == 0
+            daily = store.query('queue_daily')
+            assert later['rollups_written'] >= 7 and sum(d['samples'] for d in daily) == 7 * 1440
+            store.close()
+
+    print("✓ Old snapshots compacted into rollups")
+    return True
+
+def test_retention_dry_run_and_rerun():
+    """Dry run estimates both stages; a rerun never duplicates a rollup"""
+    print("Testing retention dry run and rerun...")
+
+    for backend in ("sqlite", "segments"):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            if backend == "sqlite":
+                store = SnapshotStore(os.path.join(temp_dir, "history.db"))
+            else:
+                store = SegmentJournal(os.path.join(temp_dir, "journal"), max_segment_bytes=64 * 1024)
+            now = 1699999200.0
+            fill_week(store, now)
+
+            # Old enough that raw snapshots go hourly and then daily in one pass
+            retention = make_retention(temp_dir, store, clock=ManualClock(now + 40 * 86400))
+            dry = retention.run(dry_run=True)
+            assert store.count('queue_hourly') == 0 and store.count('queue_daily') == 0
+            report = retention.run()
+            assert report['rollups_written'] == dry['rollups_written']
+            assert report['snapshots_compacted'] == dry['snapshots_compacted']
+            assert store.count('queue_daily') >= 7 and store.count('queue_hourly') == 0
+
+            # Rerunning a compaction step replaces its rollup instead of adding one
+            for _ in range(2):
+                store.replace_range('queue', 0, 1, 'queue_hourly', {'samples': 1}, 3600.0)
+            assert store.count('queue_hourly') == 1
+            store.close()
+
+    print("✓ Dry run covers both stages and reruns are idempotent")
+    return True
+
+def test_retention_expires_old_files():
+    """Data files past data_retention_days are deleted in batches"""
+    print("Testing file expiry...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        reports_dir = os.path.join(temp_dir, "reports")
+        os.makedirs(reports_dir)
+        old_time = time.time() - 40 * 86400
+        for i in range(5):
+            path = os.path.join(reports_dir, f"hourly_report_{i}.json")
+            with open(path, 'w') as f:
+                f.write("{}")
+            if i < 3:
+                os.utime(path, (old_time, old_time))
+        with open(os.path.join(reports_dir, "notes.txt"), 'w') as f:
+            f.write("keep")
+        os.utime(os.path.join(reports_dir, "notes.txt"), (old_time, old_time))
+
+        store = SnapshotStore(os.path.join(temp_dir, "history.db"))
+        retention = make_retention(temp_dir, store, {reports_dir: "hourly_report_"})
+        retention.batch_size = 2
+
+        assert retention.run(dry_run=True)['files_deleted'] == 3
+        assert len(os.listdir(reports_dir)) == 6
+        report = retention.run()
+        assert report['files_deleted'] == 3 and report['batches'] == 1
+        assert sorted(os.listdir(reports_dir)) == ["hourly_report_3.json", "hourly_report_4.json", "notes.txt"]
+        store.close()
+
+    print("✓ Old files expired")
+    return True
+
+def run_all_tests():
+    """Run all storage tests"""
+    tests = [
+        test_snapshot_range_queries,
+        test_legacy_files_migrated_in_order,
+        test_queue_manager_saves_to_store,
+        test_segment_journal_seals_and_queries,
+        test_segment_journal_follows_clock_and_close,
+        test_history_store_shared_per_path,
+        test_rollups_keep_snapshot_layout,
+        test_retention_compacts_old_snapshots,
+        test_retention_dry_run_and_rerun,
+        test_retention_expires_old_files,
+    ]
+
+    passed = 0
+    for test_func in tests:
+        try:
+            if test_func():
+                passed += 1
+        except Exception as e:
+            print(f"✗ {test_func.__name__} FAILED: {e}")
+
+    print(f"\nStorage Tests: {passed}/{len(tests)} passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    exit(0 if run_all_tests() else 1)
@@ -0,0 +1,254 @@
+"""
+Camera Supervisor Tests
+Tests worker processes, the store-wide view and crash restarts
+"""
+
+import sys
+import os
+import tempfile
+import time
+from types import MappingProxyType
+
+import numpy as np
+
+# Add src directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from supervisor.camera_supervisor import CameraSupervisor, camera_config
+from supervisor.store_aggregator import StoreAggregator
+from utils.clock import SystemClock
+
+class FakeMonitor:
+    """Performance monitor with fixed metrics"""
+
+    def get_current_metrics(self):
+        return MappingProxyType({'fps': 10.0})
+
+class FakeCameraSystem:
+    """Stand-in for QueueManagementSystem: one queue whose length follows the config"""
+
+    def __init__(self, config, inference_client=None):
+        self.config = config
+        self.inference_client = inference_client
+        self.detections = 0
+        self.headless = False
+        self.running = False
+        self.on_queue_update = None
+        self.clock = SystemClock()
+        self.frame_count = 0
+        self.performance_monitor = FakeMonitor()
+
+    def run(self, camera_id=0, video_path=None):
+        fake_config = self.config["fake"]
+        self.running = True
+        start_time = time.time()
+        while self.running:
+            if fake_config.get("crash_after") and time.time() - start_time > fake_config["crash_after"]:
+                raise RuntimeError("camera lost")
+            self.frame_count += 1
+            if self.inference_client is not None:
+                try:
+                    self.detections += len(self.inference_client.detect(np.zeros((8, 8, 3), dtype=np.uint8)))
+                except Exception:
+                    pass
+            self.on_queue_update(MappingProxyType({1: MappingProxyType({
+                'queue_length': fake_config["queue_length"],
+                'total_customers_served': 5,
+                'estimated_wait_time': 30.0 * fake_config["queue_length"],
+                'customers': ()
+            })}))
+            time.sleep(0.01)
+
+class OneBoxDetector:
+    """Inference server detector finding one box per image"""
+
+    def __init__(self, config):
+        pass
+
+    def wait_until_ready(self, timeout=None):
+        return True
+
+    def detect_batch(self, images):
+        return [[{'bbox': [0, 0, 8, 8], 'confidence': 1.0, 'center': [4, 4]}] for _ in images]
+
+class BrokenDetector:
+    """Inference server detector whose model never loads"""
+
+    def __init__(self, config):
+        raise RuntimeError("model file missing")
+
+def make_config(temp_dir, crash_after=None, inference_server=False):
+    """Two fake cameras, the second optionally crashing"""
+    return {
+        "fake": {"queue_length": 1},
+        "supervisor": {
+            "data_dir": os.path.join(temp_dir, "cameras"),
+            "publish_interval": 0.05,
+            "stale_seconds": 5,
+            "stats_interval": 0,
+            "restart_backoff_seconds": 0.1,
+            "stable_seconds": 60
+        },
+        "detection": {"inference_server": {"enabled": inference_server, "max_frame_shape": [8, 8, 3],
+                                           "timeout_seconds": 2, "start_timeout_seconds": 60}},
+        "cameras": [
+            {"name": "entrance", "video": "entrance.mp4", "config": {"fake": {"queue_length": 2}}},
+            {"name": "checkout", "camera": 1, "config": {"fake": {"queue_length": 4, "crash_after": crash_after}}}
+        ]
+    }
+
+def wait_for(condition, timeout=60):
+    """Poll condition until it holds; False on timeout"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+def test_camera_config_overrides_shared_settings():
+    """Each camera gets the shared config with its own section merged in"""
+    print("Testing camera configs...")
+
+    config = make_config("/tmp")
+    config["counters"] = {"total_counters": 4, "express_lanes": [1]}
+    config["cameras"][0]["config"]["counters"] = {"total_counters": 2}
+
+    worker_config, source = camera_config(config, config["cameras"][0])
+    assert worker_config["counters"] == {"total_counters": 2, "express_lanes": [1]}
+    assert worker_config["fake"] == {"queue_length": 2}
+    assert "cameras" not in worker_config and "supervisor" not in worker_config
+    assert source == os.path.abspath("entrance.mp4")
+    assert camera_config(config, config["cameras"][1])[1] == 1
+    assert config["counters"]["total_counters"] == 4
+
+    print("✓ Camera configs merged")
+    return True
+
+def test_workers_publish_store_view():
+    """Every worker's snapshots reach one merged store-wide view"""
+    print("Testing store-wide view...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        supervisor = CameraSupervisor(make_config(temp_dir), FakeCameraSystem)
+        supervisor.start()
+        try:
+            assert wait_for(lambda: supervisor.aggregator.get_store_view()['cameras_online'] == 2)
+            view = supervisor.aggregator.get_store_view()
+            assert set(view['queues']) == {"entrance/1", "checkout/1"}
+            assert view['total_queue_length'] == 6
+            assert view['total_customers_served'] == 10
+            assert view['longest_wait_queue'] == "checkout/1"
+            assert "2/2 cameras online" in StoreAggregator.format_view(view)
+
+            # Workers run in their own data directories
+            assert os.path.isdir(os.path.join(temp_dir, "cameras", "entrance"))
+        finally:
+            supervisor.stop()
+
+        stats = supervisor.get_worker_stats()
+        assert all(not worker['alive'] and worker['restarts'] == 0 for worker in stats.values())
+
+    print("✓ Store-wide view merged")
+    return True
+
+def test_crashed_worker_restarts_with_backoff():
+    """A crashing worker is restarted with growing delays, the others keep running"""
+    print("Testing worker restarts...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        supervisor = CameraSupervisor(make_config(temp_dir, crash_after=0.2), FakeCameraSystem)
+        supervisor.start()
+        try:
+            def restarted_twice():
+                supervisor.check_workers()
+                return supervisor.workers["checkout"]['restarts'] >= 2
+            assert wait_for(restarted_twice)
+
+            checkout = supervisor.workers["checkout"]
+            assert checkout['last_exit'] != 0
+            assert checkout['failures'] >= 2
+            assert checkout['backoff'] == 0.1 * 2 ** (checkout['failures'] - 1)
+            assert supervisor.workers["entrance"]['restarts'] == 0
+            assert supervisor.workers["entrance"]['process'].is_alive()
+        finally:
+            supervisor.stop()
+
+    print("✓ Crashed worker restarted with backoff")
+    return True
+
+def test_inference_server_failure_falls_back():
+    """A server that fails to start leaves each worker with its own model"""
+    print("Testing inference server start failure...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        supervisor = CameraSupervisor(make_config(temp_dir, inference_server=True), FakeCameraSystem,
+                                      detector_factory=BrokenDetector)
+        supervisor.start()
+        try:
+            assert not supervisor.use_inference_server and supervisor.inference_server is None
+            assert all(worker['inference_client'] is None for worker in supervisor.workers.values())
+            assert wait_for(lambda: supervisor.aggregator.get_store_view()['cameras_online'] == 2)
+        finally:
+            supervisor.stop()
+
+    print("✓ Workers fall back to their own models")
+    return True
+
+def test_dead_inference_server_restarts():
+    """A dead server is restarted and the workers move onto it"""
+    print("Testing inference server restart...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        supervisor = CameraSupervisor(make_config(temp_dir, inference_server=True), FakeCameraSystem,
+                                      detector_factory=OneBoxDetector)
+        supervisor.start()
+        try:
+            assert supervisor.inference_server.is_alive()
+            first_server = supervisor.inference_server
+            pids = {name: worker['process'].pid for name, worker in supervisor.workers.items()}
+            first_server.process.kill()
+
+            def restarted():
+                supervisor.check_workers()
+                return (supervisor.server['restarts'] == 1 and supervisor.inference_server is not None
+                        and all(worker['process'] is not None and worker['process'].pid != pids[name]
+                                for name, worker in supervisor.workers.items()))
+            assert wait_for(restarted)
+            assert supervisor.inference_server is not first_server
+            assert supervisor.server['last_exit'] != 0
+            assert all(worker['restarts'] == 0 for worker in supervisor.workers.values())
+
+            # The new workers get detections from the new server
+            client = supervisor.workers["entrance"]['inference_client']
+            assert client.buffer_name == supervisor.inference_server.buffers[0].name
+            assert wait_for(lambda: supervisor.aggregator.get_store_view()['cameras_online'] == 2)
+        finally:
+            supervisor.stop()
+
+    print("✓ Dead inference server restarted")
+    return True
+
+def run_all_tests():
+    """Run all supervisor tests"""
+    tests = [
+        test_camera_config_overrides_shared_settings,
+        test_workers_publish_store_view,
+        test_crashed_worker_restarts_with_backoff,
+        test_inference_server_failure_falls_back,
+        test_dead_inference_server_restarts,
+    ]
+
+    passed = 0
+    for test_func in tests:
+        try:
+            if test_func():
+                passed += 1
+        except Exception as e:
+            print(f"✗ {test_func.__name__} FAILED: {e}")
+
+    print(f"\nSupervisor Tests: {passed}/{len(tests)} passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    exit(0 if run_all_tests() else 1)
@@ -127,6 +127,7 @@ def test_detector():
             config = json.load(f)
         
         detector = PersonDetector(config)
+        detector.wait_until_ready()
         
         # Create test frame
         test_frame = np.zeros((480, 640, 3), dtype=np.uint8)